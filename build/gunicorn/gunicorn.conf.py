@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for the web service.
+
+``WEB_PROFILE`` picks how requests are served:
+
+- ``asgi`` (default): Uvicorn workers running ``university_core.asgi``. A
+  worker keeps serving other requests while async views, server-sent event
+  streams and upload chunks wait on the database or the network, so one
+  worker process per CPU is enough.
+- ``wsgi``: sync workers running ``university_core.wsgi``. A worker process
+  serves one request at a time, so slow queries tie up whole processes and
+  more of them are needed for the same concurrency.
+
+Usage:
+    gunicorn --config build/gunicorn/gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+profile = os.environ.get('WEB_PROFILE', 'asgi')
+if profile not in ('asgi', 'wsgi'):
+    raise ValueError(f"WEB_PROFILE must be 'asgi' or 'wsgi', not {profile!r}")
+
+cpus = multiprocessing.cpu_count()
+
+if profile == 'asgi':
+    wsgi_app = 'university_core.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    default_workers = cpus
+else:
+    wsgi_app = 'university_core.wsgi:application'
+    worker_class = 'sync'
+    default_workers = 2 * cpus + 1
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_WORKERS', default_workers))
+
+# Requests slower than this are killed (sync workers) or the worker restarted (unresponsive event loop)
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+
+# nginx keeps connections to the workers open between requests
+keepalive = 5
+
+# Recycle workers now and then so slow leaks do not add up; the jitter keeps them from restarting together
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
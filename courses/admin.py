@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Course, Lesson
+from .models import Course, Enrollment, Grade, Lesson
 
 
 class LessonInline(admin.TabularInline):
@@ -13,16 +13,19 @@ class LessonInline(admin.TabularInline):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ['title', 'created_by', 'lessons_count_display', 'is_active', 'created_at']
+    list_display = ['title', 'created_by', 'lessons_count_display', 'capacity', 'enrolled_count', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at', 'created_by__user_role']
     search_fields = ['title', 'description', 'created_by__first_name', 'created_by__last_name']
-    readonly_fields = ['created_at', 'updated_at', 'created_by']
+    readonly_fields = ['created_at', 'updated_at', 'created_by', 'enrolled_count']
     inlines = [LessonInline]
     
     fieldsets = (
         ('Course Information', {
             'fields': ('title', 'description', 'image', 'is_active')
         }),
+        ('Enrollment', {
+            'fields': ('capacity', 'enrolled_count')
+        }),
         ('Metadata', {
             'fields': ('created_by', 'created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -65,3 +68,20 @@ class LessonAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('course')
 
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(admin.ModelAdmin):
+    list_display = ['student', 'course', 'status', 'requested_at', 'enrolled_at']
+    list_filter = ['status', 'requested_at']
+    search_fields = ['student__email', 'course__title']
+    readonly_fields = ['status', 'requested_at', 'enrolled_at', 'updated_at']
+    raw_id_fields = ['course', 'student']
+
+
+@admin.register(Grade)
+class GradeAdmin(admin.ModelAdmin):
+    list_display = ['student', 'course', 'event', 'score', 'max_score', 'updated_at']
+    list_filter = ['course']
+    search_fields = ['student__email', 'course__title']
+    raw_id_fields = ['course', 'event', 'student', 'graded_by']
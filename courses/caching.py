@@ -0,0 +1,37 @@
+"""
+Caches of the courses app and their invalidation.
+
+Each course has its own grades version; cached statistics include it in
+their key and any grade write for the course bumps it, so stale entries are
+simply never read again.
+
+The course catalog (``api_courses_list``) is cached for
+``COURSE_CATALOG_CACHE_TIMEOUT`` and invalidated by any course or lesson
+write. Enrollment counts and creator names may lag by up to that timeout.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from university_core.cache import TieredCache
+
+catalog_cache = TieredCache('courses:catalog', timeout=settings.COURSE_CATALOG_CACHE_TIMEOUT)
+
+
+def _grades_version_key(course_id):
+    return f'courses:grades_version:{course_id}'
+
+
+def get_grades_version(course_id):
+    key = _grades_version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_grades_version(course_id):
+    try:
+        cache.incr(_grades_version_key(course_id))
+    except ValueError:
+        cache.set(_grades_version_key(course_id), 1, None)
@@ -0,0 +1,138 @@
+"""
+Seat allocation for course enrollment.
+
+Registration opens with thousands of students hitting the same courses at
+once, so a seat is claimed with one conditional UPDATE
+(``enrolled_count < capacity``) instead of read-check-write: the course row is
+locked for a single statement and the ``course_not_oversold`` check constraint
+backs it up. Only the slow paths (joining the waitlist of a full course,
+handing a freed seat on) lock the course row for their whole transaction, so
+a seat can never be freed while a waitlist entry is being written unseen.
+Waitlist heads are picked with ``SELECT ... FOR UPDATE SKIP LOCKED`` and never
+wait on entries another transaction is changing.
+
+Agendas list the events of the courses a student is enrolled in and are
+cached under the events version, so every status change bumps it on commit.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from schedule.caching import bump_events_version
+from .models import Course, Enrollment
+
+
+class _AlreadyActive(Exception):
+    pass
+
+
+def _claim_seat(course_id):
+    """Take one seat if the course has room; return True on success"""
+    return Course.objects.filter(
+        Q(capacity__isnull=True) | Q(enrolled_count__lt=F('capacity')),
+        id=course_id,
+    ).update(enrolled_count=F('enrolled_count') + 1) == 1
+
+
+def _lock_course(course_id):
+    Course.objects.select_for_update().filter(id=course_id).values_list('id').first()
+
+
+def _next_waitlisted(course_id):
+    return (
+        Enrollment.objects
+        .select_for_update(skip_locked=True)
+        .filter(course_id=course_id, status='waitlisted')
+        .order_by('requested_at', 'id')
+        .first()
+    )
+
+
+def _mark_enrolled(enrollment):
+    enrollment.status = 'enrolled'
+    enrollment.enrolled_at = timezone.now()
+    enrollment.save(update_fields=['status', 'enrolled_at', 'updated_at'])
+    transaction.on_commit(bump_events_version)
+
+
+def enroll(course, student):
+    """
+    Enroll ``student`` in ``course``, or waitlist them when it is full.
+
+    Returns (enrollment, changed); requesting an enrollment that is already
+    active (enrolled or waitlisted) changes nothing.
+    """
+    existing = Enrollment.objects.filter(course=course, student=student).first()
+    if existing and existing.status != 'dropped':
+        return existing, False
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            seated = _claim_seat(course.id)
+            if not seated:
+                # Full: re-check under the course lock so a concurrent drop sees this waitlist entry
+                _lock_course(course.id)
+                seated = _claim_seat(course.id)
+            values = {
+                'status': 'enrolled' if seated else 'waitlisted',
+                'requested_at': now,
+                'enrolled_at': now if seated else None,
+            }
+            if existing:
+                # Re-enrolling after a drop joins the back of the waitlist
+                if not Enrollment.objects.filter(id=existing.id, status='dropped').update(updated_at=now, **values):
+                    raise _AlreadyActive
+            else:
+                Enrollment.objects.create(course=course, student=student, **values)
+            transaction.on_commit(bump_events_version)
+    except (IntegrityError, _AlreadyActive):
+        # A concurrent request for the same student won; its seat claim stands, ours was rolled back
+        return Enrollment.objects.get(course=course, student=student), False
+    return Enrollment.objects.get(course=course, student=student), True
+
+
+def drop(course, student):
+    """
+    Drop an active enrollment; a freed seat passes straight to the waitlist head.
+
+    Returns (enrollment, promoted) where either may be None.
+    """
+    with transaction.atomic():
+        enrollment = (
+            Enrollment.objects.select_for_update()
+            .filter(course=course, student=student)
+            .exclude(status='dropped')
+            .first()
+        )
+        if enrollment is None:
+            return None, None
+        was_enrolled = enrollment.status == 'enrolled'
+        enrollment.status = 'dropped'
+        enrollment.enrolled_at = None
+        enrollment.save(update_fields=['status', 'enrolled_at', 'updated_at'])
+        transaction.on_commit(bump_events_version)
+
+        promoted = None
+        if was_enrolled:
+            _lock_course(course.id)
+            promoted = _next_waitlisted(course.id)
+            if promoted is not None:
+                _mark_enrolled(promoted)
+            else:
+                Course.objects.filter(id=course.id).update(enrolled_count=F('enrolled_count') - 1)
+    return enrollment, promoted
+
+
+def fill_from_waitlist(course):
+    """Promote waitlisted students while seats are free (e.g. after raising capacity)"""
+    promoted = []
+    while True:
+        with transaction.atomic():
+            _lock_course(course.id)
+            candidate = _next_waitlisted(course.id)
+            if candidate is None or not _claim_seat(course.id):
+                break
+            _mark_enrolled(candidate)
+        promoted.append(candidate)
+    return promoted
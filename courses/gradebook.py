@@ -0,0 +1,173 @@
+"""
+Gradebook: bulk grade upload and per-course statistics.
+
+Uploads are validated against the course roster and upserted in batches with
+``bulk_create(update_conflicts=True)``. Statistics load the grade columns of
+a course once into a (students x events) NumPy matrix of percentages; every
+figure is then a vectorized reduction over its axes.
+"""
+import csv
+import io
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+
+from .models import Enrollment, Grade
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def parse_grades_csv(fileobj):
+    """Yield (line_number, row) from a CSV upload with ``student`` and ``score`` columns"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _roster_lookup(course):
+    """Map enrolled students' IDs (as strings) and lowercased emails to their IDs"""
+    lookup = {}
+    enrolled = Enrollment.objects.filter(course=course, status='enrolled').values_list(
+        'student_id', 'student__email'
+    )
+    for student_id, email in enrolled:
+        lookup[str(student_id)] = student_id
+        lookup[email.lower()] = student_id
+    return lookup
+
+
+def upsert_grades(course, event, rows, graded_by, max_score=100, batch_size=None):
+    """
+    Validate grade rows and insert or update them in batches.
+
+    ``rows`` yields (line_number, {'student': id or email, 'score': value});
+    students must be enrolled in the course. Returns a summary like the event
+    importer's; callers wrap this in a transaction.
+    """
+    batch_size = batch_size or settings.GRADE_UPLOAD_BATCH_SIZE
+    max_errors = settings.EVENT_IMPORT_MAX_REPORTED_ERRORS
+    roster = _roster_lookup(course)
+    result = {'total_rows': 0, 'saved': 0, 'failed': 0, 'errors': []}
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        grades = {}
+        for line_number, row in batch:
+            errors = []
+            student_id = roster.get(str(row.get('student') or '').strip().lower())
+            if student_id is None:
+                errors.append(f"Student {row.get('student')!r} is not enrolled in this course")
+            try:
+                score = float(row.get('score'))
+                if not 0 <= score <= max_score:
+                    errors.append(f'score must be between 0 and {max_score:g}')
+            except (TypeError, ValueError):
+                errors.append('score must be a number')
+            if errors:
+                result['failed'] += 1
+                if len(result['errors']) < max_errors:
+                    result['errors'].append({'row': line_number, 'errors': errors})
+                continue
+            # A later row for the same student wins
+            grades[student_id] = Grade(
+                course=course, event=event, student_id=student_id,
+                score=score, max_score=max_score, graded_by=graded_by,
+            )
+        result['total_rows'] += len(batch)
+        if grades:
+            Grade.objects.bulk_create(
+                grades.values(),
+                update_conflicts=True,
+                unique_fields=['event', 'student'],
+                update_fields=['score', 'max_score', 'graded_by', 'updated_at'],
+            )
+        result['saved'] += len(grades)
+    return result
+
+
+def _summary(values, bins):
+    """Statistics of the non-NaN entries of each column of ``values``"""
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    low = np.nanmin(values, axis=0)
+    high = np.nanmax(values, axis=0)
+    quantiles = np.nanpercentile(values, PERCENTILES, axis=0)
+
+    # Histogram of percentages per column in one bincount
+    columns = np.broadcast_to(np.arange(values.shape[1]), values.shape)[present]
+    buckets = np.clip((values[present] * bins // 100).astype(np.int64), 0, bins - 1)
+    histogram = np.bincount(columns * bins + buckets, minlength=values.shape[1] * bins).reshape(-1, bins)
+
+    return [
+        {
+            'count': int(count[column]),
+            'mean': round(float(mean[column]), 2),
+            'std': round(float(std[column]), 2),
+            'min': round(float(low[column]), 2),
+            'max': round(float(high[column]), 2),
+            'median': round(float(quantiles[PERCENTILES.index(50), column]), 2),
+            'percentiles': {
+                str(p): round(float(quantiles[index, column]), 2) for index, p in enumerate(PERCENTILES)
+            },
+            'histogram': histogram[column].tolist(),
+        }
+        for column in range(values.shape[1])
+    ]
+
+
+def grade_statistics(rows, bins=10):
+    """
+    Statistics over (event_id, student_id, score, max_score) rows.
+
+    Scores are compared as percentages of their maximum. Z-scores are per
+    event; a student's overall figures average the events they were graded in.
+    """
+    if not rows:
+        return {'events': [], 'students': [], 'course': None, 'histogram_bins': bins}
+
+    event_ids, student_ids, scores, max_scores = (np.asarray(column) for column in zip(*rows))
+    events, event_index = np.unique(event_ids, return_inverse=True)
+    students, student_index = np.unique(student_ids, return_inverse=True)
+
+    percent = np.full((len(students), len(events)), np.nan)
+    max_scores = max_scores.astype(float)
+    percent[student_index, event_index] = np.divide(
+        scores.astype(float) * 100, max_scores, out=np.zeros(len(scores)), where=max_scores > 0,
+    )
+
+    mean = np.nanmean(percent, axis=0)
+    std = np.nanstd(percent, axis=0)
+    z_scores = np.divide(percent - mean, std, out=np.zeros_like(percent), where=std > 0)
+    z_scores[np.isnan(percent)] = np.nan
+
+    averages = np.nanmean(percent, axis=1)
+    average_z = np.nanmean(z_scores, axis=1)
+
+    event_stats = _summary(percent, bins)
+    for event_id, stats in zip(events.tolist(), event_stats):
+        stats['event'] = event_id
+
+    return {
+        'events': event_stats,
+        'students': [
+            {
+                'student': student_id,
+                'average_percent': round(float(average), 2),
+                'average_z_score': round(float(z), 3),
+                'z_scores': {
+                    str(event_id): round(float(value), 3)
+                    for event_id, value in zip(events.tolist(), row) if not np.isnan(value)
+                },
+            }
+            for student_id, average, z, row in zip(students.tolist(), averages, average_z, z_scores)
+        ],
+        'course': _summary(averages[:, None], bins)[0],
+        'histogram_bins': bins,
+    }
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from courses.models import Course, Lesson
+
+
+class Command(BaseCommand):
+    help = 'Give lessons created before progress tracking a stable progress position'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        course_ids = (
+            Lesson.objects.filter(position__isnull=True)
+            .values_list('course_id', flat=True).distinct()
+        )
+        assigned = 0
+        for course_id in course_ids:
+            course = Course.all_objects.select_for_update().get(pk=course_id)
+            lessons = Lesson.objects.filter(course_id=course_id)
+            next_position = lessons.aggregate(Max('position'))['position__max']
+            next_position = max(course.next_lesson_position, 0 if next_position is None else next_position + 1)
+            missing = list(lessons.filter(position__isnull=True).order_by('order', 'id'))
+            for offset, lesson in enumerate(missing):
+                lesson.position = next_position + offset
+            Lesson.objects.bulk_update(missing, ['position'])
+            Course.all_objects.filter(pk=course_id).update(next_lesson_position=next_position + len(missing))
+            assigned += len(missing)
+
+        self.stdout.write(self.style.SUCCESS(f'Assigned progress positions to {assigned} lessons'))
@@ -1,19 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinLengthValidator
-import os
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 
+from mediastore.fields import BlobImageField
+from .caching import catalog_cache
 
-def course_image_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'course_image.{ext}'
-    return os.path.join('courses', f'course_{instance.id}', filename)
 
-
-def lesson_image_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'lesson_image.{ext}'
-    return os.path.join('lessons', f'lesson_{instance.id}', filename)
+class CourseManager(models.Manager):
+    """Hides courses deleted with ``soft_delete`` whose data is still being removed"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class Course(models.Model):
@@ -35,30 +34,82 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date Created')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Date Updated')
     is_active = models.BooleanField(default=True, verbose_name='Active')
+    capacity = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Capacity',
+        help_text='Maximum number of enrolled students; empty for unlimited'
+    )
+    # Maintained only by atomic UPDATEs in courses.enrollment
+    enrolled_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Enrolled Students'
+    )
+    # Progress position for the next lesson; only ever grows, so positions of deleted lessons are never reused
+    next_lesson_position = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Next Lesson Position'
+    )
     
     # Optional course image
-    image = models.ImageField(
-        upload_to=course_image_path,
+    image = BlobImageField(
         blank=True,
         null=True,
         verbose_name='Course Image'
     )
+    # Resized versions of the image, written by mediastore.images
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Image Variants'
+    )
+    # Set by soft_delete; the row and everything under it are removed by a background job
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Date Deleted'
+    )
+    
+    objects = CourseManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'courses'
         ordering = ['-created_at']
         verbose_name = 'Course'
         verbose_name_plural = 'Courses'
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(capacity__isnull=True) | models.Q(enrolled_count__lte=models.F('capacity')),
+                name='course_not_oversold',
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
-    def delete(self, *args, **kwargs):
-        # Delete the course image file when course is deleted
-        if self.image:
-            if os.path.isfile(self.image.path):
-                os.remove(self.image.path)
-        super().delete(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        # Never write back a stale in-memory enrolled_count over concurrent enrollments,
+        # lesson position counter over lessons added meanwhile, image variants generated
+        # in the background since this instance was loaded, or a deletion started meanwhile
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (
+                    'enrolled_count', 'next_lesson_position', 'image_variants', 'deleted_at',
+                )
+            ]
+        super().save(*args, **kwargs)
+    
+    def soft_delete(self):
+        """Hide the course now; ``jobs.deletion`` removes it with its lessons, enrollments and files"""
+        self.deleted_at = timezone.now()
+        Course.all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at, is_active=False)
+        catalog_cache.bump()  # update() sends no post_save
     
     @property
     def lessons_count(self):
@@ -67,6 +118,19 @@ class Course(models.Model):
     @property
     def created_by_name(self):
         return f"{self.created_by.first_name} {self.created_by.last_name}"
+    
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.enrolled_count, 0)
+
+
+class LessonManager(models.Manager):
+    """Hides lessons of deleted courses"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(course__deleted_at__isnull=True)
 
 
 class Lesson(models.Model):
@@ -95,16 +159,33 @@ class Lesson(models.Model):
         verbose_name='Order',
         help_text='Order of lesson in the course'
     )
+    # Bit index in LessonProgress bitmaps; unlike order it never changes, and is
+    # never given to another lesson of the course, even after this one is deleted
+    position = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Progress Position'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date Created')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Date Updated')
     
     # Optional lesson image
-    image = models.ImageField(
-        upload_to=lesson_image_path,
+    image = BlobImageField(
         blank=True,
         null=True,
         verbose_name='Lesson Image'
     )
+    # Resized versions of the image, written by mediastore.images
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Image Variants'
+    )
+    
+    objects = LessonManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'lessons'
@@ -112,17 +193,13 @@ class Lesson(models.Model):
         verbose_name = 'Lesson'
         verbose_name_plural = 'Lessons'
         unique_together = ['course', 'order']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'position'], name='unique_lesson_position'),
+        ]
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
     
-    def delete(self, *args, **kwargs):
-        # Delete the lesson image file when lesson is deleted
-        if self.image:
-            if os.path.isfile(self.image.path):
-                os.remove(self.image.path)
-        super().delete(*args, **kwargs)
-    
     def save(self, *args, **kwargs):
         # Auto-assign order if not provided
         if not self.order:
@@ -130,5 +207,168 @@ class Lesson(models.Model):
                 models.Max('order')
             )['order__max'] or 0
             self.order = max_order + 1
+        if self.position is None:
+            self.position = self._claim_position()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'position'}
         super().save(*args, **kwargs)
+    
+    def _claim_position(self):
+        """Take the course's next progress position; the UPDATE locks the course row until commit"""
+        # Courses whose lessons predate the counter start past their highest position
+        highest = (
+            Lesson.all_objects.filter(course=models.OuterRef('pk')).order_by().values('course')
+            .annotate(next_position=models.Max('position') + 1).values('next_position')
+        )
+        with transaction.atomic():
+            Course.all_objects.filter(pk=self.course_id).update(
+                next_lesson_position=Greatest(
+                    models.F('next_lesson_position'), Coalesce(models.Subquery(highest), 0)
+                ) + 1
+            )
+            return Course.all_objects.values_list('next_lesson_position', flat=True).get(pk=self.course_id) - 1
+    
+    def delete(self, *args, **kwargs):
+        from .progress import clear_lesson_completion
 
+        # Students keep no completion, and no count, for a lesson that is gone
+        with transaction.atomic():
+            if self.position is not None:
+                clear_lesson_completion(self)
+            return super().delete(*args, **kwargs)
+
+
+class Enrollment(models.Model):
+    STATUS_CHOICES = (
+        ('enrolled', 'Enrolled'),
+        ('waitlisted', 'Waitlisted'),
+        ('dropped', 'Dropped'),
+    )
+    
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='enrollments',
+        verbose_name='Course'
+    )
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='enrollments',
+        verbose_name='Student'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, verbose_name='Status')
+    requested_at = models.DateTimeField(
+        verbose_name='Date Requested',
+        help_text='Waitlist position is by request time'
+    )
+    enrolled_at = models.DateTimeField(blank=True, null=True, verbose_name='Date Enrolled')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Date Updated')
+    
+    class Meta:
+        db_table = 'enrollments'
+        ordering = ['requested_at']
+        verbose_name = 'Enrollment'
+        verbose_name_plural = 'Enrollments'
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'student'], name='unique_course_student'),
+        ]
+        indexes = [
+            # Waitlist head: next student to promote when a seat frees up
+            models.Index(fields=['course', 'status', 'requested_at', 'id']),
+            # A student's courses, used to resolve course-targeted events
+            models.Index(fields=['student', 'status', 'course']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - {self.course.title} ({self.status})"
+
+
+class LessonProgress(models.Model):
+    """
+    Completed lessons of one student in one course, as a bitmap.
+    
+    Bit ``n`` (least significant bit first within each byte, as PostgreSQL's
+    ``get_bit``/``set_bit`` number them) is set when the lesson with
+    ``position`` ``n`` is complete, so progress is one row per student and
+    course instead of one per student and lesson.
+    """
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='lesson_progress',
+        verbose_name='Student'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='lesson_progress',
+        verbose_name='Course'
+    )
+    completed = models.BinaryField(default=bytes, verbose_name='Completed Lessons')
+    completed_count = models.PositiveIntegerField(default=0, verbose_name='Completed Lessons Count')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Date Updated')
+    
+    class Meta:
+        db_table = 'lesson_progress'
+        verbose_name = 'Lesson Progress'
+        verbose_name_plural = 'Lesson Progress'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_student_course_progress'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'student']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - {self.course.title}: {self.completed_count} lessons"
+
+
+class Grade(models.Model):
+    """Score of one student for one exam or assignment event of a course"""
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='grades',
+        verbose_name='Course'
+    )
+    event = models.ForeignKey(
+        'schedule.Event',
+        on_delete=models.CASCADE,
+        related_name='grades',
+        db_constraint=False,  # events may live in a partitioned table
+        verbose_name='Exam or Assignment'
+    )
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='grades',
+        verbose_name='Student'
+    )
+    score = models.FloatField(verbose_name='Score')
+    max_score = models.FloatField(default=100, verbose_name='Maximum Score')
+    graded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='given_grades',
+        verbose_name='Graded By'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Date Updated')
+    
+    class Meta:
+        db_table = 'grades'
+        ordering = ['course', 'event', 'student']
+        verbose_name = 'Grade'
+        verbose_name_plural = 'Grades'
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'student'], name='unique_event_student_grade'),
+        ]
+        indexes = [
+            # Statistics read every grade of a course in one index range
+            models.Index(fields=['course', 'event', 'student']),
+            models.Index(fields=['student', 'course']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - {self.event_id}: {self.score}/{self.max_score}"
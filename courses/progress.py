@@ -0,0 +1,123 @@
+"""
+Lesson completion stored as one bitmap per student and course.
+
+Marking a lesson is a single ``INSERT ... ON CONFLICT DO UPDATE`` that flips
+one bit with PostgreSQL's ``set_bit`` (growing the bitmap when a course gains
+lessons) and keeps ``completed_count`` in step using ``get_bit`` on the old
+value. Reading a student's progress is a single row fetch, and per-lesson
+completion rates unpack every bitmap of a course at once with NumPy.
+Deleting a lesson clears its bit and count in every bitmap of the course;
+its position is never given to another lesson.
+"""
+import numpy as np
+from django.db import connection
+
+from .models import Enrollment, LessonProgress
+
+# The stored bitmap padded with zero bytes so bit %(position)s exists
+_PADDED = (
+    "(p.completed || substring(%(zeros)s::bytea from 1 "
+    "for greatest(%(length)s - length(p.completed), 0)))"
+)
+
+_UPSERT = f"""
+    INSERT INTO {LessonProgress._meta.db_table} AS p (student_id, course_id, completed, completed_count, updated_at)
+    VALUES (%(student)s, %(course)s, %(initial)s, %(initial_count)s, now())
+    ON CONFLICT (student_id, course_id) DO UPDATE SET
+        completed = set_bit({_PADDED}, %(position)s, %(value)s),
+        completed_count = p.completed_count + %(value)s - get_bit({_PADDED}, %(position)s),
+        updated_at = now()
+    RETURNING completed_count
+"""
+
+
+def set_lesson_completed(student_id, lesson, completed=True):
+    """Mark one lesson complete (or not) for a student; return the new completed count"""
+    length = lesson.position // 8 + 1
+    initial = bytearray(length)
+    if completed:
+        initial[lesson.position // 8] = 1 << (lesson.position % 8)
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT, {
+            'student': student_id,
+            'course': lesson.course_id,
+            'initial': bytes(initial),
+            'initial_count': int(completed),
+            'zeros': bytes(length),
+            'length': length,
+            'position': lesson.position,
+            'value': int(completed),
+        })
+        return cursor.fetchone()[0]
+
+
+_CLEAR = f"""
+    UPDATE {LessonProgress._meta.db_table} SET
+        completed = set_bit(completed, %(position)s, 0),
+        completed_count = completed_count - 1,
+        updated_at = now()
+    WHERE course_id = %(course)s
+        AND length(completed) > %(position)s / 8
+        AND get_bit(completed, %(position)s) = 1
+"""
+
+
+def clear_lesson_completion(lesson):
+    """Unmark a lesson for every student of its course; returns the number of students it was complete for"""
+    with connection.cursor() as cursor:
+        cursor.execute(_CLEAR, {'course': lesson.course_id, 'position': lesson.position})
+        return cursor.rowcount
+
+
+def completion_bits(bitmaps, width):
+    """
+    Unpack bitmaps into a boolean (bitmaps x width) matrix.
+
+    Bitmaps shorter than ``width`` bits (lessons added after the last write)
+    are zero padded.
+    """
+    nbytes = (width + 7) // 8
+    packed = np.frombuffer(
+        b''.join(bytes(bitmap)[:nbytes].ljust(nbytes, b'\0') for bitmap in bitmaps), dtype=np.uint8,
+    ).reshape(len(bitmaps), nbytes)
+    return np.unpackbits(packed, axis=1, count=width, bitorder='little').astype(bool)
+
+
+def course_completion_rates(course, lessons):
+    """
+    Completion statistics of ``lessons`` across the course's enrolled students.
+
+    Courses without enrollments fall back to every student with progress.
+    """
+    progress = LessonProgress.objects.filter(course=course)
+    enrolled = Enrollment.objects.filter(course=course, status='enrolled')
+    students = enrolled.count()
+    if students:
+        progress = progress.filter(student__in=enrolled.values('student_id'))
+    bitmaps = list(progress.values_list('completed', flat=True))
+    students = students or len(bitmaps)
+
+    positions = np.array([lesson.position for lesson in lessons], dtype=np.int64)
+    width = int(positions.max()) + 1 if len(positions) else 0
+    done = completion_bits(bitmaps, width)[:, positions]
+    per_lesson = done.sum(axis=0)
+    per_student = done.sum(axis=1)
+
+    return {
+        'students': students,
+        'students_with_progress': len(bitmaps),
+        'lessons': [
+            {
+                'id': lesson.id,
+                'title': lesson.title,
+                'order': lesson.order,
+                'completed': int(count),
+                'completion_rate': round(float(count) / students, 4) if students else 0.0,
+            }
+            for lesson, count in zip(lessons, per_lesson)
+        ],
+        'average_completion': (
+            round(float(per_student.sum()) / (students * len(lessons)), 4) if students and lessons else 0.0
+        ),
+        'fully_completed': int((per_student == len(lessons)).sum()) if lessons else 0,
+    }
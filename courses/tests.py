@@ -0,0 +1,268 @@
+import threading
+from unittest import skipUnless
+
+from datetime import date
+
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from schedule.caching import get_events_version
+from schedule.models import Event
+from users.models import User
+from .models import Course, Enrollment, Grade, Lesson, LessonProgress
+from .enrollment import drop, enroll, fill_from_waitlist
+from .gradebook import grade_statistics, upsert_grades
+from .progress import set_lesson_completed
+
+
+def make_lesson(course, number):
+    return Lesson.objects.create(
+        course=course, title=f'Lesson {number}', short_description='Short', full_text='Text', order=number,
+    )
+
+
+class LessonPositionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+
+    def test_positions_of_deleted_lessons_are_not_reused(self):
+        first = make_lesson(self.course, 1)
+        last = make_lesson(self.course, 2)
+        Lesson.objects.filter(pk=last.pk).delete()
+
+        replacement = make_lesson(self.course, 3)
+
+        self.assertEqual(first.position, 0)
+        self.assertEqual(last.position, 1)
+        self.assertEqual(replacement.position, 2)
+
+    def test_positions_continue_after_lessons_without_counter(self):
+        # Lessons positioned before the course had a counter
+        Lesson.objects.bulk_create([
+            Lesson(course=self.course, title='Old', short_description='Short', full_text='Text', order=1, position=4),
+        ])
+
+        self.assertEqual(make_lesson(self.course, 2).position, 5)
+
+    def test_saving_a_loaded_course_keeps_the_counter(self):
+        course = Course.objects.get(pk=self.course.pk)
+        make_lesson(self.course, 1)
+        course.title = 'Linear algebra'
+        course.save()
+
+        self.assertEqual(make_lesson(self.course, 2).position, 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'progress bitmaps use PostgreSQL bit functions')
+class LessonDeleteProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.student = User.objects.create_user(email='student@example.com', password='secret', user_role='student')
+        cls.course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        Enrollment.objects.create(course=cls.course, student=cls.student, status='enrolled', requested_at=timezone.now())
+
+    def test_deleting_a_completed_lesson_clears_its_bit_and_count(self):
+        first = make_lesson(self.course, 1)
+        last = make_lesson(self.course, 2)
+        set_lesson_completed(self.student.id, first)
+        set_lesson_completed(self.student.id, last)
+
+        last.delete()
+        replacement = make_lesson(self.course, 3)
+
+        progress = LessonProgress.objects.get(student=self.student, course=self.course)
+        self.assertEqual(progress.completed_count, 1)
+        self.assertEqual(bytes(progress.completed), b'\x01')
+        self.assertEqual(set_lesson_completed(self.student.id, replacement, completed=False), 1)
+
+
+def make_students(count):
+    return [
+        User.objects.create_user(email=f'student{number}@example.com', password='secret', user_role='student')
+        for number in range(count)
+    ]
+
+
+class EnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.course = Course.objects.create(
+            title='Algebra', description='Groups and rings', created_by=cls.professor, capacity=2,
+        )
+        cls.students = make_students(4)
+
+    def statuses(self):
+        return dict(Enrollment.objects.filter(course=self.course).values_list('student__email', 'status'))
+
+    def enrolled_count(self):
+        return Course.objects.get(pk=self.course.pk).enrolled_count
+
+    def test_full_course_waitlists(self):
+        results = [enroll(self.course, student) for student in self.students]
+
+        self.assertEqual(
+            [enrollment.status for enrollment, changed in results],
+            ['enrolled', 'enrolled', 'waitlisted', 'waitlisted'],
+        )
+        self.assertEqual(self.enrolled_count(), 2)
+        self.assertFalse(enroll(self.course, self.students[0])[1])
+
+    def test_drop_passes_the_seat_to_the_waitlist_head(self):
+        for student in self.students:
+            enroll(self.course, student)
+
+        enrollment, promoted = drop(self.course, self.students[0])
+
+        self.assertEqual(enrollment.status, 'dropped')
+        self.assertEqual(promoted.student, self.students[2])
+        self.assertEqual(self.statuses()[self.students[3].email], 'waitlisted')
+        self.assertEqual(self.enrolled_count(), 2)
+
+    def test_drop_without_waitlist_frees_the_seat(self):
+        enroll(self.course, self.students[0])
+
+        self.assertIsNone(drop(self.course, self.students[0])[1])
+        self.assertEqual(self.enrolled_count(), 0)
+        self.assertEqual(drop(self.course, self.students[0]), (None, None))
+
+    def test_re_enrolling_after_a_drop_joins_the_back_of_the_waitlist(self):
+        for student in self.students[:3]:
+            enroll(self.course, student)
+        drop(self.course, self.students[0])
+
+        enrollment, changed = enroll(self.course, self.students[0])
+
+        self.assertTrue(changed)
+        self.assertEqual(enrollment.status, 'waitlisted')
+        enroll(self.course, self.students[3])
+        Course.objects.filter(pk=self.course.pk).update(capacity=4)
+        promoted = fill_from_waitlist(self.course)
+        self.assertEqual([e.student for e in promoted], [self.students[0], self.students[3]])
+        self.assertEqual(self.enrolled_count(), 4)
+
+    def test_status_changes_invalidate_cached_agendas(self):
+        enroll(self.course, self.students[0])
+        version = get_events_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            drop(self.course, self.students[0])
+        self.assertGreater(get_events_version(), version)
+
+        version = get_events_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            enroll(self.course, self.students[1])
+            # Already enrolled: nothing changes
+            enroll(self.course, self.students[1])
+        self.assertGreater(get_events_version(), version)
+        self.assertEqual(len(callbacks), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row locks and concurrent connections')
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    def test_concurrent_enrollments_never_oversell(self):
+        professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(
+            title='Algebra', description='Groups and rings', created_by=professor, capacity=5,
+        )
+        students = make_students(20)
+        barrier = threading.Barrier(len(students))
+
+        def register(student):
+            try:
+                barrier.wait()
+                enroll(course, student)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=register, args=[student]) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Enrollment.objects.filter(course=course, status='enrolled').count(), 5)
+        self.assertEqual(Enrollment.objects.filter(course=course, status='waitlisted').count(), 15)
+        self.assertEqual(Course.objects.get(pk=course.pk).enrolled_count, 5)
+
+
+class GradeStatisticsTests(SimpleTestCase):
+    def test_scores_are_compared_as_percentages(self):
+        rows = [(10, 1, 50, 100), (10, 2, 100, 100), (20, 1, 8, 10)]
+
+        stats = grade_statistics(rows)
+
+        first, second = stats['events']
+        self.assertEqual((first['event'], first['count'], first['mean'], first['std']), (10, 2, 75.0, 25.0))
+        self.assertEqual(first['percentiles']['50'], 75.0)
+        # 50% in the sixth bucket, 100% in the last
+        self.assertEqual(first['histogram'], [0, 0, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual((second['event'], second['count'], second['mean']), (20, 1, 80.0))
+        self.assertEqual(stats['students'], [
+            {'student': 1, 'average_percent': 65.0, 'average_z_score': -0.5, 'z_scores': {'10': -1.0, '20': 0.0}},
+            {'student': 2, 'average_percent': 100.0, 'average_z_score': 1.0, 'z_scores': {'10': 1.0}},
+        ])
+        self.assertEqual((stats['course']['mean'], stats['course']['median']), (82.5, 82.5))
+
+    def test_no_grades(self):
+        self.assertEqual(
+            grade_statistics([], bins=5), {'events': [], 'students': [], 'course': None, 'histogram_bins': 5},
+        )
+
+
+@override_settings(EVENT_IMPORT_MAX_REPORTED_ERRORS=1)
+class UpsertGradesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        cls.students = make_students(3)
+        for student in cls.students[:2]:
+            Enrollment.objects.create(
+                course=cls.course, student=student, status='enrolled', requested_at=timezone.now(),
+            )
+        cls.exam = Event.objects.create(
+            title='Midterm', creator=cls.professor, course=cls.course, event_type='exam',
+            assigned_date=date(2025, 3, 3),
+        )
+
+    def scores(self):
+        return dict(Grade.objects.filter(event=self.exam).values_list('student__email', 'score'))
+
+    def test_rows_are_validated_and_upserted_in_batches(self):
+        first, second, outsider = self.students
+        rows = [
+            (1, {'student': str(first.id), 'score': '40'}),
+            (2, {'student': 'STUDENT1@example.com', 'score': 55}),
+            (3, {'student': outsider.email, 'score': 70}),
+            (4, {'student': first.id, 'score': 'absent'}),
+            # A later row for the same student in the batch wins
+            (5, {'student': first.id, 'score': 45}),
+            (6, {'student': first.id, 'score': 48}),
+        ]
+
+        result = upsert_grades(self.course, self.exam, rows, self.professor, batch_size=2)
+
+        self.assertEqual((result['total_rows'], result['saved'], result['failed']), (6, 3, 2))
+        self.assertEqual(result['errors'], [
+            {'row': 3, 'errors': [f"Student {outsider.email!r} is not enrolled in this course"]},
+        ])
+        self.assertEqual(self.scores(), {first.email: 48.0, second.email: 55.0})
+
+        result = upsert_grades(self.course, self.exam, [(1, {'student': second.id, 'score': 9})], self.professor, 10)
+
+        self.assertEqual(result['saved'], 1)
+        self.assertEqual(self.scores(), {first.email: 48.0, second.email: 9.0})
+        self.assertEqual(Grade.objects.get(event=self.exam, student=second).max_score, 10)
+
+    def test_scores_outside_the_range_fail(self):
+        rows = [(1, {'student': self.students[0].id, 'score': 101})]
+
+        result = upsert_grades(self.course, self.exam, rows, self.professor)
+
+        self.assertEqual(result['errors'], [{'row': 1, 'errors': ['score must be between 0 and 100']}])
+        self.assertEqual(Grade.objects.count(), 0)
@@ -9,6 +9,22 @@ urlpatterns = [
     path('<int:course_id>/update/', views.api_update_course, name='api-update-course'),
     path('<int:course_id>/delete/', views.api_delete_course, name='api-delete-course'),
     
+    # Enrollment endpoints
+    path('<int:course_id>/enroll/', views.api_enroll, name='api-enroll'),
+    path('<int:course_id>/drop/', views.api_drop, name='api-drop'),
+    path('<int:course_id>/enrollments/', views.api_course_enrollments, name='api-course-enrollments'),
+    path('enrollments/', views.api_my_enrollments, name='api-my-enrollments'),
+    
+    # Gradebook endpoints
+    path('<int:course_id>/grades/', views.api_course_grades, name='api-course-grades'),
+    path('<int:course_id>/grades/upload/', views.api_upload_grades, name='api-upload-grades'),
+    path('<int:course_id>/grades/stats/', views.api_course_grade_stats, name='api-course-grade-stats'),
+    
+    # Progress endpoints
+    path('<int:course_id>/progress/', views.api_course_progress, name='api-course-progress'),
+    path('<int:course_id>/progress/stats/', views.api_course_progress_stats, name='api-course-progress-stats'),
+    path('lessons/<int:lesson_id>/complete/', views.api_complete_lesson, name='api-complete-lesson'),
+    
     # Lesson endpoints
     path('lessons/', views.api_lessons_list, name='api-lessons-list'),
     path('lessons/<int:lesson_id>/', views.api_lesson_detail, name='api-lesson-detail'),
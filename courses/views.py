@@ -1,40 +1,48 @@
+import csv
 import json
 import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.core.paginator import Paginator
 
-from .models import Course, Lesson
+from jobs.tasks import purge_deleted
+from jobs.views import job_to_dict
+from mediastore.images import image_variants_to_dict
+from schedule.models import Event
+from .caching import bump_grades_version, catalog_cache, get_grades_version
+from .enrollment import drop, enroll, fill_from_waitlist
+from .gradebook import grade_statistics, parse_grades_csv, upsert_grades
+from .models import Course, Enrollment, Grade, Lesson, LessonProgress
+from .progress import completion_bits, course_completion_rates, set_lesson_completed
+from university_core.asyncviews import apaginate
+from university_core.db.routers import primary_reads
 from users.jwt_utils import jwt_required
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
 
-@jwt_required
-def api_courses_list(request):
-    """API endpoint to list courses"""
-    logger.info(f"Courses list accessed by: {request.user.email} (Role: {request.user.user_role})")
-    courses = Course.objects.all().order_by('-created_at')
-    
-    # Filter by active status if specified
-    is_active = request.GET.get('is_active')
+def _course_catalog_page(is_active, active_only, page):
+    """One page of the course list as returned by ``api_courses_list``"""
+    courses = (
+        Course.objects.select_related('created_by')
+        .annotate(lesson_total=Count('lessons'))
+        .order_by('-created_at')
+    )
     if is_active is not None:
-        courses = courses.filter(is_active=is_active.lower() == 'true')
-    
-    # If user is not admin or professor, only show active courses
-    if request.user.user_role not in ['admin', 'professor']:
+        courses = courses.filter(is_active=is_active)
+    if active_only:
         courses = courses.filter(is_active=True)
     
-    # Pagination
-    page = request.GET.get('page', 1)
     paginator = Paginator(courses, 20)
     courses_page = paginator.get_page(page)
     
-    logger.debug(f"Returning {len(courses_page)} courses (page {page}) to {request.user.email}")
-    
     courses_data = []
     for course in courses_page:
         courses_data.append({
@@ -43,14 +51,18 @@ def api_courses_list(request):
             'description': course.description,
             'created_by': course.created_by.id,
             'created_by_name': course.created_by_name,
-            'lessons_count': course.lessons_count,
+            'lessons_count': course.lesson_total,
+            'capacity': course.capacity,
+            'enrolled_count': course.enrolled_count,
+            'seats_left': course.seats_left,
             'is_active': course.is_active,
             'image_url': course.image.url if course.image else None,
+            'image_variants': image_variants_to_dict(course.image, course.image_variants),
             'created_at': course.created_at.isoformat(),
             'updated_at': course.updated_at.isoformat(),
         })
     
-    return JsonResponse({
+    return {
         'success': True,
         'courses': courses_data,
         'pagination': {
@@ -60,14 +72,46 @@ def api_courses_list(request):
             'has_next': courses_page.has_next(),
             'has_previous': courses_page.has_previous(),
         }
-    })
+    }
+
+
+@jwt_required
+async def api_courses_list(request):
+    """API endpoint to list courses, served from the catalog cache"""
+    logger.info(f"Courses list accessed by: {request.user.email} (Role: {request.user.user_role})")
+    
+    # Filter by active status if specified
+    is_active = request.GET.get('is_active')
+    if is_active is not None:
+        is_active = is_active.lower() == 'true'
+    
+    # If user is not admin or professor, only show active courses
+    active_only = request.user.user_role not in ['admin', 'professor']
+    
+    # Pagination; anything that is not a page number shows the first page
+    page = request.GET.get('page', 1)
+    try:
+        page = int(page)
+    except (TypeError, ValueError):
+        page = 1
+    
+    payload = await catalog_cache.aget_or_compute(
+        f'{is_active}:{active_only}:{page}',
+        lambda: _course_catalog_page(is_active, active_only, page),
+    )
+    
+    logger.debug(f"Returning {len(payload['courses'])} courses (page {page}) to {request.user.email}")
+    return JsonResponse(payload)
 
 
 @jwt_required
-def api_course_detail(request, course_id):
+async def api_course_detail(request, course_id):
     """API endpoint to get course details"""
     logger.info(f"Course detail accessed: Course ID {course_id} by {request.user.email}")
-    course = get_object_or_404(Course, id=course_id)
+    try:
+        course = await Course.objects.select_related('created_by').aget(id=course_id)
+    except Course.DoesNotExist:
+        raise Http404('No Course matches the given query.')
     
     # If user is not admin or professor, only show active courses
     if request.user.user_role not in ['admin', 'professor'] and not course.is_active:
@@ -79,7 +123,7 @@ def api_course_detail(request, course_id):
     # Get lessons for this course
     lessons = course.lessons.all().order_by('order')
     lessons_data = []
-    for lesson in lessons:
+    async for lesson in lessons:
         lessons_data.append({
             'id': lesson.id,
             'title': lesson.title,
@@ -87,6 +131,7 @@ def api_course_detail(request, course_id):
             'full_text': lesson.full_text,
             'order': lesson.order,
             'image_url': lesson.image.url if lesson.image else None,
+            'image_variants': image_variants_to_dict(lesson.image, lesson.image_variants),
             'created_at': lesson.created_at.isoformat(),
             'updated_at': lesson.updated_at.isoformat(),
         })
@@ -97,10 +142,14 @@ def api_course_detail(request, course_id):
         'description': course.description,
         'created_by': course.created_by.id,
         'created_by_name': course.created_by_name,
-        'lessons_count': course.lessons_count,
+        'lessons_count': len(lessons_data),
+        'capacity': course.capacity,
+        'enrolled_count': course.enrolled_count,
+        'seats_left': course.seats_left,
         'lessons': lessons_data,
         'is_active': course.is_active,
         'image_url': course.image.url if course.image else None,
+        'image_variants': image_variants_to_dict(course.image, course.image_variants),
         'created_at': course.created_at.isoformat(),
         'updated_at': course.updated_at.isoformat(),
     }
@@ -140,12 +189,19 @@ def api_create_course(request):
                 'error': 'Description is required'
             }, status=400)
         
+        capacity = data.get('capacity')
+        if capacity is not None and (not isinstance(capacity, int) or capacity < 0):
+            return JsonResponse({
+                'error': 'Capacity must be a non-negative integer'
+            }, status=400)
+        
         # Create course
         course = Course.objects.create(
             title=data['title'],
             description=data['description'],
             created_by=request.user,
-            is_active=data.get('is_active', True)
+            is_active=data.get('is_active', True),
+            capacity=capacity
         )
         
         logger.info(f"Course created successfully: '{course.title}' (ID: {course.id}) by {request.user.email}")
@@ -157,8 +213,12 @@ def api_create_course(request):
             'created_by': course.created_by.id,
             'created_by_name': course.created_by_name,
             'lessons_count': course.lessons_count,
+            'capacity': course.capacity,
+            'enrolled_count': course.enrolled_count,
+            'seats_left': course.seats_left,
             'is_active': course.is_active,
             'image_url': course.image.url if course.image else None,
+            'image_variants': image_variants_to_dict(course.image, course.image_variants),
             'created_at': course.created_at.isoformat(),
             'updated_at': course.updated_at.isoformat(),
         }
@@ -206,9 +266,23 @@ def api_update_course(request, course_id):
             course.description = data['description']
         if 'is_active' in data:
             course.is_active = data['is_active']
+        if 'capacity' in data:
+            capacity = data['capacity']
+            if capacity is not None and (not isinstance(capacity, int) or capacity < course.enrolled_count):
+                return JsonResponse({
+                    'error': f'Capacity must be an integer of at least {course.enrolled_count} (currently enrolled)'
+                }, status=400)
+            course.capacity = capacity
         
         course.save()
         
+        # Extra seats go to the waitlist first
+        if 'capacity' in data:
+            promoted = fill_from_waitlist(course)
+            if promoted:
+                logger.info(f"Promoted {len(promoted)} waitlisted students in Course ID {course.id}")
+                course.refresh_from_db(fields=['enrolled_count'])
+        
         logger.info(f"Course updated successfully: '{course.title}' (ID: {course.id}) by {request.user.email}")
         
         course_data = {
@@ -218,8 +292,12 @@ def api_update_course(request, course_id):
             'created_by': course.created_by.id,
             'created_by_name': course.created_by_name,
             'lessons_count': course.lessons_count,
+            'capacity': course.capacity,
+            'enrolled_count': course.enrolled_count,
+            'seats_left': course.seats_left,
             'is_active': course.is_active,
             'image_url': course.image.url if course.image else None,
+            'image_variants': image_variants_to_dict(course.image, course.image_variants),
             'created_at': course.created_at.isoformat(),
             'updated_at': course.updated_at.isoformat(),
         }
@@ -246,7 +324,12 @@ def api_update_course(request, course_id):
 @jwt_required
 @require_http_methods(["DELETE"])
 def api_delete_course(request, course_id):
-    """API endpoint to delete course"""
+    """
+    API endpoint to delete course.
+
+    The course disappears at once; its lessons, enrollments and files are
+    removed by a background job, whose progress is at ``/jobs/<id>/``.
+    """
     logger.info(f"Course deletion attempt: Course ID {course_id} by {request.user.email}")
     course = get_object_or_404(Course, id=course_id)
     
@@ -258,17 +341,20 @@ def api_delete_course(request, course_id):
         }, status=403)
     
     course_title = course.title
-    course.delete()
+    with transaction.atomic():
+        course.soft_delete()
+        job = purge_deleted.enqueue(model='courses.Course', pk=course.id, created_by=request.user)
     
     logger.info(f"Course deleted successfully: '{course_title}' (ID: {course_id}) by {request.user.email}")
     return JsonResponse({
         'success': True,
-        'message': 'Course deleted successfully'
-    })
+        'message': 'Course deleted successfully',
+        'job': job_to_dict(job)
+    }, status=202)
 
 
 @jwt_required
-def api_lessons_list(request):
+async def api_lessons_list(request):
     """API endpoint to list lessons"""
     course_id = request.GET.get('course')
     logger.info(f"Lessons list accessed by: {request.user.email} (Course ID: {course_id if course_id else 'all'})")
@@ -284,8 +370,8 @@ def api_lessons_list(request):
     
     # Pagination
     page = request.GET.get('page', 1)
-    paginator = Paginator(lessons, 20)
-    lessons_page = paginator.get_page(page)
+    lessons_page = await apaginate(lessons, page, 20)
+    paginator = lessons_page.paginator
     
     lessons_data = []
     for lesson in lessons_page:
@@ -298,6 +384,7 @@ def api_lessons_list(request):
             'full_text': lesson.full_text,
             'order': lesson.order,
             'image_url': lesson.image.url if lesson.image else None,
+            'image_variants': image_variants_to_dict(lesson.image, lesson.image_variants),
             'created_at': lesson.created_at.isoformat(),
             'updated_at': lesson.updated_at.isoformat(),
         })
@@ -337,6 +424,7 @@ def api_lesson_detail(request, lesson_id):
         'full_text': lesson.full_text,
         'order': lesson.order,
         'image_url': lesson.image.url if lesson.image else None,
+        'image_variants': image_variants_to_dict(lesson.image, lesson.image_variants),
         'created_at': lesson.created_at.isoformat(),
         'updated_at': lesson.updated_at.isoformat(),
     }
@@ -410,6 +498,7 @@ def api_create_lesson(request):
             'full_text': lesson.full_text,
             'order': lesson.order,
             'image_url': lesson.image.url if lesson.image else None,
+            'image_variants': image_variants_to_dict(lesson.image, lesson.image_variants),
             'created_at': lesson.created_at.isoformat(),
             'updated_at': lesson.updated_at.isoformat(),
         }
@@ -480,6 +569,7 @@ def api_update_lesson(request, lesson_id):
             'full_text': lesson.full_text,
             'order': lesson.order,
             'image_url': lesson.image.url if lesson.image else None,
+            'image_variants': image_variants_to_dict(lesson.image, lesson.image_variants),
             'created_at': lesson.created_at.isoformat(),
             'updated_at': lesson.updated_at.isoformat(),
         }
@@ -524,4 +614,377 @@ def api_delete_lesson(request, lesson_id):
     return JsonResponse({
         'success': True,
         'message': 'Lesson deleted successfully'
-    })
\ No newline at end of file
+    })
+
+
+def _enrollment_to_dict(enrollment):
+    data = {
+        'id': enrollment.id,
+        'course': enrollment.course_id,
+        'student': enrollment.student_id,
+        'status': enrollment.status,
+        'requested_at': enrollment.requested_at.isoformat(),
+        'enrolled_at': enrollment.enrolled_at.isoformat() if enrollment.enrolled_at else None,
+    }
+    if enrollment.status == 'waitlisted':
+        data['waitlist_position'] = Enrollment.objects.filter(
+            course_id=enrollment.course_id,
+            status='waitlisted',
+            requested_at__lte=enrollment.requested_at,
+        ).count()
+    return data
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def api_enroll(request, course_id):
+    """API endpoint to enroll the current student in a course, or join its waitlist"""
+    logger.info(f"Enrollment attempt: Course ID {course_id} by {request.user.email}")
+    if request.user.user_role != 'student':
+        return JsonResponse({
+            'error': 'Only students can enroll in courses'
+        }, status=403)
+    
+    course = get_object_or_404(Course, id=course_id, is_active=True)
+    try:
+        enrollment, changed = enroll(course, request.user)
+    except Exception as e:
+        logger.error(f"Enrollment error for Course ID {course_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to enroll'
+        }, status=500)
+    
+    if changed:
+        logger.info(f"Student {request.user.email} {enrollment.status} in Course ID {course_id}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Enrolled successfully' if enrollment.status == 'enrolled' else 'Added to the waitlist',
+        'enrollment': _enrollment_to_dict(enrollment)
+    }, status=201 if changed else 200)
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["DELETE"])
+def api_drop(request, course_id):
+    """API endpoint to drop the current student's enrollment or waitlist place"""
+    logger.info(f"Drop attempt: Course ID {course_id} by {request.user.email}")
+    course = get_object_or_404(Course, id=course_id)
+    try:
+        enrollment, promoted = drop(course, request.user)
+    except Exception as e:
+        logger.error(f"Drop error for Course ID {course_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to drop enrollment'
+        }, status=500)
+    
+    if enrollment is None:
+        return JsonResponse({
+            'error': 'Not enrolled in this course'
+        }, status=404)
+    if promoted:
+        logger.info(f"Promoted student ID {promoted.student_id} from waitlist in Course ID {course_id}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Enrollment dropped successfully'
+    })
+
+
+@jwt_required
+def api_course_enrollments(request, course_id):
+    """API endpoint to list a course's enrolled and waitlisted students"""
+    course = get_object_or_404(Course, id=course_id)
+    if request.user.user_role != 'admin' and course.created_by != request.user:
+        logger.warning(f"Unauthorized enrollment list access: Course ID {course_id} by {request.user.email}")
+        return JsonResponse({
+            'error': 'Permission denied'
+        }, status=403)
+    
+    enrollments = (
+        Enrollment.objects.filter(course=course, status__in=['enrolled', 'waitlisted'])
+        .select_related('student')
+        .order_by('requested_at', 'id')
+    )
+    enrolled = []
+    waitlist = []
+    for enrollment in enrollments:
+        entry = {
+            'student': enrollment.student.id,
+            'email': enrollment.student.email,
+            'full_name': enrollment.student.full_name,
+            'requested_at': enrollment.requested_at.isoformat(),
+        }
+        if enrollment.status == 'enrolled':
+            entry['enrolled_at'] = enrollment.enrolled_at.isoformat() if enrollment.enrolled_at else None
+            enrolled.append(entry)
+        else:
+            entry['waitlist_position'] = len(waitlist) + 1
+            waitlist.append(entry)
+    
+    return JsonResponse({
+        'success': True,
+        'course': course.id,
+        'capacity': course.capacity,
+        'enrolled_count': course.enrolled_count,
+        'enrolled': enrolled,
+        'waitlist': waitlist,
+    })
+
+
+@jwt_required
+def api_my_enrollments(request):
+    """API endpoint to list the current user's active enrollments"""
+    enrollments = (
+        Enrollment.objects.filter(student=request.user, status__in=['enrolled', 'waitlisted'], course__deleted_at__isnull=True)
+        .select_related('course')
+        .order_by('requested_at')
+    )
+    enrollments_data = []
+    for enrollment in enrollments:
+        data = _enrollment_to_dict(enrollment)
+        data['course_title'] = enrollment.course.title
+        enrollments_data.append(data)
+    
+    return JsonResponse({
+        'success': True,
+        'enrollments': enrollments_data
+    })
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def api_complete_lesson(request, lesson_id):
+    """API endpoint to mark a lesson complete (or, with "completed": false, incomplete)"""
+    lesson = get_object_or_404(Lesson, id=lesson_id)
+    if not Enrollment.objects.filter(course_id=lesson.course_id, student=request.user, status='enrolled').exists():
+        return JsonResponse({
+            'error': 'You are not enrolled in this course'
+        }, status=403)
+    
+    try:
+        data = json.loads(request.body) if request.body else {}
+        completed = data.get('completed', True)
+        if not isinstance(completed, bool):
+            return JsonResponse({
+                'error': 'completed must be true or false'
+            }, status=400)
+        
+        if lesson.position is None:
+            lesson.save(update_fields=['position'])
+        completed_count = set_lesson_completed(request.user.id, lesson, completed)
+        
+        logger.info(f"Lesson ID {lesson_id} marked {'complete' if completed else 'incomplete'} by {request.user.email}")
+        return JsonResponse({
+            'success': True,
+            'lesson': lesson.id,
+            'completed': completed,
+            'completed_count': completed_count
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Lesson completion error for Lesson ID {lesson_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to update progress'
+        }, status=500)
+
+
+@jwt_required
+def api_course_progress(request, course_id):
+    """API endpoint to get the current student's lesson progress in a course"""
+    course = get_object_or_404(Course, id=course_id)
+    lessons = list(course.lessons.order_by('order'))
+    progress = LessonProgress.objects.filter(course=course, student=request.user).values_list(
+        'completed', flat=True
+    ).first()
+    
+    positions = [lesson.position for lesson in lessons if lesson.position is not None]
+    width = max(positions) + 1 if positions else 0
+    done = completion_bits([progress or b''], width)[0]
+    lessons_data = [
+        {
+            'id': lesson.id,
+            'title': lesson.title,
+            'order': lesson.order,
+            'completed': lesson.position is not None and bool(done[lesson.position]),
+        }
+        for lesson in lessons
+    ]
+    completed = sum(lesson['completed'] for lesson in lessons_data)
+    
+    return JsonResponse({
+        'success': True,
+        'course': course.id,
+        'lessons': lessons_data,
+        'completed_count': completed,
+        'lessons_count': len(lessons),
+        'percent_complete': round(100 * completed / len(lessons), 1) if lessons else 0.0
+    })
+
+
+@jwt_required
+def api_course_progress_stats(request, course_id):
+    """API endpoint to get per-lesson completion rates across a course's students"""
+    course = get_object_or_404(Course, id=course_id)
+    if request.user.user_role != 'admin' and course.created_by != request.user:
+        logger.warning(f"Unauthorized progress stats access: Course ID {course_id} by {request.user.email}")
+        return JsonResponse({
+            'error': 'Permission denied'
+        }, status=403)
+    
+    lessons = list(course.lessons.filter(position__isnull=False).order_by('order'))
+    return JsonResponse({
+        'success': True,
+        'course': course.id,
+        **course_completion_rates(course, lessons)
+    })
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def api_upload_grades(request, course_id):
+    """
+    API endpoint to upload grades for an exam or assignment in bulk.
+    
+    Send JSON ``{"event": id, "max_score": 100, "grades": [{"student": id or
+    email, "score": 87.5}]}``, or a multipart CSV ``file`` with ``student`` and
+    ``score`` columns plus ``event`` and ``max_score`` form fields. Existing
+    grades of the same students are replaced.
+    """
+    logger.info(f"Grade upload attempt: Course ID {course_id} by {request.user.email}")
+    course = get_object_or_404(Course, id=course_id)
+    if request.user.user_role != 'admin' and course.created_by != request.user:
+        logger.warning(f"Unauthorized grade upload attempt: Course ID {course_id} by {request.user.email}")
+        return JsonResponse({
+            'error': 'Permission denied'
+        }, status=403)
+    
+    try:
+        upload = request.FILES.get('file')
+        if upload:
+            data = request.POST
+            rows = parse_grades_csv(upload.file)
+        else:
+            data = json.loads(request.body)
+            grades = data.get('grades')
+            if not isinstance(grades, list):
+                return JsonResponse({
+                    'error': 'grades must be a list'
+                }, status=400)
+            rows = ((index, row if isinstance(row, dict) else {}) for index, row in enumerate(grades, start=1))
+        
+        try:
+            max_score = float(data.get('max_score') or 100)
+        except (TypeError, ValueError):
+            max_score = 0
+        if max_score <= 0:
+            return JsonResponse({
+                'error': 'max_score must be a positive number'
+            }, status=400)
+        
+        event = (
+            Event.objects
+            .filter(Q(course=course) | Q(targets__course=course), event_type__in=['exam', 'assignment'])
+            .filter(id=data.get('event') or 0)
+            .first()
+        )
+        if event is None:
+            return JsonResponse({
+                'error': 'event must be an exam or assignment of this course'
+            }, status=400)
+        
+        with transaction.atomic():
+            result = upsert_grades(course, event, rows, request.user, max_score)
+            transaction.on_commit(lambda: bump_grades_version(course.id))
+        
+        logger.info(
+            f"Grades uploaded for Course ID {course_id}, event {event.id} by {request.user.email}: "
+            f"{result['saved']} saved, {result['failed']} failed"
+        )
+        return JsonResponse({
+            'success': True,
+            'event': event.id,
+            **result
+        }, status=201 if result['saved'] else 200)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({
+            'error': f'Could not read grades: {str(e)}'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Grade upload error for Course ID {course_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to upload grades'
+        }, status=500)
+
+
+@jwt_required
+def api_course_grades(request, course_id):
+    """API endpoint to list grades: students see their own, staff all (or one ``student``)"""
+    course = get_object_or_404(Course, id=course_id)
+    grades = Grade.objects.filter(course=course).select_related('event').order_by('event__assigned_date', 'student_id')
+    
+    if request.user.user_role == 'admin' or course.created_by == request.user:
+        if request.GET.get('student'):
+            grades = grades.filter(student_id=request.GET['student'])
+    else:
+        grades = grades.filter(student=request.user)
+    
+    return JsonResponse({
+        'success': True,
+        'course': course.id,
+        'grades': [
+            {
+                'event': grade.event_id,
+                'event_title': grade.event.title,
+                'event_type': grade.event.event_type,
+                'student': grade.student_id,
+                'score': grade.score,
+                'max_score': grade.max_score,
+                'percent': round(100 * grade.score / grade.max_score, 2) if grade.max_score else None,
+                'updated_at': grade.updated_at.isoformat(),
+            }
+            for grade in grades
+        ]
+    })
+
+
+@jwt_required
+def api_course_grade_stats(request, course_id):
+    """API endpoint to get grade statistics per exam/assignment and per student"""
+    course = get_object_or_404(Course, id=course_id)
+    if request.user.user_role != 'admin' and course.created_by != request.user:
+        logger.warning(f"Unauthorized grade statistics access: Course ID {course_id} by {request.user.email}")
+        return JsonResponse({
+            'error': 'Permission denied'
+        }, status=403)
+    
+    cache_key = f'courses:grade_stats:{course.id}:{get_grades_version(course.id)}'
+    stats = cache.get(cache_key)
+    if stats is None:
+        # Stored under the current grades version, so never computed from a lagging replica
+        with primary_reads():
+            rows = list(Grade.objects.filter(course=course).values_list('event_id', 'student_id', 'score', 'max_score'))
+            stats = grade_statistics(rows, settings.GRADE_HISTOGRAM_BINS)
+            titles = dict(
+                Event.objects.filter(id__in=[item['event'] for item in stats['events']]).values_list('id', 'title')
+            )
+        for item in stats['events']:
+            item['title'] = titles.get(item['event'])
+        cache.set(cache_key, stats, settings.GRADE_STATS_CACHE_TIMEOUT)
+    
+    return JsonResponse({
+        'success': True,
+        'course': course.id,
+        **stats
+    })
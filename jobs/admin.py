@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, ScheduledJob
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'queue', 'task')
+    readonly_fields = ('attempts', 'last_error', 'locked_by', 'locked_until', 'created_at', 'finished_at')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Run selected failed jobs again')
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{count} jobs queued again')
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'task', 'interval_seconds', 'next_run_at', 'last_queued_at', 'enabled')
+    list_filter = ('enabled',)
+    readonly_fields = ('last_queued_at',)
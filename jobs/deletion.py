@@ -0,0 +1,66 @@
+"""
+Deleting large object graphs in bounded batches.
+
+``Model.delete()`` collects and deletes everything that cascades from an
+object in one transaction; for a course with many lessons or a professor with
+many courses and events that holds locks for seconds. Instead, views
+soft-delete the object (hiding it at once) and queue ``purge_deleted``, which
+deletes the dependants from the bottom of the cascade upwards, at most
+``JOBS_DELETE_BATCH_SIZE`` rows of a model per transaction, and finally the
+object itself. Each batch is deleted through the ORM, so delete signals fire
+and files are released as usual.
+"""
+import logging
+
+from django.conf import settings
+from django.db import models, transaction
+
+from .queue import set_progress
+
+logger = logging.getLogger(__name__)
+
+
+def _cascading_relations(model):
+    """Reverse relations whose rows are deleted with ``model``'s, including hidden many-to-many ones"""
+    for field in model._meta.get_fields(include_hidden=True):
+        if (
+            field.auto_created and not field.concrete
+            and (field.one_to_many or field.one_to_one)
+            and field.on_delete is models.CASCADE
+        ):
+            yield field
+
+
+def delete_in_batches(queryset, counts, batch_size, _path=()):
+    """
+    Delete ``queryset`` and everything cascading from it, dependants first.
+
+    ``counts`` is updated with the rows deleted per model label.
+    """
+    model = queryset.model
+    for relation in _cascading_relations(model):
+        related = relation.related_model
+        if related in _path:
+            # A cycle; the final delete of this level cascades through it
+            continue
+        children = related._base_manager.filter(**{f'{relation.field.name}__in': queryset.values('pk')})
+        delete_in_batches(children, counts, batch_size, _path + (model,))
+
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            _, deleted = model._base_manager.filter(pk__in=pks).delete()
+        for label, count in deleted.items():
+            counts[label] = counts.get(label, 0) + count
+        set_progress({'deleted': counts})
+
+
+def purge_deleted(model, pk):
+    """Remove a soft-deleted object and everything under it; returns the rows deleted per model"""
+    queryset = model._base_manager.filter(pk=pk, deleted_at__isnull=False)
+    counts = {}
+    delete_in_batches(queryset, counts, settings.JOBS_DELETE_BATCH_SIZE)
+    logger.info(f"Purged {model._meta.label} {pk}: {sum(counts.values())} rows")
+    return counts
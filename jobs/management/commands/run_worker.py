@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs and scheduled jobs until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Jobs run in parallel',
+        )
+        parser.add_argument(
+            '--queues',
+            default='default',
+            help='Comma-separated queues to take jobs from',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds between polls of an empty queue (default: JOBS_POLL_INTERVAL)',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        queues = [name.strip() for name in options['queues'].split(',') if name.strip()]
+        worker = Worker(queues, max(options['concurrency'], 1), options['poll_interval'])
+        worker.run(burst=options['burst'])
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One run of a registered task, queued in the database.
+
+    Workers claim due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` and hold
+    them for ``locked_until``; a job whose worker died is queued again once
+    that lease runs out. Failed attempts are retried with exponential backoff
+    until ``max_attempts`` is reached.
+    """
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=200, help_text="Registered name of the task to run")
+    kwargs = models.JSONField(default=dict, blank=True, help_text="Keyword arguments of the task")
+    queue = models.CharField(max_length=50, default='default', help_text="Queue the job is taken from")
+    priority = models.SmallIntegerField(default=0, help_text="Lower runs first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now, help_text="Earliest time the job may run")
+    attempts = models.PositiveSmallIntegerField(default=0, help_text="Attempts started so far")
+    max_attempts = models.PositiveSmallIntegerField(default=5, help_text="Attempts before the job fails")
+    progress = models.JSONField(null=True, blank=True, help_text="Progress the task reported while running")
+    result = models.JSONField(null=True, blank=True, help_text="Value the task returned")
+    last_error = models.TextField(blank=True, help_text="Traceback of the last failed attempt")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text="User whose request queued the job; they may follow its progress"
+    )
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker running the job")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Lease of the running worker")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['queue', 'priority', 'run_at'], name='job_queued_idx', condition=models.Q(status='queued')
+            ),
+            models.Index(fields=['locked_until'], name='job_running_idx', condition=models.Q(status='running')),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class ScheduledJob(models.Model):
+    """Task queued every ``interval_seconds`` by whichever worker gets to it first"""
+    
+    name = models.CharField(max_length=100, unique=True, help_text="Unique name of the schedule")
+    task = models.CharField(max_length=200, help_text="Registered name of the task to run")
+    kwargs = models.JSONField(default=dict, blank=True, help_text="Keyword arguments of the task")
+    queue = models.CharField(max_length=50, default='default', help_text="Queue the jobs go to")
+    interval_seconds = models.PositiveIntegerField(help_text="Seconds between runs")
+    next_run_at = models.DateTimeField(default=timezone.now, help_text="When the next job is queued")
+    last_queued_at = models.DateTimeField(null=True, blank=True)
+    enabled = models.BooleanField(default=True)
+    
+    class Meta:
+        db_table = 'scheduled_jobs'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} (every {self.interval_seconds}s)"
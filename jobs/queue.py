@@ -0,0 +1,187 @@
+"""
+Background job queue stored in the database, with no external broker.
+
+Register a function with ``@task`` in an app's ``tasks`` module and queue it
+with ``f.enqueue(**kwargs)``; ``manage.py run_worker`` runs it. Enqueueing
+inside a transaction is atomic with the rest of the transaction: the job
+becomes visible to workers only if it commits. Keyword arguments and return
+values must be JSON serializable.
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+# Job being run by the current thread, for set_progress
+_current = threading.local()
+
+
+class Task:
+    def __init__(self, func, name, queue, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, delay=None, priority=0, created_by=None, **kwargs):
+        """Queue a run of the task, ``delay`` seconds from now if given"""
+        return enqueue(self.name, kwargs, delay=delay, priority=priority, created_by=created_by)
+
+
+def task(name=None, queue='default', max_attempts=None):
+    """Register a function as a task, named ``<module>.<function>`` by default"""
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', queue, max_attempts)
+        _registry[registered.name] = registered
+        return registered
+    return register
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'No task named {name!r} is registered')
+
+
+def enqueue(name, kwargs=None, delay=None, priority=0, run_at=None, queue=None, created_by=None):
+    """Queue a run of the registered task ``name`` and return the Job"""
+    registered = get_task(name)
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    return Job.objects.create(
+        task=name,
+        kwargs=kwargs or {},
+        queue=queue or registered.queue,
+        priority=priority,
+        run_at=run_at,
+        max_attempts=registered.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        created_by=created_by,
+    )
+
+
+def claim(worker_id, queues, limit):
+    """Take up to ``limit`` due jobs of ``queues`` for ``worker_id``, skipping those others hold"""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', queue__in=queues, run_at__lte=now)
+            .order_by('priority', 'run_at')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status='running',
+                attempts=F('attempts') + 1,
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            )
+    for job in jobs:
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker_id
+    return jobs
+
+
+def renew_leases(worker_id, job_ids):
+    """Extend the leases of jobs ``worker_id`` is still running"""
+    if job_ids:
+        Job.objects.filter(id__in=job_ids, status='running', locked_by=worker_id).update(
+            locked_until=timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        )
+
+
+def _retry_delay(attempts):
+    delay = min(settings.JOBS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+    # Jitter keeps jobs that failed together from all retrying together
+    return delay * random.uniform(0.5, 1.0)
+
+
+def set_progress(progress):
+    """Record JSON ``progress`` of the job the calling task runs in; a no-op outside jobs"""
+    job = getattr(_current, 'job', None)
+    if job is not None:
+        Job.objects.filter(id=job.id, locked_by=job.locked_by).update(progress=progress)
+
+
+def run(job):
+    """Run a claimed job and record the outcome; returns whether it succeeded"""
+    _current.job = job
+    try:
+        result = get_task(job.task).func(**job.kwargs)
+    except Exception as e:
+        error = traceback.format_exc()
+        finished = job.attempts >= job.max_attempts
+        Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+            status='failed' if finished else 'queued',
+            run_at=timezone.now() + timedelta(seconds=0 if finished else _retry_delay(job.attempts)),
+            last_error=error,
+            locked_by='',
+            locked_until=None,
+            finished_at=timezone.now() if finished else None,
+        )
+        log = logger.error if finished else logger.warning
+        log(f"Job {job.task} #{job.id} failed (attempt {job.attempts} of {job.max_attempts}): {str(e)}")
+        return False
+    finally:
+        _current.job = None
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status='succeeded', result=result, locked_by='', locked_until=None, finished_at=timezone.now()
+    )
+    return True
+
+
+def requeue_expired():
+    """Queue again running jobs whose worker stopped renewing its lease; returns how many"""
+    count = Job.objects.filter(status='running', locked_until__lt=timezone.now()).update(
+        status='queued', locked_by='', locked_until=None
+    )
+    if count:
+        logger.warning(f"Requeued {count} jobs abandoned by their worker")
+    return count
+
+
+def sync_schedules():
+    """Create the schedules of ``JOBS_SCHEDULE`` that are missing; existing rows are left as edited"""
+    for name, schedule in settings.JOBS_SCHEDULE.items():
+        registered = get_task(schedule['task'])
+        ScheduledJob.objects.get_or_create(name=name, defaults={
+            'task': registered.name,
+            'kwargs': schedule.get('kwargs', {}),
+            'queue': registered.queue,
+            'interval_seconds': schedule['interval'],
+        })
+
+
+def enqueue_due_schedules():
+    """Queue a job for each due schedule, once across all workers; returns how many"""
+    now = timezone.now()
+    queued = 0
+    with transaction.atomic():
+        due = ScheduledJob.objects.select_for_update(skip_locked=True).filter(enabled=True, next_run_at__lte=now)
+        for schedule in due:
+            try:
+                enqueue(schedule.task, schedule.kwargs, queue=schedule.queue)
+            except LookupError as e:
+                logger.error(f"Schedule {schedule.name}: {str(e)}")
+            # Missed runs are not caught up, the next one is a full interval away
+            schedule.next_run_at = now + timedelta(seconds=schedule.interval_seconds)
+            schedule.last_queued_at = now
+            schedule.save(update_fields=['next_run_at', 'last_queued_at'])
+            queued += 1
+    return queued
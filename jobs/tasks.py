@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from . import deletion
+from .models import Job
+from .queue import task
+
+
+@task()
+def purge_finished_jobs():
+    """Delete succeeded and failed jobs older than JOBS_KEEP_FINISHED_DAYS"""
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_KEEP_FINISHED_DAYS)
+    Job.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=cutoff).delete()
+
+
+@task()
+def purge_deleted(model, pk):
+    """Remove a soft-deleted course or user and everything under it in batches"""
+    return deletion.purge_deleted(apps.get_model(model), pk)
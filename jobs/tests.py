@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from courses.models import Course, Enrollment, Lesson, LessonProgress
+from users.models import User
+from .deletion import purge_deleted
+from .models import Job, ScheduledJob
+from .queue import claim, enqueue, enqueue_due_schedules, requeue_expired, run, task
+
+calls = []
+
+
+@task(name='jobs.tests.record', max_attempts=3)
+def record(fail=False):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError('boom')
+    return len(calls)
+
+
+@override_settings(JOBS_RETRY_BACKOFF_SECONDS=10, JOBS_RETRY_BACKOFF_MAX=15)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def claim_one(self, worker='worker-1'):
+        jobs = claim(worker, ['default'], 10)
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def test_successful_job_stores_its_result(self):
+        job = record.enqueue()
+
+        self.assertTrue(run(self.claim_one()))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), ('succeeded', 1, 1))
+        self.assertEqual(claim('worker-1', ['default'], 10), [])
+
+    def test_failing_job_retries_with_backoff_until_max_attempts(self):
+        job = record.enqueue(fail=True)
+        # Half to all of 10s, 20s capped at 15s
+        delays = [(5, 10), (7.5, 15)]
+
+        for low, high in delays:
+            started = timezone.now()
+            self.assertFalse(run(self.claim_one()))
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'queued')
+            self.assertIn('RuntimeError: boom', job.last_error)
+            delay = (job.run_at - started).total_seconds()
+            self.assertTrue(low - 1 <= delay <= high + 1, delay)
+            # Not due yet
+            self.assertEqual(claim('worker-1', ['default'], 10), [])
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+
+        self.assertFalse(run(self.claim_one()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(len(calls), 3)
+
+    def test_job_with_an_expired_lease_is_requeued(self):
+        job = record.enqueue()
+        abandoned = self.claim_one('worker-1')
+        self.assertEqual(requeue_expired(), 0)
+
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 1)
+
+        retried = self.claim_one('worker-2')
+        self.assertEqual(retried.attempts, 2)
+        # The first worker finishing late does not overwrite the new attempt
+        run(abandoned)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'worker-2'))
+        run(retried)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_due_schedule_is_enqueued_once(self):
+        schedule = ScheduledJob.objects.create(name='record', task='jobs.tests.record', interval_seconds=3600)
+
+        self.assertEqual(enqueue_due_schedules(), 1)
+        self.assertEqual(enqueue_due_schedules(), 0)
+
+        self.assertEqual(Job.objects.filter(task='jobs.tests.record').count(), 1)
+        schedule.refresh_from_db()
+        self.assertGreater(schedule.next_run_at, timezone.now() + timedelta(minutes=59))
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue('jobs.tests.missing')
+
+
+@override_settings(JOBS_DELETE_BATCH_SIZE=2)
+class PurgeDeletedTests(TestCase):
+    def test_soft_deleted_course_is_purged_with_everything_under_it(self):
+        professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=professor)
+        other = Course.objects.create(title='Topology', description='Open sets', created_by=professor)
+        for number in range(1, 6):
+            for target in (course, other):
+                Lesson.objects.create(
+                    course=target, title=f'Lesson {number}', short_description='Short', full_text='Text', order=number,
+                )
+        for number in range(3):
+            student = User.objects.create_user(
+                email=f'student{number}@example.com', password='secret', user_role='student',
+            )
+            Enrollment.objects.create(course=course, student=student, status='enrolled', requested_at=timezone.now())
+            LessonProgress.objects.create(course=course, student=student, completed=b'\x03', completed_count=2)
+        course.soft_delete()
+
+        counts = purge_deleted(Course, course.pk)
+
+        self.assertEqual(counts, {
+            'courses.Lesson': 5,
+            'courses.Enrollment': 3,
+            'courses.LessonProgress': 3,
+            'courses.Course': 1,
+        })
+        self.assertFalse(Course.all_objects.filter(pk=course.pk).exists())
+        self.assertEqual(Lesson.objects.filter(course=other).count(), 5)
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_course_that_is_not_soft_deleted_is_kept(self):
+        professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=professor)
+
+        self.assertEqual(purge_deleted(Course, course.pk), {})
+        self.assertTrue(Course.objects.filter(pk=course.pk).exists())
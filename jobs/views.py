@@ -0,0 +1,35 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from university_core.db.routers import use_primary
+from users.jwt_utils import jwt_required
+from .models import Job
+
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'task': job.task,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.last_error.strip().splitlines()[-1] if job.last_error else None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@jwt_required
+@use_primary  # polled right after the job is queued, and its row changes as it runs
+def api_job_status(request, job_id):
+    """API endpoint to follow a background job queued by one of the user's requests"""
+    jobs = Job.objects.all()
+    if request.user.user_role != 'admin':
+        jobs = jobs.filter(created_by=request.user)
+    job = get_object_or_404(jobs, id=job_id)
+    return JsonResponse({
+        'success': True,
+        'job': job_to_dict(job)
+    })
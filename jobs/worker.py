@@ -0,0 +1,91 @@
+"""
+Worker process running queued jobs in a thread pool.
+
+The main thread claims as many due jobs as there are idle threads, renews
+the leases of running jobs, queues scheduled jobs and requeues jobs of dead
+workers; each job runs on a pool thread with its own database connection.
+SIGTERM and SIGINT stop claiming and let running jobs finish.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from . import queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, queues=('default',), concurrency=4, poll_interval=None):
+        self.queues = list(queues)
+        self.concurrency = concurrency
+        self.poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self, *args):
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.id} stopping after {len(self._running)} running jobs")
+        self._stopping.set()
+
+    def _execute(self, job):
+        try:
+            started = time.monotonic()
+            if queue.run(job):
+                logger.info(f"Job {job.task} #{job.id} done in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            # Recording the outcome failed; the lease runs out and the job is retried
+            logger.error(f"Job {job.task} #{job.id} could not be recorded: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+            connection.close()
+
+    def _housekeeping(self):
+        queue.renew_leases(self.id, list(self._running))
+        queue.requeue_expired()
+        queue.enqueue_due_schedules()
+
+    def run(self, burst=False):
+        """Process jobs until stopped, or with ``burst`` until no job is due"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        queue.sync_schedules()
+        logger.info(f"Worker {self.id} started on queues {', '.join(self.queues)} with {self.concurrency} threads")
+
+        # Often enough to renew leases well before they run out
+        housekeeping_interval = min(settings.JOBS_LEASE_SECONDS / 3, 30)
+        last_housekeeping = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job') as executor:
+            while not self._stopping.is_set():
+                close_old_connections()
+                if time.monotonic() - last_housekeeping >= housekeeping_interval:
+                    self._housekeeping()
+                    last_housekeeping = time.monotonic()
+
+                idle = self.concurrency - len(self._running)
+                jobs = queue.claim(self.id, self.queues, idle) if idle else []
+                for job in jobs:
+                    with self._lock:
+                        self._running[job.id] = job
+                    executor.submit(self._execute, job)
+
+                if burst and not jobs and not self._running:
+                    break
+                if len(jobs) < idle:
+                    # Fewer due jobs than idle threads: wait before polling again
+                    self._stopping.wait(self.poll_interval)
+                elif not idle:
+                    self._stopping.wait(min(self.poll_interval, 0.1))
+        connection.close()
+        logger.info(f"Worker {self.id} stopped")
@@ -0,0 +1,36 @@
+from django.contrib import admin
+
+from .models import LessonAttachment, MediaBlob, Submission, Upload
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'purpose', 'received', 'size', 'status', 'created_at')
+    list_filter = ('purpose', 'status')
+    search_fields = ('filename', 'owner__email')
+    raw_id_fields = ('owner', 'lesson', 'event')
+    readonly_fields = ('received', 'lease_until', 'created_at', 'updated_at')
+
+
+@admin.register(LessonAttachment)
+class LessonAttachmentAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'lesson', 'size', 'uploaded_by', 'created_at')
+    search_fields = ('filename', 'lesson__title')
+    raw_id_fields = ('lesson', 'uploaded_by')
+    readonly_fields = ('size', 'sha256', 'created_at')
+
+
+@admin.register(Submission)
+class SubmissionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'event', 'student', 'course', 'size', 'submitted_at')
+    list_filter = ('course',)
+    search_fields = ('filename', 'student__email')
+    raw_id_fields = ('event', 'course', 'student')
+    readonly_fields = ('size', 'sha256', 'submitted_at')
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'last_used_at')
+    search_fields = ('name', 'sha256')
+    readonly_fields = ('name', 'sha256', 'size', 'ref_count', 'last_used_at')
@@ -0,0 +1,137 @@
+"""
+Streaming endpoint for upload chunks.
+
+Served as a plain ASGI application (see ``university_core/asgi.py``) because
+Django's ASGI handler reads the whole request body before calling a view.
+Here each body message is written to the partial file as it arrives, in the
+default thread pool, so a slow client costs one waiting task rather than a
+worker; database work (lease, offset) runs in short ``sync_to_async`` calls.
+"""
+import asyncio
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from users.jwt_utils import JWTManager
+from .models import Upload
+from .uploads import ChunkWriter, UploadError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_PATH_RE = re.compile(r'^/files/uploads/(?P<upload_id>[0-9a-f-]{36})/chunk/$')
+
+
+def _run_db(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def _db(func, *args):
+    return await sync_to_async(_run_db)(func, *args)
+
+
+def _load_upload(token, upload_id):
+    user = JWTManager.get_user_from_token(token)
+    if not user or not user.is_active:
+        return None, None
+    return user, Upload.objects.filter(id=upload_id, owner=user).first()
+
+
+async def _send_json(send, status, data):
+    body = json.dumps(data).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_upload_error(send, error):
+    data = {'error': str(error)}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    await _send_json(send, error.status, data)
+
+
+async def _receive_into(writer, receive):
+    """Feed request body messages to ``writer``; False if the client went away"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            message = await asyncio.wait_for(receive(), timeout=settings.UPLOAD_CHUNK_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            raise UploadError('Timed out waiting for chunk data', status=408)
+        if message['type'] == 'http.disconnect':
+            return False
+        body = message.get('body', b'')
+        if body:
+            if writer.lease_due():
+                await _db(writer.renew_lease)
+            await loop.run_in_executor(None, writer.write, body)
+        if not message.get('more_body'):
+            return True
+
+
+async def chunk_application(scope, receive, send):
+    """Store one ``PUT`` chunk of an upload, streaming the body to disk"""
+    if scope['method'] != 'PUT':
+        await _send_json(send, 405, {'error': 'Method not allowed'})
+        return
+
+    headers = dict(scope['headers'])
+    auth_header = headers.get(b'authorization', b'').decode()
+    if not auth_header.startswith('Bearer '):
+        await _send_json(send, 401, {'error': 'Authentication required'})
+        return
+    user, upload = await _db(_load_upload, auth_header.split(' ')[1], CHUNK_PATH_RE.match(scope['path'])['upload_id'])
+    if user is None:
+        await _send_json(send, 401, {'error': 'Invalid or expired token'})
+        return
+    if upload is None:
+        await _send_json(send, 404, {'error': 'Upload not found'})
+        return
+
+    try:
+        offset = int(headers.get(b'upload-offset', b''))
+        length = int(headers.get(b'content-length', b''))
+    except ValueError:
+        await _send_json(send, 400, {'error': 'Upload-Offset and Content-Length headers are required'})
+        return
+
+    try:
+        writer = ChunkWriter(upload, offset, length, headers.get(b'x-chunk-sha256', b'').decode())
+        await _db(writer.claim)
+    except UploadError as e:
+        await _send_upload_error(send, e)
+        return
+
+    try:
+        if not await _receive_into(writer, receive):
+            await _db(writer.abort)
+            return
+        await asyncio.get_running_loop().run_in_executor(None, writer.finish)
+        new_offset = await _db(writer.commit)
+    except UploadError as e:
+        await _db(writer.abort)
+        await _send_upload_error(send, e)
+        return
+    except Exception as e:
+        logger.error(f"Upload chunk error for upload {upload.id} by {user.email}: {str(e)}", exc_info=True)
+        await _db(writer.abort)
+        await _send_json(send, 500, {'error': 'Failed to store chunk'})
+        return
+
+    await _send_json(send, 200, {
+        'success': True,
+        'offset': new_offset,
+        'size': upload.size,
+        'complete': new_offset == upload.size,
+    })
@@ -0,0 +1,154 @@
+"""
+Content-addressed media files.
+
+Course, lesson and profile images are stored under ``blobs/`` by the SHA-256
+of their bytes, so the same banner or avatar uploaded for many objects is one
+file. ``MediaBlob`` rows count the model fields that reference each file:
+``acquire`` and ``release`` adjust the count when a field changes or its
+object is deleted (including by a cascade), and ``collect_garbage`` deletes
+unreferenced files in batches outside any request.
+
+Files that predate content addressing are owned by a single object. When
+released they are recorded as unreferenced rows, so the collector deletes
+them as well.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MediaBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(?:\.\w{1,10})?$')
+
+# Variants of blob images: blobs/ab/cd/variants/<sha256>_<variant>.<hash>.<ext>
+BLOB_VARIANT_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/variants/[0-9a-f]{64}_')
+
+
+def is_blob(name):
+    """Whether ``name`` is a content-addressed file or one of its image variants"""
+    return bool(name) and bool(BLOB_NAME_RE.match(name) or BLOB_VARIANT_RE.match(name))
+
+
+def blob_name(sha256, filename=''):
+    extension = os.path.splitext(filename)[1].lower()
+    if not re.match(r'^\.\w{1,10}$', extension):
+        extension = ''
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def _touch(name, **values):
+    return MediaBlob.objects.filter(name=name).update(last_used_at=timezone.now(), **values)
+
+
+def store_blob(content, filename='', storage=default_storage):
+    """
+    Store ``content`` under its content hash unless that file exists already;
+    return the name. The caller must ``acquire`` it to keep it.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+        size += len(chunk)
+    sha256 = hasher.hexdigest()
+    name = blob_name(sha256, filename)
+
+    # Touching the row first keeps the collector off the file; it waits for
+    # a batch the collector is deleting, after which the row is gone
+    if not _touch(name):
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, sha256=sha256, size=size)
+        except IntegrityError:
+            _touch(name)
+
+    if not storage.exists(name):
+        content.seek(0)
+        stored = storage.save(name, content)
+        if stored != name:
+            # Another request stored the same bytes first
+            storage.delete(stored)
+    return name
+
+
+def acquire(name):
+    """Count a new reference to the file ``name``"""
+    if name and is_blob(name) and not _touch(name, ref_count=F('ref_count') + 1):
+        match = BLOB_NAME_RE.match(name)
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, sha256=match['sha256'] if match else '', ref_count=1)], ignore_conflicts=True
+        )
+
+
+def release(name):
+    """Drop a reference to the file ``name``; unreferenced files are collected later"""
+    if not name:
+        return
+    if is_blob(name):
+        _touch(name, ref_count=F('ref_count') - 1)
+    else:
+        MediaBlob.objects.bulk_create([MediaBlob(name=name)], ignore_conflicts=True)
+
+
+def release_all(names):
+    """``release`` for many files at once, e.g. the variants of a replaced image"""
+    names = [name for name in names if name and not is_blob(name)]
+    MediaBlob.objects.bulk_create([MediaBlob(name=name) for name in names], ignore_conflicts=True)
+
+
+def _delete_files(storage, name):
+    storage.delete(name)
+    match = BLOB_NAME_RE.match(name)
+    if not match:
+        return
+    directory = posixpath.join(posixpath.dirname(name), 'variants')
+    try:
+        files = storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return
+    for filename in files:
+        if filename.startswith(match['sha256'] + '_'):
+            storage.delete(posixpath.join(directory, filename))
+
+
+def collect_garbage(batch_size=None, grace_seconds=None, storage=default_storage):
+    """
+    Delete unreferenced files not used within ``grace_seconds``, and image
+    variants of deleted blobs, one batch per transaction. Returns the number
+    of files deleted.
+    """
+    batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+    grace_seconds = settings.MEDIA_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                MediaBlob.objects.select_for_update(skip_locked=True)
+                .filter(ref_count__lte=0, last_used_at__lt=cutoff)
+                .order_by('last_used_at')
+                .values_list('id', 'name')[:batch_size]
+            )
+            if not batch:
+                return deleted
+            MediaBlob.objects.filter(id__in=[blob_id for blob_id, _ in batch]).delete()
+            # Files go before the rows are committed, so a concurrent store_blob
+            # of the same bytes waits and then writes the file anew
+            for _, name in batch:
+                _delete_files(storage, name)
+        deleted += len(batch)
+        logger.info(f"Collected {len(batch)} unreferenced media files")
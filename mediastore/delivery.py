@@ -0,0 +1,155 @@
+"""
+Sending media files once a view has decided the user may have them.
+
+With ``MEDIA_DELIVERY = 'nginx'`` or ``'sendfile'`` Django only answers with
+headers and an ``X-Accel-Redirect`` / ``X-Sendfile`` header; the front proxy
+then streams the bytes (and handles Range requests) itself, so no worker is
+tied up copying a file to a slow client. ``'django'`` streams the file with
+``FileResponse`` and its own single-range support, for local runs; under
+ASGI, where ``FileResponse`` would read the whole file first, the file is
+streamed in blocks from a thread.
+
+Content-hashed names (uploads prefixed with a UUID, image variants with a
+content hash) never change, so they are cached for a year as ``immutable``;
+other files are revalidated against their ETag. Files in object storage are
+never proxied: the client is redirected to a presigned URL of the bucket.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.utils.http import http_date
+
+from university_core.asyncviews import streaming_content
+from .storage import is_immutable, is_local, supports_presigned_urls
+
+READ_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _cache_control(name, private):
+    scope = 'private' if private else 'public'
+    if is_immutable(name):
+        return f'{scope}, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    return f'{scope}, max-age={settings.MEDIA_MAX_AGE}, must-revalidate'
+
+
+def _parse_range(header, size):
+    """
+    (start, end) of a single ``bytes=`` range, inclusive; None to send the
+    whole file. Raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Malformed and multi-range requests get the whole file
+        return None
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('empty suffix range')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('range starts past the end of the file')
+    return start, end
+
+
+def _read_range(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        while length:
+            data = fileobj.read(min(READ_BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fileobj.close()
+
+
+def _stream(request, path, stat, etag, content_type):
+    """FileResponse for the whole file, or a 206/416 answer to a Range request"""
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(
+                streaming_content(request, _read_range(open(path, 'rb'), 0, size)), content_type=content_type
+            )
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        streaming_content(request, _read_range(open(path, 'rb'), start, end - start + 1)),
+        status=206, content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def serve_file(request, name, private=True, download_name=None, content_type=None):
+    """
+    Answer ``request`` with the stored file ``name`` via the configured backend.
+
+    ``download_name`` makes browsers save the file under that name instead of
+    showing it. Raises FileNotFoundError when the file is missing.
+    """
+    if not is_local(default_storage):
+        if supports_presigned_urls(default_storage):
+            url = default_storage.presigned_get_url(name, download_name, content_type)
+        else:
+            url = default_storage.url(name)
+        response = HttpResponseRedirect(url)
+        # The URL expires; only the object behind it may be cached
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    path = default_storage.path(name)
+    stat = os.stat(path)
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_DELIVERY == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    elif settings.MEDIA_DELIVERY == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _stream(request, path, stat, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = _cache_control(name, private)
+    response['Accept-Ranges'] = 'bytes'
+    # Browsers must not guess a renderable type from the content
+    response['X-Content-Type-Options'] = 'nosniff'
+    if download_name:
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    return response
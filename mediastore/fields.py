@@ -0,0 +1,33 @@
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+
+
+class BlobImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        # Imported here: model modules import this one before mediastore's models exist
+        from .blobs import store_blob
+
+        self.name = store_blob(content, name, self.storage)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class BlobImageField(models.ImageField):
+    """
+    ImageField whose files are stored once per distinct content.
+
+    References are counted by ``mediastore.signals``, which also releases the
+    file when the object is deleted; never delete the file itself, since other
+    objects may share it.
+    """
+
+    attr_class = BlobImageFieldFile
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('upload_to', 'blobs')
+        kwargs.setdefault('max_length', 500)
+        super().__init__(*args, **kwargs)
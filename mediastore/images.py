@@ -0,0 +1,158 @@
+"""
+Resized variants of course, lesson and user images.
+
+Every image gets ``thumb``/``card``/``full`` variants (longest edge from
+``IMAGE_VARIANT_SIZES``), each encoded as WebP and as JPEG (PNG when the image
+has transparency), plus a tiny WebP placeholder inlined as a data URI and the
+average colour. Work runs as a background job (``jobs``) queued with the
+saving transaction, so the upload request returns straight away. Large JPEGs
+are decoded at a reduced scale, and each variant is resized from the next
+larger one.
+
+Variant file names carry a hash of their content, so they can be cached
+forever. Images stored as blobs (``mediastore.blobs``) share their variants;
+those are deleted with the blob, other variant files are released to the
+media garbage collector. The result is stored in the model's
+``<field>_variants`` JSON field together with the source file name it was
+made from, so variants of a replaced image are never shown and never
+overwrite those of its successor.
+"""
+import base64
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .blobs import release_all
+
+
+def _encode(image, format, **options):
+    output = io.BytesIO()
+    image.save(output, format, **options)
+    return output.getvalue()
+
+
+def render_variants(fileobj):
+    """
+    Resize and encode an image file.
+
+    Returns (sizes, files, placeholder, color): variant dimensions by name,
+    encoded bytes by ``<variant>.<ext>``, a data URI and a ``#rrggbb`` colour.
+    """
+    sizes = sorted(settings.IMAGE_VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True)
+    quality = settings.IMAGE_VARIANT_QUALITY
+
+    with Image.open(fileobj) as source:
+        largest = sizes[0][1]
+        source.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    dimensions = {}
+    files = {}
+    for name, edge in sizes:
+        # In place and never upscaling; each variant starts from the previous, larger one
+        image.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+        dimensions[name] = {'width': image.width, 'height': image.height}
+        files[f'{name}.webp'] = _encode(image, 'WEBP', quality=quality, method=4)
+        if has_alpha:
+            files[f'{name}.png'] = _encode(image, 'PNG', optimize=True)
+        else:
+            files[f'{name}.jpg'] = _encode(image, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+    image.thumbnail((settings.IMAGE_PLACEHOLDER_SIZE,) * 2, Image.LANCZOS)
+    placeholder = 'data:image/webp;base64,' + base64.b64encode(_encode(image, 'WEBP', quality=30)).decode()
+    red, green, blue = image.convert('RGB').resize((1, 1), Image.BOX).getpixel((0, 0))
+    return dimensions, files, placeholder, f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def _variant_names(variants):
+    return {name for size in variants.get('sizes', {}).values() for name in (size['webp'], size['fallback'])}
+
+
+def release_variant_files(variants):
+    release_all(_variant_names(variants or {}))
+
+
+def generate_variants(model, pk, field_name):
+    """Generate and record the variants of one object's image; return them, or None if it has none"""
+    variants_field = f'{field_name}_variants'
+    instance = model._default_manager.filter(pk=pk).only(field_name, variants_field).first()
+    if instance is None:
+        return None
+    image = getattr(instance, field_name)
+    previous = getattr(instance, variants_field) or {}
+    storage = image.storage
+
+    if not image:
+        empty = Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True})
+        if model._default_manager.filter(empty, pk=pk).update(**{variants_field: {}}):
+            release_variant_files(previous)
+        return None
+
+    with storage.open(image.name, 'rb') as fileobj:
+        dimensions, files, placeholder, color = render_variants(fileobj)
+
+    directory = os.path.join(os.path.dirname(image.name), 'variants')
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    stored = {}
+    for suffix, data in files.items():
+        variant, extension = suffix.split('.')
+        name = os.path.join(directory, f'{stem}_{variant}.{hashlib.sha256(data).hexdigest()[:12]}.{extension}')
+        stored[suffix] = name if storage.exists(name) else storage.save(name, ContentFile(data))
+
+    variants = {
+        'source': image.name,
+        'placeholder': placeholder,
+        'color': color,
+        'sizes': {
+            name: {
+                **size,
+                'webp': stored[f'{name}.webp'],
+                'fallback': stored.get(f'{name}.jpg') or stored[f'{name}.png'],
+            }
+            for name, size in dimensions.items()
+        },
+    }
+    if not model._default_manager.filter(pk=pk, **{field_name: image.name}).update(**{variants_field: variants}):
+        # The image was replaced while this one was processed
+        release_variant_files(variants)
+        return None
+    release_all(_variant_names(previous) - _variant_names(variants))
+    return variants
+
+
+def schedule_variants(instance, field_name):
+    """Queue variant generation if the image changed since the variants were made"""
+    from .tasks import generate_image_variants
+
+    image = getattr(instance, field_name)
+    variants = getattr(instance, f'{field_name}_variants') or {}
+    if (image.name or None) == variants.get('source'):
+        return
+    generate_image_variants.enqueue(model=instance._meta.label, pk=instance.pk, field_name=field_name)
+
+
+def image_variants_to_dict(image, variants):
+    """URLs of an image's variants for API responses; None until they match the current image"""
+    if not image or not variants or variants.get('source') != image.name:
+        return None
+    url = image.storage.url
+    return {
+        'placeholder': variants['placeholder'],
+        'color': variants['color'],
+        **{
+            name: {
+                'width': size['width'],
+                'height': size['height'],
+                'url': url(size['fallback']),
+                'webp_url': url(size['webp']),
+            }
+            for name, size in variants['sizes'].items()
+        },
+    }
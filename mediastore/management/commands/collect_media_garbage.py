@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from mediastore.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete media files no object references any more, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Files deleted per transaction (default: MEDIA_GC_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=None,
+            help='Seconds an unreferenced file is kept after its last use (default: MEDIA_GC_GRACE_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = collect_garbage(options['batch_size'], options['grace'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced media files'))
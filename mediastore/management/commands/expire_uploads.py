@@ -0,0 +1,31 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from mediastore.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Delete expired, aborted and finished upload records and any partial files or objects they left behind'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        stale = Upload.objects.filter(
+            Q(expires_at__lt=now) | ~Q(status='pending'),
+            Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+        )
+        removed = 0
+        for upload in stale.only('id', 'status', 'storage_name').iterator(chunk_size=1000):
+            if upload.storage_name:
+                # A finished direct upload's object is now the stored file
+                if upload.status != 'complete' and default_storage.exists(upload.storage_name):
+                    default_storage.delete(upload.storage_name)
+                    removed += 1
+            elif os.path.exists(upload.part_path):
+                os.remove(upload.part_path)
+                removed += 1
+        deleted, _ = stale.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} upload records and {removed} partial files'))
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from mediastore.images import generate_variants
+from mediastore.signals import IMAGE_FIELDS
+
+
+def _generate(model, pk, field_name):
+    try:
+        generate_variants(model, pk, field_name)
+        return None
+    except Exception as e:
+        return f'{model._meta.label} {pk}: {e}'
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated image variants of courses, lessons and users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate every image, not only those whose variants are missing or outdated',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Images processed in parallel',
+        )
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model, field_name in IMAGE_FIELDS.items():
+            rows = model._default_manager.exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+            for pk, name, variants in rows.values_list('pk', field_name, f'{field_name}_variants').iterator():
+                if options['all'] or (variants or {}).get('source') != name:
+                    jobs.append((model, pk, field_name))
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            failures = [error for error in executor.map(lambda job: _generate(*job), jobs) if error]
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(f'  {failure}'))
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {len(jobs) - len(failures)} of {len(jobs)} images'))
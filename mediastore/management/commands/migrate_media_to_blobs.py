@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from mediastore.blobs import is_blob
+from mediastore.signals import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Move course, lesson and user images stored before content addressing into deduplicated blobs'
+
+    def handle(self, *args, **options):
+        moved = failed = 0
+        for model, field_name in IMAGE_FIELDS.items():
+            rows = model._default_manager.exclude(
+                Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}) | Q(**{f'{field_name}__startswith': 'blobs/'})
+            )
+            for instance in rows.iterator(chunk_size=200):
+                image = getattr(instance, field_name)
+                if is_blob(image.name):
+                    continue
+                try:
+                    with image.storage.open(image.name, 'rb') as fileobj:
+                        # Saving counts the blob reference and releases the old file to the collector
+                        image.save(image.name, fileobj, save=False)
+                    instance.save(update_fields=[field_name])
+                    moved += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'  {model._meta.label} {instance.pk}: {e}'))
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} images into blobs ({failed} failed)'))
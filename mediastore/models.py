@@ -0,0 +1,202 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+from courses.models import Course, Lesson
+from schedule.models import Event
+
+User = get_user_model()
+
+
+def attachment_path(instance, filename):
+    return os.path.join('lessons', f'lesson_{instance.lesson_id}', 'attachments', f'{uuid.uuid4().hex}_{filename}')
+
+
+def submission_path(instance, filename):
+    return os.path.join(
+        'submissions', f'event_{instance.event_id}', f'student_{instance.student_id}', f'{uuid.uuid4().hex}_{filename}'
+    )
+
+
+class Upload(models.Model):
+    """
+    Upload in progress.
+    
+    Chunked uploads append bytes to ``part_path`` chunk by chunk; ``received``
+    is the offset the next chunk must start at. A chunk write holds a short
+    lease (``lease_until``) so two clients can never append to the same file at
+    once. Direct uploads go to ``storage_name`` in object storage instead.
+    """
+    
+    PURPOSES = [
+        ('submission', 'Assignment submission'),
+        ('lesson_attachment', 'Lesson attachment'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        help_text="User sending the file"
+    )
+    purpose = models.CharField(max_length=20, choices=PURPOSES, help_text="What the file becomes when finalized")
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='uploads',
+        help_text="Lesson the attachment is for"
+    )
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='uploads',
+        db_constraint=False,  # events may live in a partitioned table
+        help_text="Assignment the submission is for"
+    )
+    filename = models.CharField(max_length=255, help_text="Original file name")
+    content_type = models.CharField(max_length=100, blank=True, help_text="Declared MIME type")
+    size = models.BigIntegerField(help_text="Total size in bytes")
+    received = models.BigIntegerField(default=0, help_text="Bytes stored so far")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256 of the whole file, if declared")
+    storage_name = models.CharField(
+        max_length=500,
+        blank=True,
+        help_text="Object the client uploads to directly with a presigned URL; empty for chunked uploads"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', help_text="Upload state")
+    lease_until = models.DateTimeField(blank=True, null=True, help_text="A chunk is being written until then")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When the upload was started")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When a chunk was last stored")
+    expires_at = models.DateTimeField(db_index=True, help_text="Unfinished uploads are discarded after this")
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes, {self.status})"
+    
+    @property
+    def part_path(self):
+        return os.path.join(settings.UPLOAD_TEMP_DIR, f'{self.id}.part')
+
+
+class LessonAttachment(models.Model):
+    """File attached to a lesson by its course staff"""
+    
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        related_name='attachments',
+        help_text="Lesson the file belongs to"
+    )
+    file = models.FileField(upload_to=attachment_path, max_length=500, help_text="Stored file")
+    filename = models.CharField(max_length=255, help_text="Original file name")
+    content_type = models.CharField(max_length=100, blank=True, help_text="Declared MIME type")
+    size = models.BigIntegerField(help_text="Size in bytes")
+    sha256 = models.CharField(max_length=64, help_text="SHA-256 of the file")
+    uploaded_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='lesson_attachments',
+        help_text="User who uploaded the file"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When the file was attached")
+    
+    class Meta:
+        ordering = ['lesson', 'created_at']
+    
+    def __str__(self):
+        return f"{self.filename} (lesson {self.lesson_id})"
+
+
+class Submission(models.Model):
+    """File handed in by a student for an assignment; the latest one counts"""
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='submissions',
+        db_constraint=False,  # events may live in a partitioned table
+        help_text="Assignment the file was submitted for"
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='submissions',
+        help_text="Course the student submitted through"
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='submissions',
+        help_text="Student who submitted the file"
+    )
+    file = models.FileField(upload_to=submission_path, max_length=500, help_text="Stored file")
+    filename = models.CharField(max_length=255, help_text="Original file name")
+    content_type = models.CharField(max_length=100, blank=True, help_text="Declared MIME type")
+    size = models.BigIntegerField(help_text="Size in bytes")
+    sha256 = models.CharField(max_length=64, help_text="SHA-256 of the file")
+    submitted_at = models.DateTimeField(auto_now_add=True, help_text="When the file was submitted")
+    
+    class Meta:
+        ordering = ['event', 'student', '-submitted_at']
+        indexes = [
+            models.Index(fields=['event', 'student', '-submitted_at']),
+            models.Index(fields=['course', 'event']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} by {self.student_id} for event {self.event_id}"
+
+
+class MediaBlob(models.Model):
+    """
+    Stored media file, counted by the references model fields hold to it.
+
+    Images are stored once under a name made from their SHA-256 (see
+    ``mediastore.blobs``), however many objects use them. A file nobody
+    references any more is deleted by ``collect_media_garbage``, which also
+    takes older files that were released (those have no ``sha256``).
+    """
+    
+    name = models.CharField(max_length=500, unique=True, help_text="Storage name of the file")
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="SHA-256 of the file; empty for files stored before content addressing"
+    )
+    size = models.BigIntegerField(default=0, help_text="Size in bytes")
+    ref_count = models.IntegerField(default=0, help_text="Number of model fields referencing the file")
+    last_used_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When a reference was last added or dropped; recently used files are never collected"
+    )
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['last_used_at'], name='mediablob_unreferenced_idx', condition=models.Q(ref_count__lte=0)
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
@@ -0,0 +1,87 @@
+"""
+S3-compatible media storage (``MEDIA_STORAGE = 's3'``).
+
+Needs django-storages and boto3. Works against AWS S3 or any compatible
+service such as MinIO (set ``AWS_S3_ENDPOINT_URL`` and, for MinIO,
+``AWS_S3_ADDRESSING_STYLE = 'path'``). When the app reaches the service under
+a different host than browsers do (``http://minio:9000`` inside Docker),
+``AWS_S3_PUBLIC_ENDPOINT_URL`` is the endpoint presigned URLs are made for.
+"""
+import base64
+from urllib.parse import quote
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .storage import is_immutable
+
+
+class MediaS3Storage(S3Storage):
+    """S3 storage with presigned uploads and forever-cacheable content-hashed objects"""
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if is_immutable(name):
+            params.setdefault('CacheControl', f'max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable')
+        return params
+
+    @cached_property
+    def _presign_client(self):
+        if not settings.AWS_S3_PUBLIC_ENDPOINT_URL:
+            return self.bucket.meta.client
+        return self._create_session().client(
+            's3',
+            region_name=self.region_name,
+            use_ssl=self.use_ssl,
+            endpoint_url=settings.AWS_S3_PUBLIC_ENDPOINT_URL,
+            config=self.config,
+            verify=self.verify,
+        )
+
+    def _key(self, name):
+        return self._normalize_name(clean_name(name))
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if self.custom_domain or not self.querystring_auth or not settings.AWS_S3_PUBLIC_ENDPOINT_URL:
+            return super().url(name, parameters, expire, http_method)
+        return self._presign_client.generate_presigned_url(
+            'get_object',
+            Params={**(parameters or {}), 'Bucket': self.bucket_name, 'Key': self._key(name)},
+            ExpiresIn=expire or self.querystring_expire,
+            HttpMethod=http_method,
+        )
+
+    def presigned_get_url(self, name, download_name=None, content_type=None):
+        """Time-limited URL to download ``name`` straight from the bucket"""
+        parameters = {}
+        if download_name:
+            parameters['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        if content_type:
+            parameters['ResponseContentType'] = content_type
+        return self.url(name, parameters, expire=settings.MEDIA_PRESIGNED_EXPIRY_SECONDS)
+
+    def presigned_put_url(self, name, content_type='', sha256=''):
+        """
+        Time-limited URL to upload ``name`` straight to the bucket.
+
+        Returns (url, headers): the client must send exactly these headers with
+        its PUT. With ``sha256`` the service rejects bytes that do not match it.
+        """
+        params = {'Bucket': self.bucket_name, 'Key': self._key(name)}
+        headers = {}
+        if content_type:
+            params['ContentType'] = headers['Content-Type'] = content_type
+        if is_immutable(name):
+            params['CacheControl'] = headers['Cache-Control'] = (
+                f'max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+            )
+        if sha256:
+            params['ChecksumSHA256'] = headers['x-amz-checksum-sha256'] = (
+                base64.b64encode(bytes.fromhex(sha256)).decode()
+            )
+        url = self._presign_client.generate_presigned_url(
+            'put_object', Params=params, ExpiresIn=settings.MEDIA_PRESIGNED_EXPIRY_SECONDS, HttpMethod='PUT',
+        )
+        return url, headers
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from courses.models import Course, Lesson
+from users.models import User
+from .blobs import acquire, release
+from .images import release_variant_files, schedule_variants
+
+IMAGE_FIELDS = {Course: 'image', Lesson: 'image', User: 'picture'}
+
+
+def _stored_name(sender, instance):
+    """Image file name as loaded or last saved; None when the field was deferred"""
+    field_name = IMAGE_FIELDS[sender]
+    if field_name not in instance.__dict__:
+        return None
+    return getattr(instance, field_name).name or ''
+
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=Lesson)
+@receiver(post_init, sender=User)
+def remember_image_name(sender, instance, **kwargs):
+    instance._stored_image_name = _stored_name(sender, instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=User)
+def count_image_references(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    field_name = IMAGE_FIELDS[sender]
+    if update_fields is not None and field_name not in update_fields:
+        return
+    previous = '' if created else instance._stored_image_name
+    current = _stored_name(sender, instance)
+    if current is None or current == previous:
+        return
+    acquire(current)
+    # An image that was never loaded stays counted; a leak beats collecting a file in use
+    if previous is not None:
+        release(previous)
+    instance._stored_image_name = current
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=User)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, IMAGE_FIELDS[sender])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=User)
+def release_image(sender, instance, **kwargs):
+    # Also runs for lessons deleted with their course, so their images are collected too
+    name = _stored_name(sender, instance)
+    if name is not None:
+        release(name)
+        release_variant_files(instance.__dict__.get(f'{IMAGE_FIELDS[sender]}_variants'))
@@ -0,0 +1,33 @@
+"""
+Storage-independent helpers for media files.
+
+Media lives in Django's default storage: ``MEDIA_ROOT`` on local disk, or an
+S3-compatible bucket with ``MEDIA_STORAGE = 's3'`` (``mediastore.s3``), so
+several app nodes can share media without a common volume. Object storage
+lets clients upload and download directly against the bucket with presigned
+URLs, and no media bytes pass through app workers.
+"""
+import re
+
+from django.core.files.storage import default_storage
+
+# <32 hex>_name for uploads, <64 hex>.ext for image blobs, name.<12 hex>.ext for image variants
+IMMUTABLE_NAME_RE = re.compile(r'(?:^|/)[0-9a-f]{32}_[^/]+$|(?:^|/)[0-9a-f]{64}\.\w+$|\.[0-9a-f]{12}\.\w+$')
+
+
+def is_immutable(name):
+    """Whether ``name`` is content-addressed or unique, so its bytes never change"""
+    return bool(IMMUTABLE_NAME_RE.search(name))
+
+
+def is_local(storage=default_storage):
+    """Whether files of ``storage`` have paths on this node's disk"""
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+def supports_presigned_urls(storage=default_storage):
+    return hasattr(storage, 'presigned_put_url')
@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management import call_command
+
+from jobs.queue import task
+from .blobs import collect_garbage
+from .images import generate_variants
+
+
+@task()
+def generate_image_variants(model, pk, field_name):
+    generate_variants(apps.get_model(model), pk, field_name)
+
+
+@task()
+def collect_media_garbage():
+    collect_garbage()
+
+
+@task()
+def expire_uploads():
+    call_command('expire_uploads')
@@ -0,0 +1,428 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from courses.models import Course, Lesson
+from jobs.models import Job
+from users.jwt_utils import JWTManager
+from users.models import User
+from .delivery import READ_BLOCK_SIZE, serve_file
+from .images import generate_variants, image_variants_to_dict, render_variants
+from .blobs import collect_garbage, store_blob
+from .models import LessonAttachment, MediaBlob, Upload
+from .s3 import MediaS3Storage
+from .uploads import ChunkWriter, UploadError, abort_upload, finalize_upload, start_upload, write_chunk
+from .views import serve_media
+
+
+class DjangoDeliveryStreamingTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.content = os.urandom(3 * READ_BLOCK_SIZE + 10)
+        with open(os.path.join(self.media_root, 'notes.bin'), 'wb') as f:
+            f.write(self.content)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY='django')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    async def test_whole_file_streams_in_blocks_under_asgi(self):
+        response = serve_file(AsyncRequestFactory().get('/media/notes.bin'), 'notes.bin')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response]
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), self.content)
+
+    async def test_range_streams_under_asgi(self):
+        request = AsyncRequestFactory().get('/media/notes.bin', headers={'Range': 'bytes=10-'})
+        response = serve_file(request, 'notes.bin')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response]), self.content[10:])
+
+    def test_whole_file_uses_file_response_under_wsgi(self):
+        response = serve_file(RequestFactory().get('/media/notes.bin'), 'notes.bin')
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response), self.content)
+        response.close()
+
+
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        cls.lesson = Lesson.objects.create(
+            course=course, title='Lesson 1', short_description='Short', full_text='Text', order=1,
+        )
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_DELIVERY='django')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_uploaded_html_is_sent_as_a_download(self):
+        name = f'lessons/lesson_{self.lesson.id}/attachments/0123_page.html'
+        os.makedirs(os.path.join(self.media_root, os.path.dirname(name)))
+        with open(os.path.join(self.media_root, name), 'wb') as f:
+            f.write(b'<script>alert(1)</script>')
+        LessonAttachment.objects.create(
+            lesson=self.lesson, file=name, filename='page.html', content_type='text/html', size=25, sha256='0' * 64,
+        )
+        request = RequestFactory().get(f'/media/{name}', {'token': JWTManager.generate_access_token(self.professor)})
+
+        response = serve_media(request, name)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        response.close()
+
+
+class ChunkedUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        cls.lesson = Lesson.objects.create(
+            course=course, title='Lesson 1', short_description='Short', full_text='Text', order=1,
+        )
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root, UPLOAD_TEMP_DIR=os.path.join(self.media_root, '.partial'),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.content = os.urandom(1000)
+
+    def start(self, sha256=None):
+        return start_upload(
+            self.professor, 'lesson_attachment', 'notes.pdf', len(self.content),
+            sha256=hashlib.sha256(self.content).hexdigest() if sha256 is None else sha256,
+            content_type='application/pdf', lesson=self.lesson,
+        )
+
+    def send(self, upload, start, end, sha256=''):
+        upload.refresh_from_db()
+        return write_chunk(upload, start, end - start, io.BytesIO(self.content[start:end]).read, sha256)
+
+    def assert_rejected(self, status, call, *args):
+        with self.assertRaises(UploadError) as raised:
+            call(*args)
+        self.assertEqual(raised.exception.status, status)
+        return raised.exception
+
+    def test_chunks_resume_and_finalize(self):
+        upload = self.start()
+
+        self.assertEqual(self.send(upload, 0, 400), 400)
+        self.assertEqual(self.send(upload, 400, 1000, hashlib.sha256(self.content[400:]).hexdigest()), 1000)
+        attachment = finalize_upload(upload)
+
+        self.assertEqual(attachment.sha256, hashlib.sha256(self.content).hexdigest())
+        with default_storage.open(attachment.file.name) as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(os.path.exists(upload.part_path))
+        self.assertEqual(Upload.objects.get(id=upload.id).status, 'complete')
+
+    def test_chunk_must_start_at_the_received_offset(self):
+        upload = self.start()
+        self.send(upload, 0, 400)
+
+        error = self.assert_rejected(409, self.send, upload, 300, 700)
+
+        self.assertEqual(error.offset, 400)
+
+    def test_chunk_length_must_match_its_data(self):
+        upload = self.start()
+
+        self.assert_rejected(400, write_chunk, upload, 0, 400, io.BytesIO(self.content[:100]).read)
+        self.assert_rejected(413, ChunkWriter, upload, 0, 2000)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+        self.assertIsNone(upload.lease_until)
+        self.assertEqual(os.path.getsize(upload.part_path), 0)
+
+    def test_corrupt_chunk_is_discarded(self):
+        upload = self.start()
+
+        self.assert_rejected(400, self.send, upload, 0, 400, '0' * 64)
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+        self.assertEqual(os.path.getsize(upload.part_path), 0)
+        self.assertEqual(self.send(upload, 0, 400), 400)
+
+    def test_only_one_writer_holds_the_lease(self):
+        upload = self.start()
+        writer = ChunkWriter(upload, 0, 400)
+        writer.claim()
+
+        self.assert_rejected(409, ChunkWriter(upload, 0, 400).claim)
+        self.assert_rejected(409, abort_upload, upload)
+
+        # A writer whose lease ran out loses the upload to the next one
+        Upload.objects.filter(id=upload.id).update(lease_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.send(upload, 0, 400), 400)
+        writer.write(self.content[:400])
+        writer.finish()
+        self.assert_rejected(409, writer.commit)
+        writer.abort()
+        self.assertEqual(os.path.getsize(upload.part_path), 400)
+
+    def test_file_not_matching_its_checksum_is_discarded(self):
+        upload = self.start(sha256='0' * 64)
+        self.send(upload, 0, 1000)
+
+        self.assert_rejected(400, finalize_upload, upload)
+
+        self.assertEqual(Upload.objects.get(id=upload.id).status, 'aborted')
+        self.assertFalse(os.path.exists(upload.part_path))
+        self.assertFalse(LessonAttachment.objects.exists())
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        upload = self.start()
+        self.send(upload, 0, 400)
+
+        self.assertEqual(self.assert_rejected(409, finalize_upload, upload).offset, 400)
+
+    def test_abort_removes_the_partial_file(self):
+        upload = self.start()
+        self.send(upload, 0, 400)
+        upload.refresh_from_db()
+
+        abort_upload(upload)
+
+        self.assertEqual(Upload.objects.get(id=upload.id).status, 'aborted')
+        self.assertFalse(os.path.exists(upload.part_path))
+        upload.refresh_from_db()
+        self.assert_rejected(409, self.send, upload, 400, 1000)
+
+
+def make_image(size, format='JPEG', mode='RGB', color=(200, 30, 30)):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, format)
+    return output.getvalue()
+
+
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_variants_are_resized_without_upscaling(self):
+        sizes, files, placeholder, color = render_variants(io.BytesIO(make_image((2000, 1000), 'PNG')))
+
+        self.assertEqual(sizes, {
+            'full': {'width': 1600, 'height': 800},
+            'card': {'width': 480, 'height': 240},
+            'thumb': {'width': 160, 'height': 80},
+        })
+        self.assertEqual(set(files), {f'{name}.{ext}' for name in sizes for ext in ('webp', 'jpg')})
+        self.assertEqual(Image.open(io.BytesIO(files['card.webp'])).size, (480, 240))
+        self.assertTrue(placeholder.startswith('data:image/webp;base64,'))
+        self.assertEqual(color, '#c81e1e')
+
+        sizes, files, _, _ = render_variants(io.BytesIO(make_image((100, 50), 'PNG', 'RGBA', (0, 0, 255, 128))))
+
+        self.assertEqual(sizes['full'], {'width': 100, 'height': 50})
+        # Transparency needs a PNG fallback
+        self.assertIn('thumb.png', files)
+        self.assertNotIn('thumb.jpg', files)
+
+    def test_blob_images_are_queued_and_share_their_variants(self):
+        content = make_image((600, 300))
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=self.professor)
+        course.image.save('banner.jpg', ContentFile(content))
+        other = Course.objects.create(title='Topology', description='Open sets', created_by=self.professor)
+        other.image.save('copy.jpg', ContentFile(content))
+
+        self.assertEqual(course.image.name, other.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=course.image.name).ref_count, 2)
+        self.assertEqual(Job.objects.filter(task='mediastore.tasks.generate_image_variants').count(), 2)
+
+        variants = generate_variants(Course, course.pk, 'image')
+
+        self.assertEqual(variants['source'], course.image.name)
+        self.assertEqual(
+            {name: (size['width'], size['height']) for name, size in variants['sizes'].items()},
+            {'full': (600, 300), 'card': (480, 240), 'thumb': (160, 80)},
+        )
+        sha256 = hashlib.sha256(content).hexdigest()
+        directory = f'blobs/{sha256[:2]}/{sha256[2:4]}/variants'
+        self.assertTrue(variants['sizes']['card']['webp'].startswith(f'{directory}/{sha256}_card.'))
+        self.assertEqual(generate_variants(Course, other.pk, 'image')['sizes'], variants['sizes'])
+        course.refresh_from_db()
+        urls = image_variants_to_dict(course.image, course.image_variants)
+        self.assertEqual(urls['card']['width'], 480)
+        self.assertTrue(urls['card']['webp_url'].endswith('.webp'))
+
+    def test_variants_of_a_replaced_image_are_discarded(self):
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=self.professor)
+        for name in ('courses/old.jpg', 'courses/new.jpg'):
+            default_storage.save(name, ContentFile(make_image((300, 200))))
+        Course.objects.filter(pk=course.pk).update(image='courses/old.jpg')
+
+        def replace_while_rendering(fileobj):
+            Course.objects.filter(pk=course.pk).update(image='courses/new.jpg')
+            return render_variants(fileobj)
+
+        with mock.patch('mediastore.images.render_variants', side_effect=replace_while_rendering):
+            self.assertIsNone(generate_variants(Course, course.pk, 'image'))
+
+        course.refresh_from_db()
+        self.assertEqual(course.image_variants, {})
+        # The orphaned variant files are left to the media garbage collector
+        released = MediaBlob.objects.filter(name__startswith='courses/variants/old_', ref_count=0)
+        self.assertEqual(released.count(), 6)
+        self.assertIsNone(image_variants_to_dict(course.image, {'source': 'courses/old.jpg'}))
+
+
+@override_settings(AWS_S3_PUBLIC_ENDPOINT_URL='http://localhost:9000', MEDIA_PRESIGNED_EXPIRY_SECONDS=600)
+class S3PresignTests(SimpleTestCase):
+    def storage(self):
+        return MediaS3Storage(
+            access_key='minio', secret_key='secret', bucket_name='media',
+            endpoint_url='http://minio:9000', addressing_style='path',
+        )
+
+    def test_put_url_signs_the_headers_the_client_must_send(self):
+        sha256 = hashlib.sha256(b'banner').hexdigest()
+        name = f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg'
+
+        url, headers = self.storage().presigned_put_url(name, 'image/jpeg', sha256)
+
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        self.assertEqual((parts.netloc, parts.path), ('localhost:9000', f'/media/{name}'))
+        self.assertEqual(query['X-Amz-Expires'], ['600'])
+        self.assertEqual(query['X-Amz-SignedHeaders'], ['cache-control;content-type;host;x-amz-checksum-sha256'])
+        self.assertEqual(headers, {
+            'Content-Type': 'image/jpeg',
+            'Cache-Control': 'max-age=31536000, immutable',
+            'x-amz-checksum-sha256': base64.b64encode(hashlib.sha256(b'banner').digest()).decode(),
+        })
+
+    def test_put_url_without_checksum_or_immutable_name(self):
+        url, headers = self.storage().presigned_put_url('lessons/notes.pdf')
+
+        self.assertEqual(headers, {})
+        self.assertEqual(parse_qs(urlsplit(url).query)['X-Amz-SignedHeaders'], ['host'])
+
+    def test_get_url_names_the_download(self):
+        url = self.storage().presigned_get_url('lessons/notes.pdf', 'Notes é.pdf', 'application/pdf')
+
+        query = parse_qs(urlsplit(url).query)
+        self.assertTrue(url.startswith('http://localhost:9000/media/lessons/notes.pdf?'))
+        self.assertEqual(query['response-content-disposition'], ["attachment; filename*=UTF-8''Notes%20%C3%A9.pdf"])
+        self.assertEqual(query['response-content-type'], ['application/pdf'])
+
+    @override_settings(AWS_S3_PUBLIC_ENDPOINT_URL=None)
+    def test_urls_use_the_service_endpoint_without_a_public_one(self):
+        url = self.storage().url('lessons/notes.pdf')
+
+        self.assertTrue(url.startswith('http://minio:9000/media/lessons/notes.pdf?'))
+
+    def test_content_hashed_objects_are_cached_forever(self):
+        storage = self.storage()
+
+        self.assertEqual(
+            storage.get_object_parameters(f'blobs/ab/cd/{"a" * 64}.png')['CacheControl'], 'max-age=31536000, immutable',
+        )
+        self.assertNotIn('CacheControl', storage.get_object_parameters('lessons/notes.pdf'))
+
+
+class BlobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def course(self, title, filename, content):
+        course = Course.objects.create(title=title, description='Description', created_by=self.professor)
+        course.image.save(filename, ContentFile(content))
+        return course
+
+    def ref_count(self, name):
+        return MediaBlob.objects.get(name=name).ref_count
+
+    def test_same_bytes_are_stored_once(self):
+        content = make_image((40, 20))
+        sha256 = hashlib.sha256(content).hexdigest()
+
+        name = store_blob(ContentFile(content), 'Banner.JPG')
+
+        self.assertEqual(name, f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg')
+        self.assertEqual(store_blob(ContentFile(content), 'copy.jpg'), name)
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(name))), [os.path.basename(name)])
+        blob = MediaBlob.objects.get(name=name)
+        # Stored but not referenced until a field acquires it
+        self.assertEqual((blob.sha256, blob.size, blob.ref_count), (sha256, len(content), 0))
+
+    def test_references_follow_saves_replacements_and_deletes(self):
+        banner, other = make_image((40, 20)), make_image((40, 20), color=(0, 0, 0))
+        first = self.course('Algebra', 'banner.jpg', banner)
+        second = self.course('Topology', 'banner.jpg', banner)
+        name = first.image.name
+        self.assertEqual(self.ref_count(name), 2)
+
+        second = Course.objects.get(pk=second.pk)
+        second.image.save('other.jpg', ContentFile(other))
+        self.assertEqual(self.ref_count(name), 1)
+        self.assertEqual(self.ref_count(second.image.name), 1)
+
+        Course.objects.get(pk=first.pk).delete()
+        self.assertEqual(self.ref_count(name), 0)
+
+    @override_settings(MEDIA_GC_GRACE_SECONDS=60)
+    def test_garbage_collector_deletes_unreferenced_files_after_the_grace_period(self):
+        course = self.course('Algebra', 'banner.jpg', make_image((40, 20)))
+        name = course.image.name
+        kept = self.course('Topology', 'kept.jpg', make_image((40, 20), color=(0, 0, 0))).image.name
+        sha256 = MediaBlob.objects.get(name=name).sha256
+        variant = f'{os.path.dirname(name)}/variants/{sha256}_thumb.0123456789ab.webp'
+        default_storage.save(variant, ContentFile(b'variant'))
+        Course.objects.get(pk=course.pk).delete()
+
+        self.assertEqual(collect_garbage(), 0)
+
+        MediaBlob.objects.update(last_used_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(collect_garbage(batch_size=1), 1)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+        self.assertTrue(default_storage.exists(kept))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
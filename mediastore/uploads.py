@@ -0,0 +1,368 @@
+"""
+Uploads of submissions and lesson attachments.
+
+A client starts an upload with the file's size (and optionally its SHA-256),
+sends the bytes as ``PUT`` chunks that each state the offset they start at,
+then finalizes it. A chunk is streamed into the partial file in small blocks
+as it arrives, so neither a file nor a chunk is ever held in memory, and an
+interrupted upload resumes from the ``received`` offset. Only one chunk per
+upload is written at a time: the writer holds a lease on the upload row that
+it renews while data keeps arriving. A chunk may declare its own SHA-256,
+checked before the offset advances; finalizing checks the whole file and
+hands it to the storage backend, which moves it into place on local disk.
+
+With object storage, uploads are direct by default: the client PUTs the file
+to a presigned URL of the bucket, which checks it against the declared
+SHA-256, and finalizing only confirms the object's size.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from courses.models import Enrollment
+from .models import LessonAttachment, Submission, Upload
+from .storage import supports_presigned_urls
+
+READ_BLOCK_SIZE = 64 * 1024
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """Rejected upload request; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class _PartFile(File):
+    """Finished partial file; storage backends that can move it skip the copy"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=settings.UPLOAD_EXPIRY_SECONDS)
+
+
+def parse_sha256(value):
+    """Lowercase hex digest, '' when not given; raises UploadError when malformed"""
+    value = (value or '').strip().lower()
+    if value and not SHA256_RE.match(value):
+        raise UploadError('sha256 must be 64 hexadecimal characters')
+    return value
+
+
+def submission_course(event, student):
+    """ID of the course through which ``student`` may submit for ``event``, or None"""
+    course_ids = set(event.targets.filter(target_type='course').values_list('course_id', flat=True))
+    if event.course_id:
+        course_ids.add(event.course_id)
+    return Enrollment.objects.filter(
+        student=student, status='enrolled', course_id__in=course_ids
+    ).values_list('course_id', flat=True).first()
+
+
+def _new_target(upload, course_id=None):
+    if upload.purpose == 'submission':
+        return Submission(event=upload.event, course_id=course_id, student=upload.owner)
+    return LessonAttachment(lesson=upload.lesson, uploaded_by=upload.owner)
+
+
+def start_upload(owner, purpose, filename, size, sha256='', content_type='', lesson=None, event=None, direct=False):
+    """
+    Validate an upload request and create its empty partial file, or with
+    ``direct`` choose the object the client will upload to.
+    """
+    filename = os.path.basename(str(filename or '').replace('\\', '/')).strip()[:255]
+    try:
+        get_valid_filename(filename)
+    except SuspiciousFileOperation:
+        raise UploadError('filename is required')
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError('size must be a positive integer')
+    if size > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'Files may be at most {settings.UPLOAD_MAX_SIZE} bytes', status=413)
+
+    sha256 = parse_sha256(sha256)
+    if direct:
+        if not supports_presigned_urls(default_storage):
+            raise UploadError('Direct uploads need object storage; use chunked uploads')
+        if not sha256:
+            raise UploadError('sha256 is required for direct uploads')
+
+    upload = Upload(
+        owner=owner,
+        purpose=purpose,
+        lesson=lesson,
+        event=event,
+        filename=filename,
+        content_type=str(content_type or '')[:100],
+        size=size,
+        sha256=sha256,
+        expires_at=_expiry(),
+    )
+    if direct:
+        target = _new_target(upload)
+        upload.storage_name = target.file.field.generate_filename(target, get_valid_filename(filename))
+        upload.save()
+    else:
+        upload.save()
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        open(upload.part_path, 'wb').close()
+    return upload
+
+
+def direct_upload_url(upload):
+    """(url, headers) for the client's PUT of a direct upload"""
+    return default_storage.presigned_put_url(upload.storage_name, upload.content_type, upload.sha256)
+
+
+def _unfinished(upload):
+    if upload.status != 'pending':
+        raise UploadError(f'Upload is {upload.status}', status=409)
+    if upload.expires_at <= timezone.now():
+        raise UploadError('Upload has expired', status=410)
+
+
+class ChunkWriter:
+    """
+    Writes one chunk of an upload to its partial file.
+
+    ``claim``, ``renew_lease``, ``commit`` and ``abort`` touch the database;
+    ``write`` and ``finish`` only touch the file, so an async caller can run
+    them off the event loop without a database connection.
+    """
+
+    def __init__(self, upload, offset, length, sha256=''):
+        _unfinished(upload)
+        if upload.storage_name:
+            raise UploadError('This upload goes directly to storage', status=409)
+        if offset != upload.received:
+            raise UploadError(f'Chunk must start at offset {upload.received}', status=409, offset=upload.received)
+        if length <= 0:
+            raise UploadError('Chunk is empty')
+        if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise UploadError(f'Chunks may be at most {settings.UPLOAD_MAX_CHUNK_SIZE} bytes', status=413)
+        if offset + length > upload.size:
+            raise UploadError(f'Chunk ends past the declared size of {upload.size} bytes', status=413)
+        self.upload = upload
+        self.offset = offset
+        self.length = length
+        self.sha256 = parse_sha256(sha256)
+        self.written = 0
+        self.hasher = hashlib.sha256()
+        self.lease = None
+        self.file = None
+
+    def _lease_until(self):
+        return timezone.now() + timedelta(seconds=settings.UPLOAD_CHUNK_LEASE_SECONDS)
+
+    def claim(self):
+        """Take the upload's write lease and open the partial file at the offset"""
+        now = timezone.now()
+        lease = self._lease_until()
+        claimed = Upload.objects.filter(
+            Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+            id=self.upload.id, status='pending', received=self.offset,
+        ).update(lease_until=lease)
+        if not claimed:
+            current = Upload.objects.filter(id=self.upload.id).values_list('status', 'received').first()
+            if current is None or current[0] != 'pending':
+                raise UploadError('Upload is no longer pending', status=409)
+            if current[1] != self.offset:
+                raise UploadError(f'Chunk must start at offset {current[1]}', status=409, offset=current[1])
+            raise UploadError('Another chunk of this upload is being written', status=409, offset=current[1])
+        self.lease = lease
+        self.file = open(self.upload.part_path, 'r+b')
+        # Drop whatever an earlier, failed attempt at this chunk left behind
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+
+    def lease_due(self):
+        """Whether the lease is past half its time and should be renewed"""
+        half = timedelta(seconds=settings.UPLOAD_CHUNK_LEASE_SECONDS / 2)
+        return timezone.now() >= self.lease - half
+
+    def renew_lease(self):
+        lease = self._lease_until()
+        if not Upload.objects.filter(id=self.upload.id, lease_until=self.lease).update(lease_until=lease):
+            raise UploadError('Chunk write timed out', status=409)
+        self.lease = lease
+
+    def write(self, data):
+        if self.written + len(data) > self.length:
+            raise UploadError('Chunk is longer than its Content-Length')
+        if timezone.now() >= self.lease:
+            raise UploadError('Chunk write timed out', status=409)
+        self.file.write(data)
+        self.hasher.update(data)
+        self.written += len(data)
+
+    def finish(self):
+        """Check the chunk is whole and intact and flush it to disk"""
+        if self.written != self.length:
+            raise UploadError(f'Chunk ended after {self.written} of {self.length} bytes')
+        if self.sha256 and self.hasher.hexdigest() != self.sha256:
+            raise UploadError('Chunk checksum mismatch')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def commit(self):
+        """Advance the upload's offset past this chunk and release the lease"""
+        new_offset = self.offset + self.length
+        committed = Upload.objects.filter(
+            id=self.upload.id, received=self.offset, lease_until=self.lease
+        ).update(received=new_offset, lease_until=None, updated_at=timezone.now(), expires_at=_expiry())
+        if not committed:
+            raise UploadError('Chunk write timed out', status=409)
+        self.lease = None
+        return new_offset
+
+    def abort(self):
+        """Discard a partly written chunk, if this writer still owns the upload"""
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+        if self.lease is None or timezone.now() >= self.lease:
+            return
+        # Another writer may have taken over a lease that ran out, and committed bytes past our offset
+        if Upload.objects.filter(id=self.upload.id, received=self.offset, lease_until=self.lease).exists():
+            with open(self.upload.part_path, 'r+b') as part:
+                part.truncate(self.offset)
+            Upload.objects.filter(id=self.upload.id, lease_until=self.lease).update(lease_until=None)
+        self.lease = None
+
+
+def write_chunk(upload, offset, length, read, sha256=''):
+    """Stream ``length`` bytes from ``read(n)`` into the upload; return the new offset"""
+    writer = ChunkWriter(upload, offset, length, sha256)
+    writer.claim()
+    try:
+        remaining = length
+        while remaining:
+            data = read(min(READ_BLOCK_SIZE, remaining))
+            if not data:
+                break
+            if writer.lease_due():
+                writer.renew_lease()
+            writer.write(data)
+            remaining -= len(data)
+        writer.finish()
+        return writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def remove_upload_data(upload):
+    """Delete whatever bytes of an unfinished upload were stored"""
+    if upload.storage_name:
+        default_storage.delete(upload.storage_name)
+    elif os.path.exists(upload.part_path):
+        os.remove(upload.part_path)
+
+
+def _discard(upload):
+    Upload.objects.filter(id=upload.id).update(status='aborted', lease_until=None)
+    remove_upload_data(upload)
+
+
+def _finalize_direct(upload, target):
+    """Record a direct upload whose object the storage service already checked"""
+    if not default_storage.exists(upload.storage_name):
+        raise UploadError('The file has not been uploaded yet', status=409)
+    if default_storage.size(upload.storage_name) != upload.size:
+        return False
+    target.sha256 = upload.sha256
+    target.file.name = upload.storage_name
+    target.save()
+    upload.status = 'complete'
+    upload.save(update_fields=['status', 'updated_at'])
+    return True
+
+
+def finalize_upload(upload):
+    """
+    Verify a fully received upload and store it as its target object.
+
+    Returns the new ``Submission`` or ``LessonAttachment``. An upload whose
+    bytes do not match its declared SHA-256 is discarded.
+    """
+    with transaction.atomic():
+        upload = Upload.objects.select_for_update().get(id=upload.id)
+        _unfinished(upload)
+        course_id = None
+        if upload.purpose == 'submission':
+            course_id = submission_course(upload.event, upload.owner)
+            if course_id is None:
+                raise UploadError('You are not enrolled in a course of this assignment', status=403)
+        target = _new_target(upload, course_id)
+        target.filename = upload.filename
+        target.content_type = upload.content_type
+        target.size = upload.size
+
+        if upload.storage_name:
+            mismatch = not _finalize_direct(upload, target)
+        else:
+            if upload.lease_until and upload.lease_until > timezone.now():
+                raise UploadError('A chunk of this upload is still being written', status=409, offset=upload.received)
+            if upload.received != upload.size:
+                raise UploadError(
+                    f'Only {upload.received} of {upload.size} bytes have been received',
+                    status=409, offset=upload.received,
+                )
+            target.sha256 = _file_sha256(upload.part_path)
+            mismatch = bool(upload.sha256) and target.sha256 != upload.sha256
+
+        if not mismatch and not upload.storage_name:
+            with _PartFile(open(upload.part_path, 'rb')) as part:
+                target.file.save(get_valid_filename(upload.filename), part, save=False)
+            try:
+                target.save()
+                upload.status = 'complete'
+                upload.save(update_fields=['status', 'updated_at'])
+            except BaseException:
+                target.file.delete(save=False)
+                raise
+
+    if mismatch:
+        _discard(upload)
+        raise UploadError('File checksum mismatch; the upload was discarded')
+    if not upload.storage_name and os.path.exists(upload.part_path):
+        # Storage backends that copy rather than move leave the partial file behind
+        os.remove(upload.part_path)
+    return target
+
+
+def abort_upload(upload):
+    """Cancel a pending upload unless a chunk is being written right now"""
+    _unfinished(upload)
+    aborted = Upload.objects.filter(
+        Q(lease_until__isnull=True) | Q(lease_until__lt=timezone.now()),
+        id=upload.id, status='pending',
+    ).update(status='aborted')
+    if not aborted:
+        raise UploadError('A chunk of this upload is being written', status=409)
+    remove_upload_data(upload)
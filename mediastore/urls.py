@@ -0,0 +1,17 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Resumable upload endpoints (chunks are streamed by mediastore.asgi under ASGI)
+    path('uploads/', views.api_start_upload, name='api-start-upload'),
+    path('uploads/<uuid:upload_id>/', views.api_upload_status, name='api-upload-status'),
+    path('uploads/<uuid:upload_id>/chunk/', views.api_upload_chunk, name='api-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', views.api_finalize_upload, name='api-finalize-upload'),
+    path('uploads/<uuid:upload_id>/abort/', views.api_abort_upload, name='api-abort-upload'),
+    
+    # Stored file endpoints
+    path('lessons/<int:lesson_id>/attachments/', views.api_lesson_attachments, name='api-lesson-attachments'),
+    path('events/<int:event_id>/submissions/', views.api_event_submissions, name='api-event-submissions'),
+    path('attachments/<int:attachment_id>/download/', views.api_download_attachment, name='api-download-attachment'),
+    path('submissions/<int:submission_id>/download/', views.api_download_submission, name='api-download-submission'),
+]
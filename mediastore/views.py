@@ -0,0 +1,393 @@
+import json
+import logging
+import posixpath
+import re
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from courses.models import Lesson
+from schedule.models import Event
+from .delivery import serve_file
+from .models import LessonAttachment, Submission, Upload
+from .storage import supports_presigned_urls
+from .uploads import (
+    UploadError, abort_upload, direct_upload_url, finalize_upload, start_upload, submission_course, write_chunk,
+)
+from users.jwt_utils import JWTManager, get_token_from_request, jwt_required
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+def _upload_to_dict(upload):
+    return {
+        'id': str(upload.id),
+        'purpose': upload.purpose,
+        'lesson': upload.lesson_id,
+        'event': upload.event_id,
+        'filename': upload.filename,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'offset': upload.received,
+        'sha256': upload.sha256 or None,
+        'status': upload.status,
+        'direct': bool(upload.storage_name),
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+        'max_chunk_size': settings.UPLOAD_MAX_CHUNK_SIZE,
+        'expires_at': upload.expires_at.isoformat(),
+        'created_at': upload.created_at.isoformat(),
+    }
+
+
+def _file_to_dict(stored):
+    data = {
+        'id': stored.id,
+        'filename': stored.filename,
+        'content_type': stored.content_type,
+        'size': stored.size,
+        'sha256': stored.sha256,
+    }
+    if isinstance(stored, Submission):
+        data.update({
+            'download_url': f'/files/submissions/{stored.id}/download/',
+            'event': stored.event_id,
+            'course': stored.course_id,
+            'student': stored.student_id,
+            'submitted_at': stored.submitted_at.isoformat(),
+        })
+    else:
+        data.update({
+            'download_url': f'/files/attachments/{stored.id}/download/',
+            'lesson': stored.lesson_id,
+            'uploaded_by': stored.uploaded_by_id,
+            'created_at': stored.created_at.isoformat(),
+        })
+    return data
+
+
+def _upload_error(error):
+    data = {'error': str(error)}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    return JsonResponse(data, status=error.status)
+
+
+def _own_upload(request, upload_id):
+    return get_object_or_404(Upload, id=upload_id, owner=request.user)
+
+
+def _upload_urls(request, upload):
+    """Where the client sends the bytes of a pending upload and then finalizes it"""
+    urls = {'finalize_url': request.build_absolute_uri(f'/files/uploads/{upload.id}/finalize/')}
+    if upload.storage_name:
+        urls['upload_url'], urls['upload_headers'] = direct_upload_url(upload)
+    else:
+        urls['chunk_url'] = request.build_absolute_uri(f'/files/uploads/{upload.id}/chunk/')
+    return urls
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def api_start_upload(request):
+    """
+    API endpoint to start a resumable upload.
+
+    Send ``{"purpose": "submission", "event": id}`` or ``{"purpose":
+    "lesson_attachment", "lesson": id}`` with ``filename``, ``size`` and
+    optionally ``sha256`` and ``content_type``. Then PUT the bytes to the
+    returned ``chunk_url`` in chunks of at most ``max_chunk_size`` bytes, each
+    with an ``Upload-Offset`` header (and optionally ``X-Chunk-Sha256``), and
+    POST to ``finalize_url``.
+
+    With object storage and a ``sha256``, the upload is direct unless
+    ``"direct": false`` is sent: PUT the whole file to ``upload_url`` with the
+    ``upload_headers`` instead of sending chunks, then finalize.
+    """
+    try:
+        data = json.loads(request.body)
+        purpose = data.get('purpose')
+        lesson = event = None
+
+        if purpose == 'submission':
+            event = Event.objects.filter(id=data.get('event') or 0, event_type='assignment').first()
+            if event is None:
+                return JsonResponse({
+                    'error': 'event must be an assignment'
+                }, status=400)
+            if submission_course(event, request.user) is None:
+                return JsonResponse({
+                    'error': 'You are not enrolled in a course of this assignment'
+                }, status=403)
+        elif purpose == 'lesson_attachment':
+            lesson = Lesson.objects.select_related('course').filter(id=data.get('lesson') or 0).first()
+            if lesson is None:
+                return JsonResponse({
+                    'error': 'lesson not found'
+                }, status=400)
+            if request.user.user_role != 'admin' and lesson.course.created_by != request.user:
+                logger.warning(f"Unauthorized attachment upload attempt: Lesson ID {lesson.id} by {request.user.email}")
+                return JsonResponse({
+                    'error': 'Permission denied'
+                }, status=403)
+        else:
+            return JsonResponse({
+                'error': 'purpose must be submission or lesson_attachment'
+            }, status=400)
+
+        upload = start_upload(
+            request.user, purpose, data.get('filename'), data.get('size'),
+            sha256=data.get('sha256'), content_type=data.get('content_type'), lesson=lesson, event=event,
+            direct=bool(data.get('direct', supports_presigned_urls() and data.get('sha256'))),
+        )
+
+        logger.info(f"Upload {upload.id} ({upload.size} bytes) started by {request.user.email}")
+        return JsonResponse({
+            'success': True,
+            'upload': _upload_to_dict(upload),
+            **_upload_urls(request, upload),
+        }, status=201)
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Upload start error by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to start upload'
+        }, status=500)
+
+
+@jwt_required
+def api_upload_status(request, upload_id):
+    """
+    API endpoint to get an upload's state, including the offset to resume from
+    and, for a pending direct upload, a fresh ``upload_url``
+    """
+    upload = _own_upload(request, upload_id)
+    data = {
+        'success': True,
+        'upload': _upload_to_dict(upload)
+    }
+    if upload.status == 'pending':
+        data.update(_upload_urls(request, upload))
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["PUT"])
+def api_upload_chunk(request, upload_id):
+    """
+    API endpoint to store one chunk of an upload.
+
+    Under ASGI these requests are answered by ``mediastore.asgi`` instead, so
+    a slow client holds no worker thread; this view serves WSGI deployments
+    and reads the body in small blocks straight to disk.
+    """
+    upload = _own_upload(request, upload_id)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({
+            'error': 'Upload-Offset and Content-Length headers are required'
+        }, status=400)
+
+    try:
+        new_offset = write_chunk(upload, offset, length, request.read, request.headers.get('X-Chunk-Sha256'))
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Upload chunk error for upload {upload_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to store chunk'
+        }, status=500)
+
+    return JsonResponse({
+        'success': True,
+        'offset': new_offset,
+        'size': upload.size,
+        'complete': new_offset == upload.size
+    })
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def api_finalize_upload(request, upload_id):
+    """API endpoint to verify a fully received upload and store it as a submission or attachment"""
+    upload = _own_upload(request, upload_id)
+    try:
+        stored = finalize_upload(upload)
+    except UploadError as e:
+        logger.warning(f"Upload {upload_id} by {request.user.email} not finalized: {str(e)}")
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Upload finalize error for upload {upload_id} by {request.user.email}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Failed to finalize upload'
+        }, status=500)
+
+    logger.info(f"Upload {upload_id} stored as {upload.purpose} {stored.id} by {request.user.email}")
+    return JsonResponse({
+        'success': True,
+        'purpose': upload.purpose,
+        'file': _file_to_dict(stored)
+    }, status=201)
+
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["DELETE"])
+def api_abort_upload(request, upload_id):
+    """API endpoint to cancel an upload and discard its bytes"""
+    upload = _own_upload(request, upload_id)
+    try:
+        abort_upload(upload)
+    except UploadError as e:
+        return _upload_error(e)
+
+    logger.info(f"Upload {upload_id} aborted by {request.user.email}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Upload aborted'
+    })
+
+
+@jwt_required
+def api_lesson_attachments(request, lesson_id):
+    """API endpoint to list a lesson's attachments"""
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), id=lesson_id)
+    if request.user.user_role not in ['admin', 'professor'] and not lesson.course.is_active:
+        return JsonResponse({
+            'error': 'Lesson not found'
+        }, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'lesson': lesson.id,
+        'attachments': [_file_to_dict(attachment) for attachment in LessonAttachment.objects.filter(lesson=lesson)]
+    })
+
+
+@jwt_required
+def api_event_submissions(request, event_id):
+    """API endpoint to list an assignment's submissions: students see their own, course staff all"""
+    event = get_object_or_404(Event.objects.select_related('course'), id=event_id, event_type='assignment')
+    submissions = Submission.objects.filter(event=event).order_by('student_id', '-submitted_at')
+
+    is_staff = request.user.user_role == 'admin' or (event.course and event.course.created_by_id == request.user.id)
+    if not is_staff:
+        submissions = submissions.filter(student=request.user)
+    if request.GET.get('latest') == 'true':
+        submissions = submissions.distinct('student_id')
+
+    return JsonResponse({
+        'success': True,
+        'event': event.id,
+        'submissions': [_file_to_dict(submission) for submission in submissions]
+    })
+
+
+# Media whose path alone says it is public (course, lesson and profile images and their variants;
+# only images are stored as blobs)
+PUBLIC_MEDIA_PREFIXES = ('blobs/', 'courses/', 'users/')
+PUBLIC_LESSON_MEDIA_RE = r'^lessons/lesson_\d+/(?:lesson_image\.|variants/)'
+
+
+def _media_user(request):
+    """User from the Authorization header or, for links opened by the browser, a ``token`` parameter"""
+    token = get_token_from_request(request) or request.GET.get('token')
+    user = JWTManager.get_user_from_token(token) if token else None
+    return user if user and user.is_active else None
+
+
+def _can_read_attachment(user, attachment):
+    return user.user_role in ['admin', 'professor'] or attachment.lesson.course.is_active
+
+
+def _can_read_submission(user, submission):
+    return (
+        user.user_role == 'admin'
+        or submission.student_id == user.id
+        or submission.course.created_by_id == user.id
+    )
+
+
+def _send(request, name, private=True, download_name=None, content_type=None):
+    try:
+        return serve_file(request, name, private, download_name, content_type or None)
+    except FileNotFoundError:
+        raise Http404('File not found')
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """
+    Serve a file under ``MEDIA_URL`` after checking who may read it.
+    
+    Images are public; lesson attachments and submissions need a token (in the
+    Authorization header or a ``token`` parameter) of a user allowed to see them.
+    Their type is whatever the uploader declared, so they are always sent as
+    downloads: an HTML or SVG upload must never render on this origin.
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name != path or name.startswith(('.', '..')):
+        raise Http404('File not found')
+    
+    if name.startswith(PUBLIC_MEDIA_PREFIXES) or re.match(PUBLIC_LESSON_MEDIA_RE, name):
+        return _send(request, name, private=False)
+    
+    attachment = LessonAttachment.objects.select_related('lesson__course').filter(file=name).first()
+    submission = None if attachment else Submission.objects.select_related('course').filter(file=name).first()
+    if attachment is None and submission is None:
+        raise Http404('File not found')
+    
+    user = _media_user(request)
+    if user is None:
+        return JsonResponse({
+            'error': 'Authentication required'
+        }, status=401)
+    if attachment and _can_read_attachment(user, attachment):
+        return _send(request, name, download_name=attachment.filename, content_type=attachment.content_type)
+    if submission and _can_read_submission(user, submission):
+        return _send(request, name, download_name=submission.filename, content_type=submission.content_type)
+    logger.warning(f"Unauthorized media access: {name} by {user.email}")
+    raise Http404('File not found')
+
+
+@require_http_methods(["GET", "HEAD"])
+def api_download_attachment(request, attachment_id):
+    """API endpoint to download a lesson attachment under its original name"""
+    user = _media_user(request)
+    if user is None:
+        return JsonResponse({
+            'error': 'Authentication required'
+        }, status=401)
+    attachment = get_object_or_404(LessonAttachment.objects.select_related('lesson__course'), id=attachment_id)
+    if not _can_read_attachment(user, attachment):
+        raise Http404('Attachment not found')
+    return _send(request, attachment.file.name, download_name=attachment.filename, content_type=attachment.content_type)
+
+
+@require_http_methods(["GET", "HEAD"])
+def api_download_submission(request, submission_id):
+    """API endpoint to download a submission: its student, the course's professor and admins"""
+    user = _media_user(request)
+    if user is None:
+        return JsonResponse({
+            'error': 'Authentication required'
+        }, status=401)
+    submission = get_object_or_404(Submission.objects.select_related('course'), id=submission_id)
+    if not _can_read_submission(user, submission):
+        logger.warning(f"Unauthorized submission download: Submission ID {submission_id} by {user.email}")
+        raise Http404('Submission not found')
+    return _send(request, submission.file.name, download_name=submission.filename, content_type=submission.content_type)
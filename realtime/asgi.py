@@ -0,0 +1,120 @@
+"""
+Server-sent events endpoint for change notifications.
+
+Served as a plain ASGI application (see ``university_core/asgi.py``) so an
+idle subscriber costs one small task and queue, not a Django request.
+"""
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from users.jwt_utils import JWTManager
+from .broker import broker, Subscription, OVERFLOW
+
+logger = logging.getLogger(__name__)
+
+TOPICS = {'event', 'course', 'lesson'}
+
+
+def _authenticate(token):
+    close_old_connections()
+    try:
+        return JWTManager.get_user_from_token(token)
+    finally:
+        close_old_connections()
+
+
+async def _send_json_error(send, status, message):
+    body = ('{"error": "%s"}' % message).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _cancel_on_disconnect(receive, task):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            task.cancel()
+            return
+
+
+async def stream_changes(subscription, receive, send):
+    """Write queued notifications to the client until it disconnects"""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+    watcher = asyncio.create_task(_cancel_on_disconnect(receive, asyncio.current_task()))
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.REALTIME_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+
+            if message is OVERFLOW:
+                # Notifications were dropped; the client should refetch its data
+                subscription.overflowed = False
+                chunk = b'event: resync\ndata: {}\n\n'
+            else:
+                topic, payload = message
+                chunk = f'event: {topic}\ndata: {payload}\n\n'.encode()
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    except asyncio.CancelledError:
+        pass
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def sse_application(scope, receive, send):
+    """Stream ``event``/``course``/``lesson`` change notifications to an authenticated client"""
+    if scope['method'] != 'GET':
+        await _send_json_error(send, 405, 'Method not allowed')
+        return
+
+    # EventSource cannot set headers, so the access token may come in the query string
+    params = parse_qs(scope.get('query_string', b'').decode())
+    token = params.get('token', [None])[0]
+    if not token:
+        auth_header = dict(scope['headers']).get(b'authorization', b'').decode()
+        if auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+    if not token:
+        await _send_json_error(send, 401, 'Authentication required')
+        return
+
+    user = await sync_to_async(_authenticate)(token)
+    if not user or not user.is_active:
+        await _send_json_error(send, 401, 'Invalid or expired token')
+        return
+
+    topics = None
+    if params.get('topics'):
+        topics = set(params['topics'][0].split(',')) & TOPICS
+
+    subscription = broker.subscribe(Subscription(
+        asyncio.get_running_loop(),
+        asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE),
+        topics,
+    ))
+    logger.debug(f"Change stream opened by {user.email} ({broker.subscriber_count} subscribers)")
+    await stream_changes(subscription, receive, send)
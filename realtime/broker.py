@@ -0,0 +1,164 @@
+"""
+In-process fan-out of change notifications.
+
+Every worker process owns one ``ChangeBroker``. On PostgreSQL, published
+changes go out through ``NOTIFY`` and each worker that has subscribers runs a
+single ``LISTEN`` thread which fans them out to its local subscribers, so a
+write handled by any worker reaches clients connected to every worker. On
+other databases notifications are delivered to the local process only.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of a message when a slow subscriber's queue overflows
+OVERFLOW = object()
+
+
+class Subscription:
+    """A single connected client; messages are delivered on its event loop"""
+
+    def __init__(self, loop, queue, topics=None):
+        self.loop = loop
+        self.queue = queue
+        self.topics = topics
+        self.overflowed = False
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def deliver(self, message):
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Queue is full: drop further messages and tell the client to resync
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class ChangeBroker:
+    def __init__(self, channel):
+        self.channel = channel
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    @property
+    def uses_notify(self):
+        return settings.REALTIME_USE_PG_NOTIFY and connections['default'].vendor == 'postgresql'
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+        if self.uses_notify:
+            self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, topic, action, object_id, **extra):
+        """Announce a committed change to subscribers in every worker"""
+        message = {
+            'topic': topic,
+            'action': action,
+            'id': object_id,
+            'ts': timezone.now().isoformat(),
+            **extra,
+        }
+        payload = json.dumps(message, separators=(',', ':'))
+        if not self.uses_notify:
+            self.dispatch(payload)
+            return
+        try:
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+        except Exception as e:
+            logger.error(f"Failed to publish change notification: {str(e)}")
+
+    def publish_on_commit(self, topic, action, object_id, **extra):
+        transaction.on_commit(lambda: self.publish(topic, action, object_id, **extra))
+
+    def dispatch(self, payload):
+        """Fan a serialized message out to local subscribers (thread-safe)"""
+        try:
+            topic = json.loads(payload)['topic']
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring malformed change notification: {payload[:200]}")
+            return
+        message = (topic, payload)
+        with self._lock:
+            subscribers = [sub for sub in self._subscribers if sub.wants(topic)]
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, message)
+            except RuntimeError:
+                # Event loop already closed; the subscriber is gone
+                self.unsubscribe(sub)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen_forever,
+                name='realtime-listener',
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen_forever(self):
+        delay = 1
+        while True:
+            try:
+                self._listen()
+                delay = 1
+            except Exception as e:
+                logger.error(f"Change listener connection failed: {str(e)}; retrying in {delay}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _listen(self):
+        params = connections['default'].get_connection_params()
+        conn = psycopg2.connect(**params)
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            logger.info(f"Listening for change notifications on channel '{self.channel}'")
+            while True:
+                ready, _, _ = select.select([conn], [], [], 30)
+                if ready:
+                    conn.poll()
+                else:
+                    # Idle: make sure the connection is still alive; notifications that
+                    # arrive meanwhile are read with its result and dispatched below
+                    with conn.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                while conn.notifies:
+                    self.dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+
+broker = ChangeBroker(settings.REALTIME_CHANNEL)
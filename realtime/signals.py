@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from courses.models import Course, Lesson
+from schedule.models import Event
+from .broker import broker
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def announce_saved(sender, instance, created, **kwargs):
+    extra = {'course': instance.course_id} if sender is Lesson else {}
+    broker.publish_on_commit(
+        sender._meta.model_name,
+        'created' if created else 'updated',
+        instance.pk,
+        **extra,
+    )
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+def announce_deleted(sender, instance, **kwargs):
+    extra = {'course': instance.course_id} if sender is Lesson else {}
+    broker.publish_on_commit(sender._meta.model_name, 'deleted', instance.pk, **extra)
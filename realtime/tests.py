@@ -0,0 +1,157 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .asgi import sse_application
+from .broker import OVERFLOW, ChangeBroker, Subscription, broker as shared_broker
+
+
+class FakeListenConnection:
+    """psycopg2 connection whose keep-alive query reads a notification"""
+
+    def __init__(self):
+        self.notifies = []
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if sql == 'SELECT 1':
+            self.notifies.append(mock.Mock(payload='{"topic":"event","id":1}'))
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@override_settings(REALTIME_USE_PG_NOTIFY=False)
+class ListenTests(SimpleTestCase):
+    def test_notifications_read_by_the_keep_alive_are_dispatched(self):
+        broker = ChangeBroker('changes')
+        dispatched = []
+        # Idle once, then stop the loop at the next wait
+        waits = iter([([], [], []), KeyboardInterrupt()])
+
+        def wait(*args):
+            result = next(waits)
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
+        with mock.patch('realtime.broker.psycopg2.connect', return_value=FakeListenConnection()), \
+                mock.patch('realtime.broker.select.select', side_effect=wait), \
+                mock.patch.object(broker, 'dispatch', side_effect=dispatched.append):
+            with self.assertRaises(KeyboardInterrupt):
+                broker._listen()
+
+        self.assertEqual(dispatched, ['{"topic":"event","id":1}'])
+
+
+@override_settings(REALTIME_USE_PG_NOTIFY=False)
+class BrokerTests(SimpleTestCase):
+    async def test_messages_reach_subscribers_of_their_topic(self):
+        broker = ChangeBroker('changes')
+        loop = asyncio.get_running_loop()
+        everything = broker.subscribe(Subscription(loop, asyncio.Queue()))
+        courses = broker.subscribe(Subscription(loop, asyncio.Queue(), {'course'}))
+
+        broker.publish('event', 'updated', 1)
+        broker.publish('course', 'created', 2, title='Algebra')
+        await asyncio.sleep(0)
+
+        received = [everything.queue.get_nowait() for _ in range(2)]
+        self.assertEqual([topic for topic, _ in received], ['event', 'course'])
+        topic, payload = courses.queue.get_nowait()
+        self.assertEqual(json.loads(payload)['title'], 'Algebra')
+        self.assertTrue(courses.queue.empty())
+
+        broker.unsubscribe(everything)
+        broker.publish('event', 'deleted', 1)
+        await asyncio.sleep(0)
+        self.assertTrue(everything.queue.empty())
+
+    async def test_slow_subscriber_is_told_to_resync(self):
+        subscription = Subscription(asyncio.get_running_loop(), asyncio.Queue(maxsize=2))
+
+        for number in range(4):
+            subscription.deliver(('event', str(number)))
+
+        # The oldest queued message makes room for the resync marker; later ones are dropped
+        self.assertEqual(subscription.queue.get_nowait(), ('event', '1'))
+        self.assertIs(subscription.queue.get_nowait(), OVERFLOW)
+        self.assertTrue(subscription.queue.empty())
+
+    def test_malformed_payloads_are_ignored(self):
+        ChangeBroker('changes').dispatch('not json')
+
+
+@override_settings(REALTIME_USE_PG_NOTIFY=False, REALTIME_HEARTBEAT_SECONDS=0.05)
+class SSEApplicationTests(SimpleTestCase):
+    def scope(self, method='GET', query=b'token=secret'):
+        return {'type': 'http', 'method': method, 'query_string': query, 'headers': []}
+
+    async def call(self, scope):
+        sent = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await sse_application(scope, receive, send)
+        return sent
+
+    async def test_requests_without_a_valid_token_are_rejected(self):
+        self.assertEqual((await self.call(self.scope(query=b'')))[0]['status'], 401)
+        self.assertEqual((await self.call(self.scope(method='POST')))[0]['status'], 405)
+        with mock.patch('realtime.asgi._authenticate', return_value=None):
+            self.assertEqual((await self.call(self.scope()))[0]['status'], 401)
+
+    async def test_changes_stream_until_the_client_disconnects(self):
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def wait_for(chunk):
+            for _ in range(100):
+                if any(chunk in message.get('body', b'') for message in sent):
+                    return
+                await asyncio.sleep(0.01)
+            self.fail(f'{chunk!r} was not sent')
+
+        user = mock.Mock(is_active=True, email='student@example.com')
+        with mock.patch('realtime.asgi._authenticate', return_value=user):
+            stream = asyncio.create_task(sse_application(self.scope(query=b'token=secret&topics=course'), receive, send))
+            await wait_for(b'retry: 5000')
+            self.assertEqual(shared_broker.subscriber_count, 1)
+
+            shared_broker.publish('event', 'updated', 1)
+            shared_broker.publish('course', 'updated', 2)
+            await wait_for(b'event: course')
+            await wait_for(b': keep-alive')
+            disconnected.set()
+            await asyncio.wait_for(stream, 1)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(any(b'event: event' in message.get('body', b'') for message in sent))
+        self.assertEqual(shared_broker.subscriber_count, 0)
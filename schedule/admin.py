@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event
+from .models import AttendanceSheet, Event, EventParticipant, EventTarget, EventTombstone, CalendarFeed, Room
 
 
 @admin.register(Event)
@@ -8,4 +8,49 @@ class EventAdmin(admin.ModelAdmin):
     list_filter = ('assigned_date', 'created_at', 'creator')
     search_fields = ('title', 'description', 'creator__email')
     date_hierarchy = 'assigned_date'
-    ordering = ('-assigned_date', '-created_at')
\ No newline at end of file
+    ordering = ('-assigned_date', '-created_at')
+
+
+@admin.register(EventParticipant)
+class EventParticipantAdmin(admin.ModelAdmin):
+    list_display = ('event', 'user', 'created_at')
+    search_fields = ('user__email', 'event__title')
+    raw_id_fields = ('event', 'user')
+
+
+@admin.register(EventTarget)
+class EventTargetAdmin(admin.ModelAdmin):
+    list_display = ('event', 'target_type', 'course', 'role')
+    list_filter = ('target_type', 'role')
+    raw_id_fields = ('event', 'course')
+
+
+@admin.register(AttendanceSheet)
+class AttendanceSheetAdmin(admin.ModelAdmin):
+    list_display = ('event', 'course', 'present_count', 'roster_size', 'taken_by', 'updated_at')
+    list_filter = ('course',)
+    raw_id_fields = ('event', 'course', 'taken_by')
+    readonly_fields = ('roster', 'present', 'present_count', 'roster_size', 'created_at', 'updated_at')
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'building', 'capacity', 'created_at')
+    list_filter = ('building',)
+    search_fields = ('name', 'building')
+    readonly_fields = ('normalized_name', 'created_at')
+
+
+@admin.register(EventTombstone)
+class EventTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'deleted_at')
+    date_hierarchy = 'deleted_at'
+    ordering = ('-deleted_at',)
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('user', 'event_type', 'priority', 'created_at')
+    list_filter = ('event_type', 'priority', 'created_at')
+    search_fields = ('user__email',)
+    readonly_fields = ('token', 'created_at')
@@ -0,0 +1,148 @@
+"""
+Room and time-slot utilisation over an academic term.
+
+Events are loaded as plain ``(assigned_date, start_time, end_time, location,
+event_type)`` tuples and converted to NumPy arrays once. Busy minutes are
+accumulated with ``np.bincount`` over flattened (room, week, weekday, slot)
+indices, so no model instance is built and nothing is computed per event in
+Python.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models.functions import Coalesce
+
+from .models import Event
+
+PERCENTILES = (50, 75, 90, 95)
+
+
+def load_term_rows(term_start, term_end):
+    """Timed events in [term_start, term_end) as tuples; the room name wins over free text"""
+    return list(
+        Event.objects
+        .filter(
+            assigned_date__gte=term_start, assigned_date__lt=term_end, is_all_day=False,
+            start_time__isnull=False, end_time__isnull=False,
+        )
+        .values_list('assigned_date', 'start_time', 'end_time', Coalesce('room__name', 'location'), 'event_type')
+    )
+
+
+def _minutes(times):
+    return np.fromiter((value.hour * 60 + value.minute for value in times), dtype=np.int64, count=len(times))
+
+
+def _factorize(values):
+    """Return (sorted unique labels, index of each value's label)"""
+    codes = {}
+    index = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int64, count=len(values))
+    labels = np.array(list(codes), dtype=str)
+    order = np.argsort(labels, kind='stable')
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return labels[order], remap[index]
+
+
+def _percentiles(values):
+    if not len(values):
+        return {str(p): None for p in PERCENTILES}
+    return {str(p): round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def compute_utilisation(rows, term_start, term_end, day_start, day_end, slot_minutes, weekdays=5):
+    """
+    Occupancy of every room and teaching slot over a term.
+
+    ``day_start``/``day_end`` are minutes after midnight bounding the teaching
+    day, split into slots of ``slot_minutes``; only the first ``weekdays`` days
+    of the week are counted. Utilisation is busy minutes over available
+    minutes, so 1.0 means fully booked.
+    """
+    slot_count = (day_end - day_start) // slot_minutes
+    slot_starts = day_start + np.arange(slot_count) * slot_minutes
+    offset = term_start.weekday()
+    term_days = (term_end - term_start).days
+    week_count = (offset + term_days + 6) // 7
+
+    # Teaching days of each week inside the term (first and last week may be partial)
+    all_days = np.arange(term_days) + offset
+    teaching = all_days % 7 < weekdays
+    days_per_week = np.bincount(all_days[teaching] // 7, minlength=week_count)
+
+    if rows:
+        dates, starts, ends, places, event_types = zip(*rows)
+    else:
+        dates = starts = ends = places = event_types = ()
+    day_index = np.fromiter(
+        (value.toordinal() for value in dates), dtype=np.int64, count=len(dates),
+    ) - term_start.toordinal() + offset
+    start = _minutes(starts)
+    end = _minutes(ends)
+    rooms, room_index = _factorize([place or '' for place in places])
+    types, type_index = _factorize(event_types)
+
+    # Minutes each event overlaps each slot: (events x slots)
+    overlap = np.clip(
+        np.minimum(end[:, None], slot_starts + slot_minutes) - np.maximum(start[:, None], slot_starts),
+        0, None,
+    )
+    overlap[day_index % 7 >= weekdays] = 0
+    in_grid = overlap.any(axis=1)
+
+    week = day_index // 7
+    weekday = day_index % 7
+    flat = ((room_index * week_count + week) * 7 + weekday)[:, None] * slot_count + np.arange(slot_count)
+    busy = np.bincount(
+        flat.ravel(), weights=overlap.ravel(), minlength=len(rooms) * week_count * 7 * slot_count,
+    ).reshape(len(rooms), week_count, 7, slot_count)[:, :, :weekdays]
+    # Double-booked rooms must not count a slot as more than fully used
+    np.minimum(busy, slot_minutes, out=busy)
+
+    # Events without a location still occupy time but belong to no room
+    named = rooms != ''
+    without_room = int((~named[room_index]).sum()) if len(rooms) else 0
+    busy = busy[named]
+    rooms = rooms[named]
+
+    week_capacity = days_per_week * slot_count * slot_minutes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        room_week = np.nan_to_num(busy.sum(axis=(2, 3)) / week_capacity)
+    room_term = busy.sum(axis=(1, 2, 3)) / max(int(week_capacity.sum()), 1)
+
+    # Per weekday and slot: share of (room, teaching day) pairs that were busy
+    days_per_weekday = np.bincount(all_days[teaching] % 7, minlength=7)[:weekdays]
+    slot_capacity = np.maximum(len(rooms) * days_per_weekday[:, None] * slot_minutes, 1)
+    slot_heatmap = busy.sum(axis=(0, 1)) / slot_capacity
+
+    durations = (end - start)[end > start]
+    type_minutes = np.bincount(type_index, weights=np.maximum(end - start, 0), minlength=len(types))
+
+    return {
+        'term': {'start': term_start.isoformat(), 'end': (term_end - timedelta(days=1)).isoformat()},
+        'slots': [
+            f'{minute // 60:02d}:{minute % 60:02d}' for minute in slot_starts.tolist()
+        ],
+        'weeks': [
+            (term_start + timedelta(days=7 * index - offset)).isoformat() for index in range(week_count)
+        ],
+        'rooms': [
+            {'name': name, 'utilisation': round(float(value), 4)}
+            for name, value in zip(rooms.tolist(), room_term)
+        ],
+        'room_week_heatmap': np.round(room_week, 4).tolist(),
+        'slot_heatmap': np.round(slot_heatmap, 4).tolist(),
+        'percentiles': {
+            'room_utilisation': _percentiles(room_term),
+            'room_week_utilisation': _percentiles(room_week[:, days_per_week > 0].ravel()),
+            'event_duration_minutes': _percentiles(durations),
+        },
+        'hours_by_event_type': {
+            name: round(float(minutes) / 60, 2) for name, minutes in zip(types.tolist(), type_minutes)
+        },
+        'stats': {
+            'events': len(rows),
+            'events_in_grid': int(in_grid.sum()),
+            'events_without_room': without_room,
+        },
+    }
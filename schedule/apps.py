@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ScheduleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'schedule'
\ No newline at end of file
+    name = 'schedule'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,106 @@
+"""
+Lecture attendance stored as one bitmap per lecture over the course roster.
+
+A whole roster is checked in with one request and one row write. Per-student
+rates are a single aggregate over the sheets whose roster contains the
+student (GIN indexed ``roster @> ARRAY[id]``), reading the student's bit with
+``get_bit``; per-course reports unpack every sheet of the course at once
+with NumPy.
+"""
+import numpy as np
+from django.db import connection
+
+from courses.models import Enrollment
+
+from .models import AttendanceSheet
+
+
+def course_roster(course_id):
+    """Sorted IDs of the students currently enrolled in a course"""
+    return list(
+        Enrollment.objects.filter(course_id=course_id, status='enrolled')
+        .order_by('student_id').values_list('student_id', flat=True)
+    )
+
+
+def unpack_attendance(bitmap, size):
+    """Boolean array of length ``size``: who on the roster attended"""
+    return np.unpackbits(
+        np.frombuffer(bytes(bitmap), dtype=np.uint8), count=size, bitorder='little',
+    ).astype(bool)
+
+
+def pack_attendance(roster, present_ids, previous=None):
+    """
+    Return (bitmap, present count, IDs not on the roster) for a check-in.
+
+    With ``previous`` (an existing bitmap) the students are added to those
+    already marked present instead of replacing them.
+    """
+    roster = np.asarray(roster, dtype=np.int64)
+    present_ids = np.unique(np.asarray(present_ids, dtype=np.int64))
+    mask = np.isin(roster, present_ids)
+    if previous is not None:
+        mask |= unpack_attendance(previous, len(roster))
+    unknown = np.setdiff1d(present_ids, roster)
+    return np.packbits(mask, bitorder='little').tobytes(), int(mask.sum()), unknown.tolist()
+
+
+_STUDENT_RATES = f"""
+    SELECT course_id, count(*), sum(get_bit(present, array_position(roster, %(student)s::bigint) - 1))
+    FROM {AttendanceSheet._meta.db_table}
+    WHERE roster @> ARRAY[%(student)s::bigint] {{course_filter}}
+    GROUP BY course_id
+"""
+
+
+def student_attendance(student_id, course_id=None):
+    """Return {course_id: (lectures attended, lectures on the roster)} for one student"""
+    params = {'student': student_id}
+    course_filter = ''
+    if course_id is not None:
+        course_filter = 'AND course_id = %(course)s'
+        params['course'] = course_id
+    with connection.cursor() as cursor:
+        cursor.execute(_STUDENT_RATES.format(course_filter=course_filter), params)
+        return {course: (int(attended or 0), int(expected)) for course, expected, attended in cursor.fetchall()}
+
+
+def course_attendance(course_id):
+    """Per-lecture and per-student attendance for a course"""
+    sheets = list(
+        AttendanceSheet.objects.filter(course_id=course_id)
+        .order_by('event__assigned_date', 'event__start_time', 'event_id')
+        .values_list('event_id', 'event__title', 'event__assigned_date', 'roster', 'present', 'present_count')
+    )
+    lectures = [
+        {
+            'event': event_id,
+            'title': title,
+            'assigned_date': assigned_date.isoformat(),
+            'present': present_count,
+            'roster_size': len(roster),
+            'rate': round(present_count / len(roster), 4) if roster else 0.0,
+        }
+        for event_id, title, assigned_date, roster, _, present_count in sheets
+    ]
+    if not sheets:
+        return lectures, [], 0.0
+
+    ids = np.concatenate([np.asarray(sheet[3], dtype=np.int64) for sheet in sheets])
+    bits = np.concatenate([unpack_attendance(sheet[4], len(sheet[3])) for sheet in sheets])
+    students, index = np.unique(ids, return_inverse=True)
+    expected = np.bincount(index, minlength=len(students))
+    attended = np.bincount(index, weights=bits, minlength=len(students)).astype(np.int64)
+
+    per_student = [
+        {
+            'student': student,
+            'attended': int(count),
+            'lectures': int(total),
+            'rate': round(float(count) / int(total), 4),
+        }
+        for student, count, total in zip(students.tolist(), attended, expected)
+    ]
+    overall = round(float(bits.sum()) / len(bits), 4) if len(bits) else 0.0
+    return lectures, per_student, overall
@@ -0,0 +1,24 @@
+"""
+Cache invalidation for schedule data.
+
+Cached schedule responses include the current events version in their key;
+any event write bumps the version so stale entries are simply never read again.
+"""
+from django.core.cache import cache
+
+EVENTS_VERSION_KEY = 'schedule:events_version'
+
+
+def get_events_version():
+    version = cache.get(EVENTS_VERSION_KEY)
+    if version is None:
+        cache.add(EVENTS_VERSION_KEY, 1, None)
+        version = cache.get(EVENTS_VERSION_KEY, 1)
+    return version
+
+
+def bump_events_version():
+    try:
+        cache.incr(EVENTS_VERSION_KEY)
+    except ValueError:
+        cache.set(EVENTS_VERSION_KEY, 1, None)
@@ -0,0 +1,126 @@
+"""
+iCalendar (RFC 5545) helpers for schedule feeds.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+# Columns fetched for each event when rendering a feed (see ``render_calendar``)
+FEED_FIELDS = (
+    'id', 'title', 'description', 'assigned_date', 'start_time', 'end_time',
+    'event_type', 'priority', 'location', 'is_all_day', 'updated_at',
+)
+
+# iCalendar priority scale: 1 is the highest, 9 the lowest
+ICS_PRIORITIES = {
+    'urgent': 1,
+    'high': 3,
+    'medium': 5,
+    'low': 9,
+}
+
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Encode a content line, folding it at 75 octets without splitting UTF-8 characters"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return encoded + b'\r\n'
+
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Step back over continuation bytes so multi-byte characters stay intact
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end])
+        start = end
+        limit = MAX_LINE_OCTETS - 1  # continuation lines start with a space
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def _format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_lines(row, tz):
+    (event_id, title, description, assigned_date, start_time, end_time,
+     event_type, priority, location, is_all_day, updated_at) = row
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event_id}@{settings.ICS_UID_DOMAIN}',
+        f'DTSTAMP:{_format_utc(updated_at)}',
+        f'LAST-MODIFIED:{_format_utc(updated_at)}',
+    ]
+
+    if is_all_day or not start_time:
+        lines.append(f'DTSTART;VALUE=DATE:{assigned_date:%Y%m%d}')
+        lines.append(f'DTEND;VALUE=DATE:{assigned_date + timedelta(days=1):%Y%m%d}')
+    else:
+        start = datetime.combine(assigned_date, start_time, tzinfo=tz)
+        lines.append(f'DTSTART:{_format_utc(start)}')
+        if end_time:
+            end = datetime.combine(assigned_date, end_time, tzinfo=tz)
+            if end < start:  # Handle events that cross midnight
+                end += timedelta(days=1)
+            lines.append(f'DTEND:{_format_utc(end)}')
+
+    lines.append(f'SUMMARY:{escape_text(title)}')
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    if location:
+        lines.append(f'LOCATION:{escape_text(location)}')
+    lines.append(f'CATEGORIES:{escape_text(event_type.upper())}')
+    lines.append(f'PRIORITY:{ICS_PRIORITIES.get(priority, 0)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render_calendar(rows, calendar_name, events_per_chunk=100):
+    """
+    Render ``FEED_FIELDS`` tuples as a VCALENDAR, yielding encoded chunks.
+
+    Rows are consumed lazily so callers can pass a server-side cursor and the
+    whole feed is never materialized.
+    """
+    tz = ZoneInfo(settings.TIME_ZONE)
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//University Core//Schedule//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(calendar_name)}',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+    yield b''.join(fold_line(line) for line in header)
+
+    buffer = []
+    pending = 0
+    for row in rows:
+        buffer.extend(fold_line(line) for line in _event_lines(row, tz))
+        pending += 1
+        if pending >= events_per_chunk:
+            yield b''.join(buffer)
+            buffer = []
+            pending = 0
+
+    buffer.append(fold_line('END:VCALENDAR'))
+    yield b''.join(buffer)
@@ -0,0 +1,219 @@
+"""
+Bulk event import from CSV and iCalendar uploads.
+
+Parsers yield ``(line_number, row)`` pairs lazily so an upload is never read
+into memory at once; ``import_events`` validates rows in batches and inserts
+each valid batch with ``bulk_create``.
+"""
+import csv
+import io
+from datetime import date, datetime, time, timezone as dt_timezone
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+
+from .models import Event
+
+CSV_COLUMNS = (
+    'title', 'assigned_date', 'start_time', 'end_time', 'event_type', 'priority',
+    'location', 'description', 'is_all_day', 'is_recurring',
+)
+
+EVENT_TYPES = dict(Event.EVENT_TYPES)
+PRIORITY_LEVELS = dict(Event.PRIORITY_LEVELS)
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+def parse_csv(fileobj):
+    """Yield rows from a CSV upload with a header line naming ``CSV_COLUMNS``"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _unescape(value):
+    return (
+        value.replace('\\n', '\n').replace('\\N', '\n')
+        .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+    )
+
+
+def _unfolded_lines(fileobj):
+    """Yield (line_number, content_line) with RFC 5545 line folding undone"""
+    current = None
+    start = 0
+    for number, raw in enumerate(fileobj, start=1):
+        line = raw.decode('utf-8-sig' if number == 1 else 'utf-8').rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, number
+    if current is not None:
+        yield start, current
+
+
+def _ics_datetime(value, params, tz):
+    """Return (date, time or None) in the server time zone for a DTSTART/DTEND value"""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], '%Y%m%d').date(), None
+    moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    if value.endswith('Z'):
+        moment = moment.replace(tzinfo=dt_timezone.utc).astimezone(tz)
+    elif 'TZID' in params:
+        try:
+            moment = moment.replace(tzinfo=ZoneInfo(params['TZID'])).astimezone(tz)
+        except ZoneInfoNotFoundError:
+            pass  # treat as floating local time
+    return moment.date(), moment.time()
+
+
+def _ics_priority(value):
+    try:
+        level = int(value)
+    except ValueError:
+        return ''
+    if level == 0:
+        return ''
+    if level <= 2:
+        return 'urgent'
+    if level <= 4:
+        return 'high'
+    if level == 5:
+        return 'medium'
+    return 'low'
+
+
+def parse_ics(fileobj):
+    """Yield one row per VEVENT, in the same shape as ``parse_csv`` rows"""
+    tz = ZoneInfo(settings.TIME_ZONE)
+    row = None
+    start_line = 0
+    for number, line in _unfolded_lines(fileobj):
+        if line == 'BEGIN:VEVENT':
+            row, start_line = {}, number
+            continue
+        if row is None:
+            continue
+        if line == 'END:VEVENT':
+            yield start_line, row
+            row = None
+            continue
+
+        name, _, value = line.partition(':')
+        name, *raw_params = name.split(';')
+        params = dict(param.partition('=')[::2] for param in raw_params)
+        name = name.upper()
+        try:
+            if name == 'DTSTART':
+                day, start = _ics_datetime(value, params, tz)
+                row['assigned_date'] = day.isoformat()
+                row['start_time'] = start.isoformat() if start else ''
+                row['is_all_day'] = 'true' if start is None else 'false'
+            elif name == 'DTEND':
+                _, end = _ics_datetime(value, params, tz)
+                row['end_time'] = end.isoformat() if end else ''
+            elif name == 'SUMMARY':
+                row['title'] = _unescape(value)
+            elif name == 'DESCRIPTION':
+                row['description'] = _unescape(value)
+            elif name == 'LOCATION':
+                row['location'] = _unescape(value)
+            elif name == 'CATEGORIES':
+                category = _unescape(value).split(',')[0].strip().lower()
+                if category in EVENT_TYPES:
+                    row['event_type'] = category
+            elif name == 'PRIORITY':
+                row['priority'] = _ics_priority(value)
+            elif name == 'RRULE':
+                row['is_recurring'] = 'true'
+        except ValueError:
+            row.setdefault('_errors', []).append(f'Invalid {name} value: {value}')
+
+
+def validate_row(row):
+    """Return (event field values, errors) for one parsed row"""
+    errors = list(row.get('_errors', []))
+    title = (row.get('title') or '').strip()
+    if not title:
+        errors.append('title is required')
+    elif len(title) > 200:
+        errors.append('title must be at most 200 characters')
+
+    assigned_date = None
+    if not row.get('assigned_date'):
+        errors.append('assigned_date is required')
+    else:
+        try:
+            assigned_date = date.fromisoformat(row['assigned_date'].strip())
+        except ValueError:
+            errors.append('Invalid assigned_date format. Use YYYY-MM-DD')
+
+    times = {}
+    for field in ('start_time', 'end_time'):
+        value = (row.get(field) or '').strip()
+        times[field] = None
+        if value:
+            try:
+                times[field] = time.fromisoformat(value)
+            except ValueError:
+                errors.append(f'Invalid {field} format. Use HH:MM')
+    if times['start_time'] and times['end_time'] and times['end_time'] <= times['start_time']:
+        errors.append('End time must be after start time')
+
+    event_type = (row.get('event_type') or 'other').strip().lower()
+    if event_type not in EVENT_TYPES:
+        errors.append(f'Invalid event_type: {event_type}')
+    priority = (row.get('priority') or 'medium').strip().lower()
+    if priority not in PRIORITY_LEVELS:
+        errors.append(f'Invalid priority: {priority}')
+
+    if errors:
+        return None, errors
+    return {
+        'title': title,
+        'description': row.get('description') or '',
+        'assigned_date': assigned_date,
+        'start_time': times['start_time'],
+        'end_time': times['end_time'],
+        'event_type': event_type,
+        'priority': priority,
+        'location': (row.get('location') or '').strip()[:200],
+        'is_all_day': (row.get('is_all_day') or '').strip().lower() in TRUE_VALUES,
+        'is_recurring': (row.get('is_recurring') or '').strip().lower() in TRUE_VALUES,
+    }, []
+
+
+def import_events(rows, creator, batch_size=None, dry_run=False):
+    """
+    Validate and insert parsed rows in batches.
+
+    Valid rows are inserted and invalid ones reported; callers wrap this in a
+    transaction so a database failure rolls the whole import back.
+    """
+    batch_size = batch_size or settings.EVENT_IMPORT_BATCH_SIZE
+    max_errors = settings.EVENT_IMPORT_MAX_REPORTED_ERRORS
+    result = {'total_rows': 0, 'imported': 0, 'failed': 0, 'errors': []}
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        events = []
+        for line_number, row in batch:
+            values, errors = validate_row(row)
+            if errors:
+                result['failed'] += 1
+                if len(result['errors']) < max_errors:
+                    result['errors'].append({'row': line_number, 'errors': errors})
+                continue
+            events.append(Event(creator=creator, **values))
+        result['total_rows'] += len(batch)
+        if events and not dry_run:
+            Event.objects.bulk_create(events, batch_size=batch_size)
+        result['imported'] += len(events)
+    return result
@@ -0,0 +1,115 @@
+import base64
+import gzip
+import json
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from schedule import partitions
+from schedule.models import Event
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # Binary columns, e.g. attendance bitmaps
+        if isinstance(o, (bytes, memoryview)):
+            return base64.b64encode(o).decode()
+        return super().default(o)
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive events of past terms: export them and the rows referencing them to gzipped NDJSON, '
+        'then detach or drop their partitions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            required=True,
+            type=date.fromisoformat,
+            help='Archive partitions that end on or before this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--export-dir',
+            help='Directory for <partition>.ndjson.gz and <partition>.<table>.ndjson.gz exports; '
+                 'skip exporting if omitted',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop archived partitions instead of only detaching them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per round trip while exporting',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            raise CommandError(
+                f'{partitions.TABLE} is not partitioned; run "manage.py partition_events --convert" first'
+            )
+        if not options['export_dir']:
+            self.stdout.write(self.style.WARNING(
+                'Rows referencing archived events (grades, attendance, submissions) are deleted without an export'
+            ))
+        if options['drop'] and not options['export_dir']:
+            self.stdout.write(self.style.WARNING('Dropping partitions without exporting them'))
+
+        archived = [
+            (name, start, end) for name, start, end in partitions.list_partitions()
+            if end <= options['before']
+        ]
+        if not archived:
+            self.stdout.write('No partitions to archive')
+            return
+
+        for name, start, end in archived:
+            if options['export_dir']:
+                path = os.path.join(options['export_dir'], f'{name}.ndjson.gz')
+                count = self.export_partition(name, path, options['batch_size'])
+                self.stdout.write(f'  Exported {count} events from {name} to {path}')
+                for relation in partitions.event_references():
+                    table = relation.related_model._meta.db_table
+                    path = os.path.join(options['export_dir'], f'{name}.{table}.ndjson.gz')
+                    count = self.export_references(relation, name, path, options['batch_size'])
+                    self.stdout.write(f'  Exported {count} rows of {table} to {path}')
+            partitions.detach_partition(name, drop=options['drop'])
+            action = 'Dropped' if options['drop'] else 'Detached'
+            self.stdout.write(self.style.SUCCESS(f'{action} {name} ({start} .. {end})'))
+
+    def export_partition(self, name, path, batch_size):
+        """Stream a partition to gzipped NDJSON through a server-side cursor"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        columns = [field.column for field in Event._meta.concrete_fields]
+        column_sql = ', '.join(f'"{column}"' for column in columns)
+        count = 0
+        with transaction.atomic(), connection.chunked_cursor() as cursor, gzip.open(path, 'wt', encoding='utf-8') as output:
+            cursor.execute(f'SELECT {column_sql} FROM "{name}" ORDER BY assigned_date, id')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    output.write(json.dumps(dict(zip(columns, row)), cls=ArchiveJSONEncoder))
+                    output.write('\n')
+                count += len(rows)
+        return count
+
+    def export_references(self, relation, name, path, batch_size):
+        """Stream the rows of another table that reference the partition's events"""
+        columns = [field.attname for field in relation.related_model._meta.concrete_fields]
+        rows = partitions.referencing_rows(relation, name).order_by('pk').values_list(*columns)
+        count = 0
+        with transaction.atomic(), gzip.open(path, 'wt', encoding='utf-8') as output:
+            for row in rows.iterator(chunk_size=batch_size):
+                output.write(json.dumps(dict(zip(columns, row)), cls=ArchiveJSONEncoder))
+                output.write('\n')
+                count += 1
+        return count
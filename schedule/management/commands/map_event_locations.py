@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from schedule.models import Event, Room, normalize_room_name
+
+
+class Command(BaseCommand):
+    help = 'Link events to rooms by their free-text location, creating missing rooms'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-create',
+            action='store_true',
+            help='Only link locations that match an existing room',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rooms = {room.normalized_name: room for room in Room.objects.all()}
+        locations = (
+            Event.objects.filter(room__isnull=True)
+            .exclude(location__isnull=True).exclude(location='')
+            .values_list('location', flat=True).distinct()
+        )
+
+        linked = 0
+        created = 0
+        unmatched = 0
+        # One UPDATE per distinct location string, not per event
+        for location in locations:
+            key = normalize_room_name(location)
+            if not key:
+                continue
+            room = rooms.get(key)
+            if room is None:
+                if options['no_create']:
+                    unmatched += 1
+                    continue
+                room = Room.objects.create(name=' '.join(location.split()))
+                rooms[key] = room
+                created += 1
+            linked += Event.objects.filter(room__isnull=True, location=location).update(room=room)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {linked} events; created {created} rooms'
+            + (f'; {unmatched} locations without a room' if unmatched else '')
+        ))
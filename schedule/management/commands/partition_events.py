@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming partitions of the events table (optionally converting it to a partitioned table first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild the events table as a partitioned table, moving existing rows',
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.EVENT_PARTITIONS_AHEAD,
+            help='Number of periods after the current one to create partitions for',
+        )
+        parser.add_argument(
+            '--period',
+            choices=['term', 'year'],
+            default=settings.EVENT_PARTITION_PERIOD,
+            help='Partition size',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            if not options['convert']:
+                raise CommandError(
+                    f'{partitions.TABLE} is not partitioned yet; run with --convert to rebuild it'
+                )
+            self.stdout.write(f'Converting {partitions.TABLE} to a partitioned table...')
+            partitions.convert_to_partitioned(options['period'])
+
+        partitions.create_upcoming_partitions(options['ahead'], options['period'])
+
+        for name, start, end in partitions.list_partitions():
+            self.stdout.write(f'  {name}: {start} .. {end}')
+        self.stdout.write(self.style.SUCCESS('Event partitions are up to date'))
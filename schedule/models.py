@@ -1,10 +1,88 @@
+import secrets
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from courses.models import Course, Enrollment
+
 User = get_user_model()
 
 
+def normalize_room_name(name):
+    """Key used to match free-text locations to rooms: case- and whitespace-insensitive"""
+    return ' '.join(name.split()).casefold()
+
+
+class Room(models.Model):
+    """Bookable room where events take place"""
+    
+    name = models.CharField(max_length=200, unique=True, help_text="Room name as shown to users")
+    normalized_name = models.CharField(
+        max_length=200,
+        unique=True,
+        editable=False,
+        help_text="Case- and whitespace-insensitive name used for matching locations"
+    )
+    building = models.CharField(max_length=100, blank=True, default='', help_text="Building the room is in")
+    capacity = models.PositiveIntegerField(default=0, help_text="Number of seats")
+    features = models.JSONField(default=list, blank=True, help_text="List of room features, e.g. projector or lab")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When the room was created")
+    
+    class Meta:
+        ordering = ['building', 'name']
+        indexes = [
+            models.Index(fields=['capacity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.capacity} seats)"
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_room_name(self.name)
+        super().save(*args, **kwargs)
+
+
+class EventQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Events a user should see: created by them, explicitly joined, or
+        targeted at their role or at a course they teach or are enrolled in.
+        
+        Group targets are resolved here at read time, so targeting a course
+        or role is a single row however many users it covers. Each branch is
+        an indexed ``id IN (subquery)`` lookup.
+        """
+        branches = self._visibility_filters(user)
+        visible = branches[0]
+        for branch in branches[1:]:
+            visible |= branch
+        return self.filter(visible)
+    
+    def for_user_branches(self, user):
+        """
+        ``for_user`` as one queryset per branch; their union is ``for_user``.
+        
+        An ORed filter cannot be read in index order, so ordered LIMIT queries
+        (the agenda) run each branch with its own ORDER BY ... LIMIT and merge
+        the results. A branch may repeat events of another.
+        """
+        return [self.filter(branch) for branch in self._visibility_filters(user)]
+    
+    def _visibility_filters(self, user):
+        taught = Course.objects.filter(created_by=user).values('id')
+        enrolled = Enrollment.objects.filter(student=user, status='enrolled').values('course_id')
+        return [
+            models.Q(creator=user),
+            models.Q(id__in=EventParticipant.objects.filter(user=user).values('event_id')),
+            models.Q(id__in=EventTarget.objects.filter(role=user.user_role).values('event_id')),
+            models.Q(id__in=EventTarget.objects.filter(course__in=taught).values('event_id')),
+            models.Q(id__in=EventTarget.objects.filter(course__in=enrolled).values('event_id')),
+        ]
+
+
 class Event(models.Model):
     """Event model for schedule management"""
     
@@ -32,6 +110,14 @@ class Event(models.Model):
         related_name='created_events',
         help_text="User who created the event"
     )
+    course = models.ForeignKey(
+        'courses.Course',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='events',
+        help_text="Course this event belongs to"
+    )
     assigned_date = models.DateField(help_text="Date when the event is scheduled")
     start_time = models.TimeField(blank=True, null=True, help_text="Event start time")
     end_time = models.TimeField(blank=True, null=True, help_text="Event end time")
@@ -48,17 +134,30 @@ class Event(models.Model):
         help_text="Event priority level"
     )
     location = models.CharField(max_length=200, blank=True, null=True, help_text="Event location")
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='events',
+        help_text="Room the event takes place in"
+    )
     is_all_day = models.BooleanField(default=False, help_text="Whether this is an all-day event")
     is_recurring = models.BooleanField(default=False, help_text="Whether this event repeats")
     created_at = models.DateTimeField(auto_now_add=True, help_text="When the event was created")
     updated_at = models.DateTimeField(auto_now=True, help_text="When the event was last updated")
     
+    objects = EventQuerySet.as_manager()
+    
     class Meta:
         ordering = ['assigned_date', 'start_time']
         indexes = [
             models.Index(fields=['assigned_date']),
-            models.Index(fields=['creator', 'assigned_date']),
+            models.Index(fields=['creator', 'assigned_date', 'start_time']),
             models.Index(fields=['event_type', 'assigned_date']),
+            models.Index(fields=['updated_at', 'id']),
+            # Room occupancy: all events of a room on a day, ordered by time
+            models.Index(fields=['room', 'assigned_date', 'start_time', 'end_time']),
         ]
     
     def __str__(self):
@@ -91,4 +190,202 @@ class Event(models.Model):
     def is_upcoming(self):
         """Check if the event is in the future"""
         today = timezone.now().date()
-        return self.assigned_date > today
\ No newline at end of file
+        return self.assigned_date > today
+
+
+class EventParticipant(models.Model):
+    """User explicitly attached to an event"""
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='participants',
+        db_constraint=False,  # events may live in a partitioned table
+        help_text="Event the user takes part in"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='event_participations',
+        help_text="Participating user"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When the user was added")
+    
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_event_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'event']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} in {self.event_id}"
+
+
+class EventTarget(models.Model):
+    """Group an event is published to: every member of a course, or every user with a role"""
+    
+    TARGET_TYPES = [
+        ('course', 'Course'),
+        ('role', 'Role'),
+    ]
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='targets',
+        db_constraint=False,  # events may live in a partitioned table
+        help_text="Targeted event"
+    )
+    target_type = models.CharField(max_length=10, choices=TARGET_TYPES, help_text="Kind of group targeted")
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='event_targets',
+        help_text="Course whose members see the event"
+    )
+    role = models.CharField(
+        max_length=20,
+        choices=User.USER_ROLE_CHOICES,
+        blank=True,
+        default='',
+        help_text="Role whose users see the event"
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'course'], condition=models.Q(target_type='course'),
+                name='unique_event_course_target',
+            ),
+            models.UniqueConstraint(
+                fields=['event', 'role'], condition=models.Q(target_type='role'),
+                name='unique_event_role_target',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'event']),
+            models.Index(fields=['role', 'event']),
+        ]
+    
+    def __str__(self):
+        if self.target_type == 'course':
+            return f"Event {self.event_id} -> course {self.course_id}"
+        return f"Event {self.event_id} -> {self.role}s"
+
+
+class AttendanceSheet(models.Model):
+    """
+    Attendance of one lecture as a bitmap over the course roster.
+    
+    ``roster`` is the sorted list of student IDs enrolled when attendance was
+    first taken; bit ``n`` of ``present`` (least significant bit first within
+    each byte, as PostgreSQL's ``get_bit`` numbers them) is set when
+    ``roster[n]`` attended.
+    """
+    
+    event = models.OneToOneField(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='attendance',
+        db_constraint=False,  # events may live in a partitioned table
+        help_text="Lecture the attendance was taken for"
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='attendance_sheets',
+        help_text="Course whose roster was used"
+    )
+    roster = ArrayField(models.BigIntegerField(), default=list, help_text="Sorted IDs of the students expected")
+    present = models.BinaryField(default=bytes, help_text="Bitmap of attending students, in roster order")
+    present_count = models.PositiveIntegerField(default=0, help_text="Number of attending students")
+    roster_size = models.PositiveIntegerField(default=0, help_text="Number of students on the roster")
+    taken_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='attendance_sheets',
+        help_text="User who last recorded attendance"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When attendance was first taken")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When attendance was last recorded")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'event']),
+            # Finds every sheet a student is on: roster @> ARRAY[student_id]
+            GinIndex(fields=['roster'], name='attendance_roster_gin'),
+        ]
+    
+    def __str__(self):
+        return f"Attendance for event {self.event_id}: {self.present_count}/{self.roster_size}"
+
+
+class EventTombstone(models.Model):
+    """Record of a deleted event, used by delta sync clients"""
+    
+    event_id = models.BigIntegerField(help_text="ID of the deleted event")
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True, help_text="When the event was deleted")
+    
+    class Meta:
+        ordering = ['deleted_at']
+    
+    def __str__(self):
+        return f"Deleted event {self.event_id} at {self.deleted_at}"
+
+
+def generate_feed_token():
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeed(models.Model):
+    """Private iCalendar subscription owned by a user"""
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feeds',
+        help_text="User who owns the feed"
+    )
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=generate_feed_token,
+        editable=False,
+        help_text="Secret token used in the feed URL"
+    )
+    event_type = models.CharField(
+        max_length=20,
+        choices=Event.EVENT_TYPES,
+        blank=True,
+        null=True,
+        help_text="Only include events of this type"
+    )
+    priority = models.CharField(
+        max_length=10,
+        choices=Event.PRIORITY_LEVELS,
+        blank=True,
+        null=True,
+        help_text="Only include events with this priority"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, help_text="When the feed was created")
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Calendar feed for {self.user.email}"
+    
+    def get_events(self):
+        """Events published by this feed"""
+        events = Event.objects.all()
+        if self.event_type:
+            events = events.filter(event_type=self.event_type)
+        if self.priority:
+            events = events.filter(priority=self.priority)
+        return events
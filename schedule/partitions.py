@@ -0,0 +1,228 @@
+"""
+PostgreSQL range partitioning of the events table by ``assigned_date``.
+
+After ``convert_to_partitioned`` the events table is a partitioned parent
+with one partition per academic term (or year) plus a default partition.
+Queries bounded on ``assigned_date`` are pruned to the partitions they touch.
+
+The primary key of a partitioned table must contain the partition key, so it
+becomes ``(id, assigned_date)``; ``id`` stays unique through its sequence.
+Foreign keys that point at ``Event`` therefore have to be declared with
+``db_constraint=False``.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .caching import bump_events_version
+from .models import Event, EventTombstone
+
+TABLE = Event._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+ID_SEQUENCE = f'{TABLE}_part_id_seq'
+
+BOUND_RE = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+def period_bounds(day, period=None):
+    """Return the [start, end) dates of the partition period containing ``day``"""
+    period = period or settings.EVENT_PARTITION_PERIOD
+    if period == 'year':
+        return date(day.year, 1, 1), date(day.year + 1, 1, 1)
+    if period != 'term':
+        raise ValueError(f'Unknown partition period: {period}')
+
+    starts = sorted(
+        date(year, month, day_of_month)
+        for year in (day.year - 1, day.year, day.year + 1)
+        for month, day_of_month in settings.ACADEMIC_TERM_STARTS
+    )
+    for start, end in zip(starts, starts[1:]):
+        if start <= day < end:
+            return start, end
+    raise ValueError(f'No term contains {day}')
+
+
+def partition_name(start):
+    return f'{TABLE}_p{start:%Y%m%d}'
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Return [(name, start, end)] for range partitions, ordered by start date"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) '
+            'FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s',
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound or '')
+        if match:
+            partitions.append((name, date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [f'"{name}"'])
+    return cursor.fetchone()[0]
+
+
+@transaction.atomic
+def create_partition(start, end):
+    """
+    Create the partition for [start, end) if it does not exist; return its name.
+
+    PostgreSQL refuses a new partition while the default partition holds rows
+    in its range, so such rows are moved: the default partition is detached,
+    the partition created, the rows moved into it and the default attached
+    again, all in one transaction.
+    """
+    name = partition_name(start)
+    bounds = [start.isoformat(), end.isoformat()]
+    with connection.cursor() as cursor:
+        if _table_exists(cursor, name):
+            return name
+        # Keeps rows from reaching the default partition until it is checked
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN SHARE ROW EXCLUSIVE MODE')
+        in_default = False
+        if _table_exists(cursor, DEFAULT_PARTITION):
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" '
+                f'WHERE assigned_date >= %s AND assigned_date < %s)',
+                bounds,
+            )
+            in_default = cursor.fetchone()[0]
+        if in_default:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        cursor.execute(
+            f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)', bounds,
+        )
+        if in_default:
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                f'WHERE assigned_date >= %s AND assigned_date < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                bounds,
+            )
+            cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    return name
+
+
+def create_upcoming_partitions(ahead, period=None, today=None):
+    """Ensure partitions exist for the current period and ``ahead`` periods after it"""
+    day = today or date.today()
+    created = []
+    for _ in range(ahead + 1):
+        start, end = period_bounds(day, period)
+        created.append(create_partition(start, end))
+        day = end
+    return created
+
+
+@transaction.atomic
+def convert_to_partitioned(period=None):
+    """
+    Rebuild the events table as a partitioned table, moving existing rows.
+
+    Runs in one transaction and holds an exclusive lock on the events table
+    while rows are copied.
+    """
+    legacy = f'{TABLE}_legacy'
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT MIN(assigned_date), MAX(assigned_date), MAX(id) FROM "{TABLE}"')
+        first_day, last_day, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (assigned_date)'
+        )
+        # The identity column is not copied; ids come from a dedicated sequence instead
+        cursor.execute(f'CREATE SEQUENCE "{ID_SEQUENCE}" OWNED BY "{TABLE}".id')
+        cursor.execute(f"ALTER TABLE \"{TABLE}\" ALTER COLUMN id SET DEFAULT nextval('{ID_SEQUENCE}')")
+        cursor.execute('SELECT setval(%s, %s, false)', [ID_SEQUENCE, (max_id or 0) + 1])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, assigned_date)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    day = first_day or date.today()
+    while day <= (last_day or day):
+        start, end = period_bounds(day, period)
+        create_partition(start, end)
+        day = end
+    create_upcoming_partitions(settings.EVENT_PARTITIONS_AHEAD, period)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+    # Indexes and foreign keys are created on the parent after the copy;
+    # PostgreSQL cascades them to every partition. LIKE does not copy indexes,
+    # so the single-column ones of db_index fields (every foreign key) are
+    # recreated under the names Django gives them, as well as Meta.indexes
+    with connection.schema_editor(atomic=False) as editor:
+        for field in Event._meta.concrete_fields:
+            if field.db_index and not field.unique:
+                for statement in editor._field_indexes_sql(Event, field):
+                    editor.execute(statement)
+        for index in Event._meta.indexes:
+            editor.add_index(Event, index)
+        for field in Event._meta.concrete_fields:
+            if field.remote_field and field.db_constraint:
+                editor.execute(editor._create_fk_sql(Event, field, '_fk_%(to_table)s_%(to_column)s'))
+
+
+def event_references():
+    """Reverse relations of ``Event``; none is enforced by the database once it is partitioned"""
+    return [relation for relation in Event._meta.related_objects if relation.one_to_many or relation.one_to_one]
+
+
+def referencing_rows(relation, name):
+    """Rows of ``relation``'s model that point at the events of partition ``name``"""
+    return relation.related_model._base_manager.filter(
+        **{f'{relation.field.name}__in': RawSQL(f'SELECT id FROM "{name}"', [])}
+    ).order_by()
+
+
+@transaction.atomic
+def detach_partition(name, drop=False):
+    """
+    Detach a partition, or drop it with ``drop``, removing its events from the app.
+
+    Rows of other tables that reference its events (participants, targets,
+    attendance, grades, submissions and uploads) are deleted through the ORM,
+    since no foreign key constraint cascades to them. Tombstones let delta
+    sync clients drop the events, and cached schedule responses are
+    invalidated once the transaction commits.
+    """
+    for relation in event_references():
+        referencing_rows(relation, name).delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{EventTombstone._meta.db_table}" (event_id, deleted_at) SELECT id, %s FROM "{name}"',
+            [timezone.now()],
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        if drop:
+            cursor.execute(f'DROP TABLE "{name}"')
+    transaction.on_commit(bump_events_version)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .caching import bump_events_version
+from .models import Event, EventTombstone
+
+
+@receiver(post_save, sender=Event)
+def invalidate_event_caches(sender, instance, **kwargs):
+    bump_events_version()
+
+
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance, **kwargs):
+    """Remember deleted events so delta sync clients can drop them"""
+    EventTombstone.objects.create(event_id=instance.pk)
+    bump_events_version()
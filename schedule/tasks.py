@@ -0,0 +1,40 @@
+import csv
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+
+from jobs.queue import task
+from realtime.broker import broker
+from users.models import User
+from .caching import bump_events_version
+from .importers import import_events, parse_csv, parse_ics
+
+
+@task()
+def import_event_file(name, file_format, creator_id):
+    """
+    Import an upload that ``api_import_events`` saved to storage as ``name``.
+
+    The file is parsed as it is read, like a direct import, and deleted once
+    imported; it is kept when the import fails, for the job's retries. The
+    result is what the request would have answered.
+    """
+    creator = User.objects.get(id=creator_id)
+    try:
+        with default_storage.open(name, 'rb') as stored:
+            rows = parse_ics(stored.file) if file_format == 'ics' else parse_csv(stored.file)
+            with transaction.atomic():
+                result = import_events(rows, creator)
+                if result['imported']:
+                    broker.publish_on_commit('event', 'imported', None, count=result['imported'])
+                    transaction.on_commit(bump_events_version)
+    except (UnicodeDecodeError, csv.Error) as e:
+        result = {'error': f'Could not read {file_format} file: {str(e)}'}
+    default_storage.delete(name)
+    return result
+
+
+@task()
+def purge_event_tombstones():
+    call_command('purge_event_tombstones')
@@ -1,3 +1,837 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course, Enrollment, Grade
+from jobs.models import Job
+from jobs.queue import claim, run
+from users.jwt_utils import JWTManager
+from users.models import User
+from .analytics import compute_utilisation
+from .attendance import course_attendance, pack_attendance, unpack_attendance
+from .caching import get_events_version
+from .ics import MAX_LINE_OCTETS, fold_line, render_calendar
+from .importers import import_events, parse_csv, parse_ics, validate_row
+from .models import CalendarFeed, Event, EventParticipant, EventTarget, EventTombstone, Room
+from .partitions import DEFAULT_PARTITION, TABLE, convert_to_partitioned, create_partition, period_bounds
+from .views import _agenda_cache_timeout
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {JWTManager.generate_access_token(user)}'}
+
+
+@override_settings(TIME_ZONE='UTC', ICS_UID_DOMAIN='example.com')
+class RenderCalendarTests(SimpleTestCase):
+    updated_at = datetime(2025, 3, 1, 12, tzinfo=dt_timezone.utc)
+
+    def render(self, *rows):
+        return b''.join(render_calendar(rows, 'Prof; Calendar')).decode()
+
+    def test_event_properties_are_escaped(self):
+        body = self.render((
+            1, 'Exam, part 1; room\\2', 'Bring:\na pen', date(2025, 3, 3), time(9), time(11),
+            'exam', 'high', None, False, self.updated_at,
+        ))
+
+        self.assertIn('X-WR-CALNAME:Prof\\; Calendar\r\n', body)
+        self.assertIn('UID:event-1@example.com\r\n', body)
+        self.assertIn('SUMMARY:Exam\\, part 1\\; room\\\\2\r\n', body)
+        self.assertIn('DESCRIPTION:Bring:\\na pen\r\n', body)
+        self.assertIn('DTSTART:20250303T090000Z\r\nDTEND:20250303T110000Z\r\n', body)
+        self.assertNotIn('LOCATION', body)
+
+    def test_all_day_and_overnight_events(self):
+        body = self.render(
+            (1, 'Holiday', None, date(2025, 3, 3), None, None, 'other', 'low', None, True, self.updated_at),
+            (2, 'Lab', None, date(2025, 3, 3), time(22), time(2), 'other', 'low', None, False, self.updated_at),
+        )
+
+        self.assertIn('DTSTART;VALUE=DATE:20250303\r\nDTEND;VALUE=DATE:20250304\r\n', body)
+        self.assertIn('DTSTART:20250303T220000Z\r\nDTEND:20250304T020000Z\r\n', body)
+
+    def test_long_lines_fold_between_characters(self):
+        folded = fold_line('SUMMARY:' + 'é' * 60)
+        lines = folded.split(b'\r\n ')
+
+        self.assertTrue(all(len(line) <= MAX_LINE_OCTETS for line in folded.rstrip(b'\r\n').split(b'\r\n')))
+        self.assertEqual(b''.join(lines).decode(), 'SUMMARY:' + 'é' * 60 + '\r\n')
+
+
+class CalendarFeedStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        Event.objects.bulk_create([
+            Event(
+                title=f'Lecture {number}', creator=cls.user, assigned_date=date(2025, 3, 1 + number % 28),
+                start_time=time(9), end_time=time(10), event_type='lecture',
+            )
+            for number in range(250)
+        ])
+        cls.feed = CalendarFeed.objects.create(user=cls.user)
+        cls.url = reverse('schedule:calendar_feed', args=[cls.feed.token])
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_feed_streams_in_chunks_under_asgi(self):
+        response = await AsyncClient().get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # The calendar header, then one chunk per 100 events
+        self.assertEqual(len(chunks), 4)
+        self.assertNotIn(b'BEGIN:VEVENT', chunks[0])
+        body = b''.join(chunks)
+        self.assertEqual(body.count(b'BEGIN:VEVENT'), 250)
+        self.assertTrue(body.endswith(b'END:VCALENDAR\r\n'))
+
+    def test_feed_streams_sync_iterator_under_wsgi(self):
+        response = Client().get(self.url)
+
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).count(b'BEGIN:VEVENT'), 250)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'partitioning is PostgreSQL only')
+class ConvertToPartitionedTests(TestCase):
+    def test_conversion_keeps_foreign_key_indexes(self):
+        user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        Event.objects.create(title='Lecture', creator=user, assigned_date=date(2025, 3, 3))
+
+        convert_to_partitioned('term')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexdef FROM pg_indexes WHERE tablename = %s', [TABLE])
+            indexes = [row[0] for row in cursor.fetchall()]
+        for column in ('creator_id', 'course_id', 'room_id'):
+            self.assertTrue(any(index.endswith(f'({column})') for index in indexes), column)
+        self.assertEqual(Event.objects.get().title, 'Lecture')
+
+    def test_new_partition_takes_its_rows_from_the_default_partition(self):
+        user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        convert_to_partitioned('year')
+        # Past every partition created so far
+        event = Event.objects.create(title='Reunion', creator=user, assigned_date=date(2040, 5, 1))
+
+        name = create_partition(*period_bounds(event.assigned_date, 'year'))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{DEFAULT_PARTITION}"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT title FROM "{name}"')
+            self.assertEqual(cursor.fetchall(), [('Reunion',)])
+        self.assertEqual(create_partition(*period_bounds(event.assigned_date, 'year')), name)
+        # The default partition is attached again
+        Event.objects.create(title='Later', creator=user, assigned_date=date(2050, 1, 1))
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_archiving_removes_the_rows_referencing_its_events(self):
+        user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=user)
+        old = Event.objects.create(
+            title='Old exam', creator=user, course=course, event_type='exam', assigned_date=date(2020, 5, 1),
+        )
+        current = Event.objects.create(title='Lecture', creator=user, assigned_date=timezone.now().date())
+        for event in (old, current):
+            EventParticipant.objects.create(event=event, user=user)
+        Grade.objects.create(course=course, event=old, student=user, score=50)
+        convert_to_partitioned('year')
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        version = get_events_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_events', before='2021-01-01', export_dir=export_dir, stdout=io.StringIO())
+
+        self.assertEqual(list(Event.objects.values_list('id', flat=True)), [current.id])
+        self.assertEqual(list(EventParticipant.objects.values_list('event_id', flat=True)), [current.id])
+        self.assertFalse(Grade.objects.exists())
+        self.assertEqual(list(EventTombstone.objects.values_list('event_id', flat=True)), [old.id])
+        self.assertGreater(get_events_version(), version)
+        with gzip.open(os.path.join(export_dir, f'{TABLE}_p20200101.grades.ndjson.gz'), 'rt') as exported:
+            self.assertEqual([json.loads(line)['score'] for line in exported], [50.0])
+
+
+@override_settings(EVENT_SYNC_OVERLAP_SECONDS=0)
+class EventChangesSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.url = reverse('schedule:event_changes')
+
+    def make_events(self, count, updated_at):
+        events = [
+            Event.objects.create(title=f'Event {number}', creator=self.user, assigned_date=date(2025, 3, 3))
+            for number in range(count)
+        ]
+        Event.objects.filter(id__in=[event.id for event in events]).update(updated_at=updated_at)
+        return events
+
+    def sync(self, since=None, limit=2):
+        params = {'limit': limit}
+        if since:
+            params['since'] = since
+        response = self.client.get(self.url, params, **auth(self.user))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def sync_all(self, since=None):
+        ids, deleted = [], []
+        while True:
+            page = self.sync(since)
+            ids += [event['id'] for event in page['events']]
+            deleted += page['deleted']
+            since = page['cursor']
+            if not page['has_more']:
+                return ids, deleted, since
+
+    def test_round_trip(self):
+        events = self.make_events(5, timezone.now() - timedelta(minutes=1))
+
+        ids, deleted, cursor = self.sync_all()
+        self.assertEqual(ids, [event.id for event in events])
+        self.assertEqual(deleted, [])
+
+        events[1].title = 'Moved'
+        events[1].save()
+        deleted_id = events[2].id
+        events[2].delete()
+        ids, deleted, cursor = self.sync_all(cursor)
+        self.assertEqual(ids, [events[1].id])
+        self.assertEqual(deleted, [deleted_id])
+
+        self.assertEqual(self.sync_all(cursor)[:2], ([], []))
+
+    def test_changes_of_transactions_still_running_are_held_back(self):
+        started = timezone.now() - timedelta(minutes=1)
+        early = self.make_events(1, started - timedelta(minutes=1))
+        # Committed after a long import started, whose rows may still commit with older times
+        late = self.make_events(1, started + timedelta(seconds=30))
+
+        with mock.patch('schedule.views._oldest_write_started_at', return_value=started):
+            ids, deleted, cursor = self.sync_all()
+            self.assertEqual(ids, [early[0].id])
+            # The import commits rows written before the late event
+            imported = self.make_events(1, started + timedelta(seconds=10))
+            self.assertEqual(self.sync_all(cursor)[0], [])
+
+        ids, deleted, cursor = self.sync_all(cursor)
+        self.assertEqual(ids, [imported[0].id, late[0].id])
+
+    def test_tombstones_are_held_back_with_changes(self):
+        event = self.make_events(1, timezone.now() - timedelta(minutes=5))[0]
+        cursor = self.sync_all()[2]
+        event_id = event.id
+        event.delete()
+        started = timezone.now() - timedelta(minutes=1)
+        EventTombstone.objects.filter(event_id=event_id).update(deleted_at=timezone.now())
+
+        with mock.patch('schedule.views._oldest_write_started_at', return_value=started):
+            self.assertEqual(self.sync_all(cursor)[1], [])
+        self.assertEqual(self.sync_all(cursor)[1], [event_id])
+
+
+class TimetableCommitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='secret', user_role='admin')
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        cls.room = Room.objects.create(name='Hall A', capacity=100)
+        cls.other_room = Room.objects.create(name='Hall B', capacity=100)
+        cls.url = reverse('schedule:timetable_commit')
+
+    def setUp(self):
+        cache.clear()
+        # Mondays 09:00-10:30 in Hall A
+        cache.set('schedule:timetable:preview', {'created_by': self.admin.id, 'sessions': [{
+            'course': self.course.id, 'course_title': self.course.title, 'professor': self.professor.id,
+            'day': 0, 'day_name': 'Monday', 'start_time': '09:00', 'end_time': '10:30',
+            'room': self.room.name, 'room_id': self.room.id,
+        }]})
+
+    def commit(self):
+        return self.client.post(
+            self.url, {'preview_id': 'preview', 'start_date': '2025-03-01', 'end_date': '2025-03-31'},
+            content_type='application/json', **auth(self.admin),
+        )
+
+    def test_commit_creates_weekly_events_once(self):
+        response = self.commit()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['events_created'], 5)
+
+        self.assertEqual(self.commit().status_code, 404)
+        self.assertEqual(Event.objects.count(), 5)
+
+    def test_concurrent_commit_of_the_same_preview_is_rejected(self):
+        preview = cache.get('schedule:timetable:preview')
+        # Another commit deleted the preview after this one read it
+        with mock.patch('schedule.views.cache') as shared:
+            shared.get.return_value = preview
+            shared.delete.return_value = False
+            response = self.commit()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Event.objects.count(), 0)
+
+    def test_room_clash_is_rejected(self):
+        clash = Event.objects.create(
+            title='Exam', creator=self.admin, room=self.room, assigned_date=date(2025, 3, 17),
+            start_time=time(10), end_time=time(12),
+        )
+
+        response = self.commit()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            [(c['event'], c['reason']) for c in response.json()['conflicts']], [(clash.id, 'room')],
+        )
+        self.assertEqual(Event.objects.count(), 1)
+        # The preview can still be committed once the clash is resolved
+        clash.delete()
+        self.assertEqual(self.commit().status_code, 201)
+
+    def test_professor_clash_is_rejected(self):
+        Event.objects.create(
+            title='Office hours', creator=self.professor, room=self.other_room, assigned_date=date(2025, 3, 10),
+            start_time=time(8), end_time=time(9, 30),
+        )
+
+        response = self.commit()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['conflicts'][0]['reason'], 'professor')
+
+    def test_events_next_to_sessions_do_not_clash(self):
+        Event.objects.create(
+            title='Seminar', creator=self.professor, room=self.room, assigned_date=date(2025, 3, 3),
+            start_time=time(10, 30), end_time=time(12),
+        )
+
+        self.assertEqual(self.commit().status_code, 201)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row locks and concurrent connections')
+class ConcurrentTimetableCommitTests(TransactionTestCase):
+    def test_clashing_timetables_committed_at_once_are_not_both_saved(self):
+        admin = User.objects.create_user(email='admin@example.com', password='secret', user_role='admin')
+        room = Room.objects.create(name='Hall A', capacity=100)
+        cache.clear()
+        for number in range(2):
+            professor = User.objects.create_user(
+                email=f'prof{number}@example.com', password='secret', user_role='professor',
+            )
+            course = Course.objects.create(title=f'Course {number}', description='Description', created_by=professor)
+            cache.set(f'schedule:timetable:preview{number}', {'created_by': admin.id, 'sessions': [{
+                'course': course.id, 'course_title': course.title, 'professor': professor.id,
+                'day': 0, 'day_name': 'Monday', 'start_time': '09:00', 'end_time': '10:30',
+                'room': room.name, 'room_id': room.id,
+            }]})
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def commit(preview_id):
+            try:
+                barrier.wait()
+                statuses.append(Client().post(
+                    reverse('schedule:timetable_commit'),
+                    {'preview_id': preview_id, 'start_date': '2025-03-01', 'end_date': '2025-03-31'},
+                    content_type='application/json', **auth(admin),
+                ).status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=commit, args=[f'preview{number}']) for number in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201, 409])
+        self.assertEqual(Event.objects.count(), 5)
+
+
+class AgendaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', password='secret', user_role='student')
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        other = Course.objects.create(title='Topology', description='Open sets', created_by=cls.professor)
+        Enrollment.objects.create(course=course, student=cls.student, status='enrolled', requested_at=timezone.now())
+        today = timezone.localdate()
+
+        def event(creator, days, hour=None):
+            return Event.objects.create(
+                title=f'Event {days} {hour}', creator=creator, assigned_date=today + timedelta(days=days),
+                start_time=time(hour) if hour is not None else None,
+                end_time=time(hour + 1) if hour is not None else None,
+            )
+
+        # Every branch of for_user, in an interleaved order, plus events the student must not see
+        event(cls.student, 3, 9)
+        event(cls.student, 1, None)
+        for days, hour in [(1, 8), (4, 10), (2, 15)]:
+            EventParticipant.objects.create(event=event(cls.professor, days, hour), user=cls.student)
+        for days, hour in [(2, 9), (5, 9)]:
+            EventTarget.objects.create(event=event(cls.professor, days, hour), target_type='role', role='student')
+        for days, hour in [(1, 12), (3, 8)]:
+            EventTarget.objects.create(event=event(cls.professor, days, hour), target_type='course', course=course)
+        both = event(cls.professor, 2, 11)
+        EventParticipant.objects.create(event=both, user=cls.student)
+        EventTarget.objects.create(event=both, target_type='course', course=course)
+        EventTarget.objects.create(event=event(cls.professor, 1, 9), target_type='course', course=other)
+        event(cls.professor, 2, 10)
+        event(cls.student, -1, 9)
+
+    def setUp(self):
+        cache.clear()
+
+    def agenda(self, user, limit):
+        response = self.client.get(reverse('schedule:agenda'), {'limit': limit}, **auth(user))
+        self.assertEqual(response.status_code, 200)
+        return [event['id'] for event in response.json()['agenda']]
+
+    def expected(self, user, limit):
+        events = sorted(
+            Event.objects.for_user(user).filter(assigned_date__gte=timezone.localdate()),
+            key=lambda e: (e.assigned_date, e.start_time is None, e.start_time or time.min, e.id),
+        )
+        return [event.id for event in events][:limit]
+
+    def test_agenda_matches_for_user(self):
+        for limit in (1, 3, 5, 20):
+            self.assertEqual(self.agenda(self.student, limit), self.expected(self.student, limit), limit)
+        self.assertEqual(len(self.agenda(self.student, 20)), 10)
+
+    def test_agenda_of_creator(self):
+        self.assertEqual(self.agenda(self.professor, 20), self.expected(self.professor, 20))
+
+
+class EventsListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        for day in (date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 31), date(2025, 2, 1)):
+            Event.objects.create(title=f'Event {day}', creator=cls.user, assigned_date=day)
+        cls.url = reverse('schedule:events_list')
+
+    def get(self, **params):
+        return self.client.get(self.url, params, **auth(self.user))
+
+    def test_year_and_month_filter(self):
+        response = self.get(year=2025, month=1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [event['assigned_date'] for event in response.json()['events']], ['2025-01-01', '2025-01-31'],
+        )
+        self.assertEqual(len(self.get(year=2024, month=12).json()['events']), 1)
+
+    def test_invalid_year_or_month_is_rejected(self):
+        for params in ({'year': 2025, 'month': 13}, {'year': 2025, 'month': 0}, {'year': 'next', 'month': 1},
+                       {'month': 'jan'}, {'year': 0}, {'page': 'last'}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_last_month_of_the_calendar(self):
+        self.assertEqual(self.get(year=9999, month=12).status_code, 200)
+
+
+class BackgroundImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_job_imports_the_stored_upload_and_deletes_it(self):
+        upload = SimpleUploadedFile('events.csv', (
+            'title,assigned_date,start_time,end_time\n'
+            'Lecture,2025-03-03,09:00,10:00\n'
+            'Broken,2025-13-01,,\n'
+        ).encode())
+
+        response = self.client.post(
+            reverse('schedule:import_events'), {'file': upload, 'background': 'true'}, **auth(self.professor),
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertNotIn('rows', job.kwargs)
+        stored = os.path.join(self.media_root, job.kwargs['name'])
+        self.assertTrue(os.path.exists(stored))
+        self.assertEqual(Event.objects.count(), 0)
+
+        self.assertTrue(run(claim('worker-1', [job.queue], 1)[0]))
+
+        job.refresh_from_db()
+        self.assertEqual((job.result['imported'], job.result['failed']), (1, 1))
+        self.assertEqual(job.result['errors'][0]['row'], 3)
+        self.assertEqual(Event.objects.get().title, 'Lecture')
+        self.assertFalse(os.path.exists(stored))
+
+
+@override_settings(TIME_ZONE='Europe/Berlin')
+class ImportParserTests(SimpleTestCase):
+    def test_csv_rows_carry_their_line_numbers(self):
+        rows = list(parse_csv(io.BytesIO(
+            '\ufefftitle,assigned_date,location\nLecture,2025-03-03,"Hall A, floor 2"\nLab,2025-03-04,\n'.encode()
+        )))
+
+        self.assertEqual([number for number, row in rows], [2, 3])
+        self.assertEqual(rows[0][1]['location'], 'Hall A, floor 2')
+
+    def test_ics_events_are_unfolded_unescaped_and_converted(self):
+        rows = list(parse_ics(io.BytesIO(b'\r\n'.join([
+            b'BEGIN:VCALENDAR',
+            b'BEGIN:VEVENT',
+            b'SUMMARY:Exam\\, part 1',
+            b'DESCRIPTION:Bring a pen\\nand paper, and a very long description that is fol',
+            b' ded',
+            b'DTSTART:20250303T080000Z',
+            b'DTEND;TZID=America/New_York:20250303T050000',
+            b'CATEGORIES:EXAM',
+            b'PRIORITY:1',
+            b'RRULE:FREQ=WEEKLY',
+            b'END:VEVENT',
+            b'BEGIN:VEVENT',
+            b'SUMMARY:Holiday',
+            b'DTSTART;VALUE=DATE:20250304',
+            b'DTEND:bad',
+            b'END:VEVENT',
+            b'END:VCALENDAR',
+        ]))))
+
+        (first_line, exam), (second_line, holiday) = rows
+        self.assertEqual((first_line, second_line), (2, 12))
+        self.assertEqual(exam['title'], 'Exam, part 1')
+        self.assertEqual(exam['description'], 'Bring a pen\nand paper, and a very long description that is folded')
+        # Stored in the server time zone
+        self.assertEqual((exam['assigned_date'], exam['start_time'], exam['end_time']), ('2025-03-03', '09:00:00', '11:00:00'))
+        self.assertEqual((exam['event_type'], exam['priority'], exam['is_recurring']), ('exam', 'urgent', 'true'))
+        self.assertEqual((holiday['assigned_date'], holiday['is_all_day']), ('2025-03-04', 'true'))
+        self.assertEqual(holiday['_errors'], ['Invalid DTEND value: bad'])
+
+    def test_row_validation(self):
+        values, errors = validate_row({'title': ' Lecture ', 'assigned_date': '2025-03-03', 'is_all_day': 'Yes'})
+        self.assertEqual(errors, [])
+        self.assertEqual((values['title'], values['event_type'], values['priority']), ('Lecture', 'other', 'medium'))
+        self.assertTrue(values['is_all_day'])
+
+        values, errors = validate_row({
+            'assigned_date': '03/03/2025', 'start_time': '10:00', 'end_time': '09:00', 'event_type': 'party',
+        })
+        self.assertIsNone(values)
+        self.assertEqual(errors, [
+            'title is required',
+            'Invalid assigned_date format. Use YYYY-MM-DD',
+            'End time must be after start time',
+            'Invalid event_type: party',
+        ])
+
+
+@override_settings(EVENT_IMPORT_MAX_REPORTED_ERRORS=2)
+class ImportEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+
+    def rows(self):
+        valid = [(n, {'title': f'Lecture {n}', 'assigned_date': '2025-03-03'}) for n in range(2, 9)]
+        invalid = [(n, {'title': '', 'assigned_date': '2025-03-03'}) for n in range(9, 12)]
+        return valid + invalid
+
+    def test_valid_rows_are_inserted_in_batches_and_errors_reported(self):
+        with self.assertNumQueries(3):
+            result = import_events(self.rows(), self.professor, batch_size=3)
+
+        self.assertEqual(
+            (result['total_rows'], result['imported'], result['failed']), (10, 7, 3),
+        )
+        self.assertEqual([error['row'] for error in result['errors']], [9, 10])
+        self.assertEqual(Event.objects.filter(creator=self.professor).count(), 7)
+
+    def test_dry_run_inserts_nothing(self):
+        result = import_events(self.rows(), self.professor, dry_run=True)
+
+        self.assertEqual(result['imported'], 7)
+        self.assertFalse(Event.objects.exists())
+
+
+class AgendaCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        cls.exam = Event.objects.create(
+            title='Exam', creator=cls.user, assigned_date=tomorrow, start_time=time(9), end_time=time(11),
+            event_type='exam', priority='high',
+        )
+        Event.objects.create(title='Essay', creator=cls.user, assigned_date=tomorrow, event_type='deadline')
+        Event.objects.create(
+            title='Yesterday', creator=cls.user, assigned_date=tomorrow - timedelta(days=2), event_type='exam',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def agenda(self, **params):
+        response = self.client.get(reverse('schedule:agenda'), params, **auth(self.user))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_agenda_is_cached_until_an_event_changes(self):
+        agenda = self.agenda()
+        self.assertEqual([event['title'] for event in agenda['agenda']], ['Exam', 'Essay'])
+        self.assertEqual(agenda['counts'], {'exam': 1, 'deadline': 1, 'event': 0})
+        self.assertEqual(agenda['agenda'][0]['urgency'], 1)
+
+        # Updates without signals are not seen until the next event write
+        Event.objects.filter(pk=self.exam.pk).update(title='Final exam')
+        self.assertEqual(self.agenda()['generated_at'], agenda['generated_at'])
+
+        self.exam.refresh_from_db()
+        self.exam.save()
+        self.assertEqual(self.agenda()['agenda'][0]['title'], 'Final exam')
+
+    def test_limit_is_validated(self):
+        self.assertEqual(len(self.agenda(limit=1)['agenda']), 1)
+        response = self.client.get(reverse('schedule:agenda'), {'limit': 0}, **auth(self.user))
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AGENDA_CACHE_TIMEOUT=300)
+    def test_cache_expires_when_the_first_entry_ends(self):
+        now = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        today = now.date()
+
+        def first(**values):
+            return {'assigned_date': today, 'start_time': None, 'end_time': None, 'is_all_day': False, **values}
+
+        self.assertEqual(_agenda_cache_timeout(None, now), 300)
+        self.assertEqual(_agenda_cache_timeout(first(start_time=time(8), end_time=time(9, 1)), now), 61)
+        self.assertEqual(_agenda_cache_timeout(first(start_time=time(9, 0, 30)), now), 31)
+        self.assertEqual(_agenda_cache_timeout(first(start_time=time(8), end_time=time(12)), now), 300)
+        self.assertEqual(_agenda_cache_timeout(first(is_all_day=True, start_time=time(8)), now), 300)
+        self.assertEqual(_agenda_cache_timeout(first(assigned_date=today + timedelta(days=1)), now), 300)
+
+
+class RoomTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='secret', user_role='admin')
+        cls.rooms = {
+            name: Room.objects.create(name=name, building='Main', capacity=capacity)
+            for name, capacity in [('Hall A', 200), ('Room 101', 30), ('Room 102', 30), ('Room 103', 30), ('Lab', 20)]
+        }
+        day = date(2025, 3, 3)
+
+        def book(room, **values):
+            Event.objects.create(title='Booking', creator=cls.admin, room=cls.rooms[room], assigned_date=day, **values)
+
+        book('Hall A', start_time=time(9, 30), end_time=time(10, 30))
+        book('Room 101', is_all_day=True)
+        book('Room 102', start_time=time(10, 15))  # no end: blocks the slots it starts in
+        book('Room 103', start_time=time(8), end_time=time(10))  # ends as the slot starts
+        book('Lab', start_time=time(10), end_time=time(11))
+        Event.objects.create(
+            title='Elsewhere', creator=cls.admin, room=cls.rooms['Room 103'], assigned_date=day + timedelta(days=1),
+            is_all_day=True,
+        )
+
+    def free_rooms(self, **params):
+        return self.client.get(reverse('schedule:free_rooms'), {
+            'date': '2025-03-03', 'start': '10:00', 'end': '11:00', **params,
+        }, **auth(self.admin))
+
+    def test_rooms_with_overlapping_events_are_busy(self):
+        response = self.free_rooms()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['name'] for room in response.json()['rooms']], ['Room 103'])
+        self.assertEqual(
+            [room['name'] for room in self.free_rooms(start='11:00', end='12:00').json()['rooms']],
+            ['Lab', 'Room 102', 'Room 103', 'Hall A'],
+        )
+        self.assertEqual(self.free_rooms(start='11:00', end='12:00', min_capacity=100).json()['rooms'][0]['name'], 'Hall A')
+
+    @skipUnless(connection.vendor == 'postgresql', 'JSON containment is PostgreSQL only')
+    def test_free_rooms_with_required_features(self):
+        Room.objects.filter(name='Lab').update(features=['projector', 'sinks'])
+
+        rooms = self.free_rooms(start='11:00', end='12:00', features='sinks, projector').json()['rooms']
+
+        self.assertEqual([room['name'] for room in rooms], ['Lab'])
+
+    def test_invalid_free_room_queries_are_rejected(self):
+        self.assertEqual(self.free_rooms(date='03/03/2025').status_code, 400)
+        self.assertEqual(self.free_rooms(start='10').status_code, 400)
+        self.assertEqual(self.free_rooms(end='09:00').status_code, 400)
+        self.assertEqual(self.free_rooms(min_capacity='many').status_code, 400)
+
+    def test_room_names_are_unique_ignoring_case_and_spaces(self):
+        response = self.client.post(
+            reverse('schedule:create_room'), {'name': '  room   101 '}, content_type='application/json', **auth(self.admin),
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_event_locations_are_linked_to_rooms(self):
+        for location in ('ROOM  101', 'Studio 5', 'studio 5 '):
+            Event.objects.create(title='Talk', creator=self.admin, assigned_date=date(2025, 4, 1), location=location)
+
+        call_command('map_event_locations', stdout=io.StringIO())
+
+        talks = Event.objects.filter(title='Talk').select_related('room')
+        self.assertEqual(sorted(event.room.name for event in talks), ['Room 101', 'Studio 5', 'Studio 5'])
+        self.assertEqual(Room.objects.count(), 6)
+
+
+class UtilisationTests(SimpleTestCase):
+    def test_busy_minutes_per_room_week_and_slot(self):
+        rows = [
+            (date(2025, 3, 3), time(8), time(9), 'A', 'lecture'),
+            # Double-booked: the slot counts as fully used, not more
+            (date(2025, 3, 3), time(8, 30), time(9, 30), 'A', 'lecture'),
+            # Saturday is outside the teaching week
+            (date(2025, 3, 8), time(8), time(10), 'B', 'exam'),
+            (date(2025, 3, 11), time(9), time(10), None, 'meeting'),
+            (date(2025, 3, 12), time(9), time(10), 'B', 'lecture'),
+        ]
+
+        result = compute_utilisation(rows, date(2025, 3, 3), date(2025, 3, 17), 8 * 60, 10 * 60, 60)
+
+        self.assertEqual(result['term'], {'start': '2025-03-03', 'end': '2025-03-16'})
+        self.assertEqual(result['slots'], ['08:00', '09:00'])
+        self.assertEqual(result['weeks'], ['2025-03-03', '2025-03-10'])
+        # 600 available minutes per room and week
+        self.assertEqual(result['rooms'], [{'name': 'A', 'utilisation': 0.075}, {'name': 'B', 'utilisation': 0.05}])
+        self.assertEqual(result['room_week_heatmap'], [[0.15, 0.0], [0.0, 0.1]])
+        self.assertEqual(result['slot_heatmap'], [
+            [0.25, 0.125], [0.0, 0.0], [0.0, 0.25], [0.0, 0.0], [0.0, 0.0],
+        ])
+        self.assertEqual(result['hours_by_event_type'], {'exam': 2.0, 'lecture': 3.0, 'meeting': 1.0})
+        self.assertEqual(result['percentiles']['event_duration_minutes']['50'], 60.0)
+        self.assertEqual(result['stats'], {'events': 5, 'events_in_grid': 4, 'events_without_room': 1})
+
+    def test_partial_weeks_and_no_events(self):
+        # Wednesday to Sunday: three teaching days
+        result = compute_utilisation([], date(2025, 3, 5), date(2025, 3, 10), 8 * 60, 10 * 60, 60)
+
+        self.assertEqual(result['weeks'], ['2025-03-03'])
+        self.assertEqual(result['rooms'], [])
+        self.assertEqual(result['percentiles']['room_utilisation']['50'], None)
+        self.assertEqual(result['slot_heatmap'], [[0.0, 0.0]] * 5)
+        self.assertEqual(result['stats'], {'events': 0, 'events_in_grid': 0, 'events_without_room': 0})
+
+    def test_rooms_are_counted_over_teaching_days_only(self):
+        rows = [(date(2025, 3, 5), time(8), time(10), 'A', 'lecture')]
+
+        result = compute_utilisation(rows, date(2025, 3, 5), date(2025, 3, 10), 8 * 60, 10 * 60, 60)
+
+        # 120 of 3 days x 120 minutes
+        self.assertEqual(result['rooms'], [{'name': 'A', 'utilisation': 0.3333}])
+        self.assertEqual(result['slot_heatmap'][2], [1.0, 1.0])
+
+
+class PackAttendanceTests(SimpleTestCase):
+    def test_bits_follow_roster_order_least_significant_first(self):
+        bitmap, count, unknown = pack_attendance([3, 5, 9, 12, 20], [20, 5, 5, 99])
+
+        self.assertEqual((bitmap, count, unknown), (b'\x12', 2, [99]))
+        self.assertEqual(unpack_attendance(bitmap, 5).tolist(), [False, True, False, False, True])
+
+    def test_add_keeps_students_already_present(self):
+        roster = list(range(1, 10))
+        first, _, _ = pack_attendance(roster, [1, 9])
+
+        bitmap, count, unknown = pack_attendance(roster, [2], previous=first)
+
+        self.assertEqual((bitmap, count, unknown), (b'\x03\x01', 3, []))
+        self.assertEqual(pack_attendance(roster, [2])[1], 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Attendance rosters are PostgreSQL arrays')
+class AttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='prof@example.com', password='secret', user_role='professor')
+        cls.course = Course.objects.create(title='Algebra', description='Groups and rings', created_by=cls.professor)
+        cls.students = [
+            User.objects.create_user(email=f'student{number}@example.com', password='secret', user_role='student')
+            for number in range(3)
+        ]
+        for student in cls.students:
+            Enrollment.objects.create(
+                course=cls.course, student=student, status='enrolled', requested_at=timezone.now(),
+            )
+        cls.lectures = [
+            Event.objects.create(
+                title=f'Lecture {day}', creator=cls.professor, course=cls.course, event_type='lecture',
+                assigned_date=date(2025, 3, day), start_time=time(9), end_time=time(10),
+            )
+            for day in (3, 10)
+        ]
+
+    def check_in(self, event, present, mode='replace', user=None):
+        return self.client.post(
+            reverse('schedule:event_check_in', args=[event.id]),
+            {'present': present, 'mode': mode}, content_type='application/json', **auth(user or self.professor),
+        )
+
+    def test_check_in_records_the_roster_and_late_arrivals(self):
+        first, second, third = self.students
+
+        response = self.check_in(self.lectures[0], [first.id, 0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['not_on_roster'], [0])
+        self.assertEqual(self.check_in(self.lectures[0], [third.id], mode='add').json()['present_count'], 2)
+        self.assertEqual(self.check_in(self.lectures[0], [first.id], user=second).status_code, 403)
+
+        roster = self.client.get(
+            reverse('schedule:event_attendance', args=[self.lectures[0].id]), **auth(self.professor),
+        ).json()['roster']
+        self.assertEqual(
+            [(row['student'], row['present']) for row in roster],
+            [(first.id, True), (second.id, False), (third.id, True)],
+        )
+
+    def test_course_attendance_per_lecture_and_student(self):
+        first, second, third = self.students
+        self.check_in(self.lectures[0], [first.id, third.id])
+        self.check_in(self.lectures[1], [first.id])
+
+        lectures, students, overall = course_attendance(self.course.id)
+
+        self.assertEqual([(row['present'], row['rate']) for row in lectures], [(2, 0.6667), (1, 0.3333)])
+        self.assertEqual(
+            [(row['student'], row['attended'], row['lectures']) for row in students],
+            [(first.id, 2, 2), (second.id, 0, 2), (third.id, 1, 2)],
+        )
+        self.assertEqual(overall, 0.5)
@@ -0,0 +1,248 @@
+"""
+Weekly timetable generator for lectures.
+
+The week is a grid of ``days x slots_per_day`` time slots. Occupancy is kept
+as boolean NumPy matrices (professors x slots, rooms x slots, courses x slots)
+so every placement decision is a handful of vectorized mask operations.
+
+Solving is a greedy pass (most constrained sessions first, each into the
+feasible slot with the lowest penalty and the smallest room that fits)
+followed by local search until the time budget runs out: unplaced sessions
+are inserted by moving one blocking session elsewhere, and placed sessions are
+moved when that spreads a course's sessions over more days.
+"""
+import time
+
+import numpy as np
+
+# Penalty for each other session of the same course on the same day
+SAME_DAY_PENALTY = 10.0
+
+
+class TimetableProblem:
+    """
+    Sessions to place on a weekly grid.
+
+    ``sessions`` is a list of ``(course_index, professor_index, size)`` tuples,
+    one per weekly session; ``room_capacities`` lists the capacity of each room.
+    """
+
+    def __init__(self, sessions, professor_count, room_capacities, days=5, slots_per_day=6):
+        self.days = days
+        self.slots_per_day = slots_per_day
+        self.slot_count = days * slots_per_day
+
+        sessions = np.asarray(sessions, dtype=np.int64).reshape(-1, 3)
+        self.session_course = sessions[:, 0]
+        self.session_professor = sessions[:, 1]
+        self.session_size = sessions[:, 2]
+        self.course_count = int(self.session_course.max()) + 1 if len(sessions) else 0
+        self.professor_count = professor_count
+
+        # Rooms sorted by capacity so the first free fitting room is the smallest one
+        capacities = np.asarray(room_capacities, dtype=np.int64)
+        self.room_order = np.argsort(capacities, kind='stable')
+        self.room_capacity = capacities[self.room_order]
+
+    @property
+    def session_count(self):
+        return len(self.session_course)
+
+
+class TimetableSolution:
+    """Slot and room per session (``-1`` when a session could not be placed)"""
+
+    def __init__(self, problem, session_slot, session_room, elapsed, iterations):
+        self.problem = problem
+        self.session_slot = session_slot
+        self.session_room = session_room
+        self.elapsed = elapsed
+        self.iterations = iterations
+
+    @property
+    def unplaced(self):
+        return np.flatnonzero(self.session_slot < 0)
+
+    def placements(self):
+        """Yield (session_index, day, slot_of_day, room_index) for placed sessions"""
+        problem = self.problem
+        for session in np.flatnonzero(self.session_slot >= 0):
+            slot = int(self.session_slot[session])
+            room = int(problem.room_order[self.session_room[session]])
+            yield int(session), slot // problem.slots_per_day, slot % problem.slots_per_day, room
+
+
+class _State:
+    def __init__(self, problem):
+        self.problem = problem
+        self.professor_busy = np.zeros((problem.professor_count, problem.slot_count), dtype=bool)
+        self.room_busy = np.zeros((len(problem.room_capacity), problem.slot_count), dtype=bool)
+        self.course_busy = np.zeros((problem.course_count, problem.slot_count), dtype=bool)
+        self.course_day_load = np.zeros((problem.course_count, problem.days), dtype=np.int64)
+        self.slot_load = np.zeros(problem.slot_count, dtype=np.int64)
+        self.session_slot = np.full(problem.session_count, -1, dtype=np.int64)
+        self.session_room = np.full(problem.session_count, -1, dtype=np.int64)
+        # First room index whose capacity fits each session (rooms are sorted by capacity)
+        self.first_room = np.searchsorted(problem.room_capacity, problem.session_size, side='left')
+
+    def place(self, session, slot, room):
+        problem = self.problem
+        course = problem.session_course[session]
+        self.professor_busy[problem.session_professor[session], slot] = True
+        self.room_busy[room, slot] = True
+        self.course_busy[course, slot] = True
+        self.course_day_load[course, slot // problem.slots_per_day] += 1
+        self.slot_load[slot] += 1
+        self.session_slot[session] = slot
+        self.session_room[session] = room
+
+    def remove(self, session):
+        problem = self.problem
+        slot = self.session_slot[session]
+        room = self.session_room[session]
+        course = problem.session_course[session]
+        self.professor_busy[problem.session_professor[session], slot] = False
+        self.room_busy[room, slot] = False
+        self.course_busy[course, slot] = False
+        self.course_day_load[course, slot // problem.slots_per_day] -= 1
+        self.slot_load[slot] -= 1
+        self.session_slot[session] = -1
+        self.session_room[session] = -1
+
+    def free_rooms(self, session):
+        """Boolean (fitting rooms x slots) matrix of rooms free in each slot"""
+        return ~self.room_busy[self.first_room[session]:]
+
+    def feasible_slots(self, session, free_rooms=None):
+        problem = self.problem
+        if free_rooms is None:
+            free_rooms = self.free_rooms(session)
+        return (
+            ~self.professor_busy[problem.session_professor[session]]
+            & ~self.course_busy[problem.session_course[session]]
+            & free_rooms.any(axis=0)
+        )
+
+    def slot_penalty(self, session, rng):
+        problem = self.problem
+        day_load = self.course_day_load[problem.session_course[session]]
+        penalty = np.repeat(day_load * SAME_DAY_PENALTY, problem.slots_per_day)
+        # Prefer less crowded slots; random jitter breaks ties between equal slots
+        return penalty + self.slot_load * 0.01 + rng.random(problem.slot_count) * 0.001
+
+    def best_placement(self, session, rng):
+        """Return (slot, room, penalty) of the cheapest feasible placement, or None"""
+        free_rooms = self.free_rooms(session)
+        feasible = self.feasible_slots(session, free_rooms)
+        if not feasible.any():
+            return None
+        penalty = np.where(feasible, self.slot_penalty(session, rng), np.inf)
+        slot = int(np.argmin(penalty))
+        room = self.first_room[session] + int(np.argmax(free_rooms[:, slot]))
+        return slot, room, penalty[slot]
+
+    def session_cost(self, session):
+        problem = self.problem
+        slot = self.session_slot[session]
+        course = problem.session_course[session]
+        return (self.course_day_load[course, slot // problem.slots_per_day] - 1) * SAME_DAY_PENALTY
+
+    def blockers(self, session, slot):
+        """
+        Placed sessions that stop ``session`` from using ``slot``.
+        
+        Returns (sessions, room_only): when ``room_only`` is true, moving any
+        one of the returned sessions frees a room large enough.
+        """
+        problem = self.problem
+        in_slot = np.flatnonzero(self.session_slot == slot)
+        same_professor = problem.session_professor[in_slot] == problem.session_professor[session]
+        same_course = problem.session_course[in_slot] == problem.session_course[session]
+        blocking = in_slot[same_professor | same_course]
+        if len(blocking):
+            return blocking, False
+        fitting = self.session_room[in_slot] >= self.first_room[session]
+        return in_slot[fitting], True
+
+
+def solve(problem, time_budget=5.0, seed=0):
+    """Place every session on the weekly grid within ``time_budget`` seconds"""
+    started = time.perf_counter()
+    deadline = started + time_budget
+    rng = np.random.default_rng(seed)
+    state = _State(problem)
+
+    # Most constrained first: busiest professors, then the largest groups
+    professor_load = np.bincount(problem.session_professor, minlength=problem.professor_count)
+    order = np.lexsort((-problem.session_size, -professor_load[problem.session_professor]))
+
+    for session in order:
+        if state.first_room[session] >= len(problem.room_capacity):
+            continue  # no room is large enough
+        placement = state.best_placement(session, rng)
+        if placement:
+            state.place(session, placement[0], placement[1])
+
+    # Stop early once this many consecutive moves have failed to improve anything
+    patience = max(200, 2 * problem.session_count)
+    iterations = 0
+    stale = 0
+    while time.perf_counter() < deadline and stale < patience:
+        iterations += 1
+        unplaced = np.flatnonzero(state.session_slot < 0)
+        unplaced = unplaced[state.first_room[unplaced] < len(problem.room_capacity)]
+        if len(unplaced):
+            improved = _repair(state, rng.choice(unplaced), rng)
+        else:
+            improved = _improve(state, rng)
+        stale = 0 if improved else stale + 1
+
+    return TimetableSolution(
+        problem, state.session_slot, state.session_room,
+        time.perf_counter() - started, iterations,
+    )
+
+
+def _repair(state, session, rng, candidates_per_slot=3):
+    """Insert an unplaced session by moving a single blocking session elsewhere"""
+    for slot in rng.permutation(state.problem.slot_count):
+        blockers, room_only = state.blockers(session, slot)
+        if not room_only and len(blockers) != 1:
+            continue
+        for blocker in rng.permutation(blockers)[:candidates_per_slot]:
+            if _move_blocker(state, session, slot, blocker, rng):
+                return True
+    return False
+
+
+def _move_blocker(state, session, slot, blocker, rng):
+    old_slot, old_room = state.session_slot[blocker], state.session_room[blocker]
+    state.remove(blocker)
+    free_rooms = state.free_rooms(session)
+    if state.feasible_slots(session, free_rooms)[slot]:
+        room = state.first_room[session] + int(np.argmax(free_rooms[:, slot]))
+        state.place(session, slot, room)
+        moved = state.best_placement(blocker, rng)
+        if moved:
+            state.place(blocker, moved[0], moved[1])
+            return True
+        state.remove(session)
+    state.place(blocker, old_slot, old_room)
+    return False
+
+
+def _improve(state, rng):
+    """Move a random session to a cheaper slot if one exists"""
+    placed = np.flatnonzero(state.session_slot >= 0)
+    if not len(placed):
+        return False
+    session = rng.choice(placed)
+    cost = state.session_cost(session)
+    old_slot, old_room = state.session_slot[session], state.session_room[session]
+    state.remove(session)
+    placement = state.best_placement(session, rng)
+    if placement and placement[2] < cost:
+        state.place(session, placement[0], placement[1])
+        return True
+    state.place(session, old_slot, old_room)
+    return False
@@ -10,8 +10,48 @@ urlpatterns = [
     path('events/create/', views.api_create_event, name='create_event'),
     path('events/<int:event_id>/update/', views.api_update_event, name='update_event'),
     path('events/<int:event_id>/delete/', views.api_delete_event, name='delete_event'),
+    path('events/import/', views.api_import_events, name='import_events'),
+    path('events/mine/', views.api_my_events, name='my_events'),
+    
+    # Event participants and group targets
+    path('events/<int:event_id>/participants/', views.api_event_participants, name='event_participants'),
+    path(
+        'events/<int:event_id>/participants/update/',
+        views.api_update_event_participants,
+        name='update_event_participants',
+    ),
+    
+    # Attendance
+    path('events/<int:event_id>/attendance/', views.api_event_attendance, name='event_attendance'),
+    path('events/<int:event_id>/attendance/check-in/', views.api_event_check_in, name='event_check_in'),
+    path('attendance/students/<int:student_id>/', views.api_student_attendance, name='student_attendance'),
+    path('attendance/courses/<int:course_id>/', views.api_course_attendance, name='course_attendance'),
+    
+    # Delta sync
+    path('events/changes/', views.api_event_changes, name='event_changes'),
     
     # Events by date
     path('events/date/<int:year>/<int:month>/<int:day>/', views.api_events_by_date, name='events_by_date'),
+    
+    # Timetable generator
+    path('timetable/preview/', views.api_timetable_preview, name='timetable_preview'),
+    path('timetable/commit/', views.api_timetable_commit, name='timetable_commit'),
+    
+    # Rooms
+    path('rooms/', views.api_rooms_list, name='rooms_list'),
+    path('rooms/create/', views.api_create_room, name='create_room'),
+    path('rooms/free/', views.api_free_rooms, name='free_rooms'),
+    
+    # Analytics
+    path('analytics/utilisation/', views.api_utilisation, name='utilisation'),
+    
+    # Personal agenda
+    path('agenda/', views.api_agenda, name='agenda'),
+    
+    # iCalendar feeds
+    path('feeds/', views.api_feeds_list, name='feeds_list'),
+    path('feeds/create/', views.api_create_feed, name='create_feed'),
+    path('feeds/<int:feed_id>/delete/', views.api_delete_feed, name='delete_feed'),
+    path('feeds/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
 ]
 
@@ -1,39 +1,88 @@
+import base64
+import binascii
+import csv
+import hashlib
 import json
 import logging
-from datetime import datetime, date
-from django.http import JsonResponse
+import uuid
+from datetime import MAXYEAR, MINYEAR, datetime, date, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import (
+    F, Q, Max, Count, Case, When, Value, CharField, IntegerField, BooleanField, Exists, OuterRef,
+)
+from university_core import asyncviews
+from university_core.db.routers import primary_reads, use_primary
 from users.jwt_utils import jwt_required
-from .models import Event
+from users.models import User
+from courses.models import Course
+from jobs.views import job_to_dict
+from realtime.broker import broker
+from .analytics import compute_utilisation, load_term_rows
+from .attendance import course_attendance, course_roster, pack_attendance, student_attendance, unpack_attendance
+from .caching import get_events_version, bump_events_version
+from .ics import FEED_FIELDS, render_calendar
+from .importers import parse_csv, parse_ics, import_events
+from .tasks import import_event_file
+from .timetable import TimetableProblem, solve
+from .models import (
+    AttendanceSheet, Event, EventParticipant, EventTarget, EventTombstone, CalendarFeed, Room,
+    normalize_room_name,
+)
+from .partitions import period_bounds
 
 logger = logging.getLogger(__name__)
 
 
-@csrf_exempt
-@require_http_methods(["GET"])
+@asyncviews.csrf_exempt
+@asyncviews.require_http_methods(["GET"])
 @jwt_required
-def api_events_list(request):
+async def api_events_list(request):
     """Get list of events with optional filtering"""
     try:
         # Get query parameters
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        year = request.GET.get('year')
-        month = request.GET.get('month')
+        try:
+            page = int(request.GET.get('page', 1))
+            per_page = int(request.GET.get('per_page', 20))
+        except ValueError:
+            return JsonResponse({'error': 'page and per_page must be numbers'}, status=400)
+        try:
+            year = int(request.GET['year']) if request.GET.get('year') else None
+            month = int(request.GET['month']) if request.GET.get('month') else None
+            if year is not None and not MINYEAR <= year <= MAXYEAR:
+                raise ValueError(f'year must be between {MINYEAR} and {MAXYEAR}')
+            if month is not None and not 1 <= month <= 12:
+                raise ValueError('month must be between 1 and 12')
+        except ValueError as e:
+            logger.warning(f"Invalid events list filter: {str(e)}")
+            return JsonResponse({'error': 'Invalid year or month'}, status=400)
         event_type = request.GET.get('event_type')
         priority = request.GET.get('priority')
         search = request.GET.get('search')
         
         # Start with all events
-        events = Event.objects.all()
+        events = Event.objects.select_related('creator')
         
-        # Apply filters
-        if year:
+        # Apply filters; year/month become date ranges so partitions can be pruned
+        if year and month:
+            first_day = date(year, month, 1)
+            events = events.filter(assigned_date__gte=first_day)
+            if (year, month) != (MAXYEAR, 12):
+                next_month = date(year + month // 12, month % 12 + 1, 1)
+                events = events.filter(assigned_date__lt=next_month)
+        elif year:
             events = events.filter(assigned_date__year=year)
-        if month:
+        elif month:
             events = events.filter(assigned_date__month=month)
         if event_type:
             events = events.filter(event_type=event_type)
@@ -50,10 +99,11 @@ def api_events_list(request):
         events = events.order_by('assigned_date', 'start_time')
         
         # Pagination
-        paginator = Paginator(events, per_page)
-        page_obj = paginator.get_page(page)
+        page_obj = await asyncviews.apaginate(events, page, per_page)
+        paginator = page_obj.paginator
         
         # Prepare response data
+        today = timezone.now().date()
         events_data = []
         for event in page_obj:
             events_data.append({
@@ -71,13 +121,14 @@ def api_events_list(request):
                 'event_type': event.event_type,
                 'priority': event.priority,
                 'location': event.location,
+                'room': event.room_id,
                 'is_all_day': event.is_all_day,
                 'is_recurring': event.is_recurring,
                 'created_at': event.created_at.isoformat(),
                 'updated_at': event.updated_at.isoformat(),
-                'is_past': event.is_past,
-                'is_today': event.is_today,
-                'is_upcoming': event.is_upcoming,
+                'is_past': event.assigned_date < today,
+                'is_today': event.assigned_date == today,
+                'is_upcoming': event.assigned_date > today,
             })
         
         return JsonResponse({
@@ -97,17 +148,17 @@ def api_events_list(request):
         return JsonResponse({'error': 'Failed to fetch events'}, status=500)
 
 
-@csrf_exempt
-@require_http_methods(["GET"])
+@asyncviews.csrf_exempt
+@asyncviews.require_http_methods(["GET"])
 @jwt_required
-def api_events_by_date(request, year, month, day):
+async def api_events_by_date(request, year, month, day):
     """Get events for a specific date"""
     try:
         target_date = date(int(year), int(month), int(day))
-        events = Event.objects.filter(assigned_date=target_date).order_by('start_time')
+        events = Event.objects.select_related('creator').filter(assigned_date=target_date).order_by('start_time')
         
         events_data = []
-        for event in events:
+        async for event in events:
             events_data.append({
                 'id': event.id,
                 'title': event.title,
@@ -123,6 +174,7 @@ def api_events_by_date(request, year, month, day):
                 'event_type': event.event_type,
                 'priority': event.priority,
                 'location': event.location,
+                'room': event.room_id,
                 'is_all_day': event.is_all_day,
                 'is_recurring': event.is_recurring,
                 'created_at': event.created_at.isoformat(),
@@ -166,6 +218,7 @@ def api_event_detail(request, event_id):
             'event_type': event.event_type,
             'priority': event.priority,
             'location': event.location,
+            'room': event.room_id,
             'is_all_day': event.is_all_day,
             'is_recurring': event.is_recurring,
             'created_at': event.created_at.isoformat(),
@@ -232,20 +285,35 @@ def api_create_event(request):
         if start_time and end_time and end_time <= start_time:
             return JsonResponse({'error': 'End time must be after start time'}, status=400)
         
+        room = None
+        if data.get('room'):
+            try:
+                room = Room.objects.get(id=data['room'])
+            except (Room.DoesNotExist, ValueError, TypeError):
+                return JsonResponse({'error': 'Room not found'}, status=400)
+        
+        try:
+            audience = _parse_audience(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
         # Create event
-        event = Event.objects.create(
-            title=data['title'],
-            description=data.get('description', ''),
-            creator=request.user,
-            assigned_date=assigned_date,
-            start_time=start_time,
-            end_time=end_time,
-            event_type=data.get('event_type', 'other'),
-            priority=data.get('priority', 'medium'),
-            location=data.get('location', ''),
-            is_all_day=data.get('is_all_day', False),
-            is_recurring=data.get('is_recurring', False),
-        )
+        with transaction.atomic():
+            event = Event.objects.create(
+                title=data['title'],
+                description=data.get('description', ''),
+                creator=request.user,
+                assigned_date=assigned_date,
+                start_time=start_time,
+                end_time=end_time,
+                event_type=data.get('event_type', 'other'),
+                priority=data.get('priority', 'medium'),
+                location=data.get('location') or (room.name if room else ''),
+                room=room,
+                is_all_day=data.get('is_all_day', False),
+                is_recurring=data.get('is_recurring', False),
+            )
+            _add_audience(event, *audience)
         
         logger.warning(f"Event created: {event.title} by {request.user.email}")
         
@@ -266,6 +334,48 @@ def api_create_event(request):
         return JsonResponse({'error': 'Failed to create event'}, status=500)
 
 
+def _parse_audience(data):
+    """
+    Validate the participants, courses and roles lists of a request body.
+    
+    Returns (user_ids, course_ids, roles); raises ValueError with a message
+    suitable for the client.
+    """
+    audience = []
+    for field, model in (('participants', User), ('courses', Course)):
+        ids = data.get(field) or []
+        if not isinstance(ids, list):
+            raise ValueError(f'{field} must be a list of IDs')
+        try:
+            ids = {int(value) for value in ids}
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a list of IDs')
+        if ids and model.objects.filter(id__in=ids).count() != len(ids):
+            raise ValueError(f'Unknown IDs in {field}')
+        audience.append(ids)
+    
+    roles = data.get('roles') or []
+    valid_roles = dict(User.USER_ROLE_CHOICES)
+    if not isinstance(roles, list) or any(role not in valid_roles for role in roles):
+        raise ValueError(f"roles must be a list of: {', '.join(valid_roles)}")
+    audience.append(set(roles))
+    return tuple(audience)
+
+
+def _add_audience(event, user_ids, course_ids, roles):
+    """Attach users and group targets to an event; one row per target, not per member"""
+    EventParticipant.objects.bulk_create(
+        [EventParticipant(event=event, user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    EventTarget.objects.bulk_create(
+        [EventTarget(event=event, target_type='course', course_id=course_id) for course_id in course_ids]
+        + [EventTarget(event=event, target_type='role', role=role) for role in roles],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(bump_events_version)
+
+
 @csrf_exempt
 @require_http_methods(["PUT"])
 @jwt_required
@@ -322,6 +432,16 @@ def api_update_event(request, event_id):
             event.priority = data['priority']
         if 'location' in data:
             event.location = data['location']
+        if 'room' in data:
+            if data['room']:
+                try:
+                    event.room = Room.objects.get(id=data['room'])
+                except (Room.DoesNotExist, ValueError, TypeError):
+                    return JsonResponse({'error': 'Room not found'}, status=400)
+                if 'location' not in data:
+                    event.location = event.room.name
+            else:
+                event.room = None
         if 'is_all_day' in data:
             event.is_all_day = data['is_all_day']
         if 'is_recurring' in data:
@@ -381,4 +501,1261 @@ def api_delete_event(request, event_id):
         return JsonResponse({'error': 'Event not found'}, status=404)
     except Exception as e:
         logger.error(f"Error deleting event {event_id}: {str(e)}")
-        return JsonResponse({'error': 'Failed to delete event'}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': 'Failed to delete event'}, status=500)
+
+
+def _event_to_dict(event):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'creator': {
+            'id': event.creator.id,
+            'email': event.creator.email,
+            'full_name': event.creator.full_name,
+        },
+        'assigned_date': event.assigned_date.isoformat(),
+        'start_time': event.start_time.isoformat() if event.start_time else None,
+        'end_time': event.end_time.isoformat() if event.end_time else None,
+        'event_type': event.event_type,
+        'priority': event.priority,
+        'location': event.location,
+        'room': event.room_id,
+        'is_all_day': event.is_all_day,
+        'is_recurring': event.is_recurring,
+        'course': event.course_id,
+        'created_at': event.created_at.isoformat(),
+        'updated_at': event.updated_at.isoformat(),
+    }
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_my_events(request):
+    """Events the current user created, joined or was targeted with, optionally within a date range"""
+    try:
+        page = int(request.GET.get('page', 1))
+        per_page = int(request.GET.get('per_page', 20))
+        
+        events = Event.objects.for_user(request.user).select_related('creator')
+        try:
+            if request.GET.get('from'):
+                events = events.filter(assigned_date__gte=datetime.strptime(request.GET['from'], '%Y-%m-%d').date())
+            if request.GET.get('to'):
+                events = events.filter(assigned_date__lte=datetime.strptime(request.GET['to'], '%Y-%m-%d').date())
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+        if request.GET.get('event_type'):
+            events = events.filter(event_type=request.GET['event_type'])
+        
+        paginator = Paginator(events.order_by('assigned_date', 'start_time', 'id'), per_page)
+        page_obj = paginator.get_page(page)
+        
+        return JsonResponse({
+            'success': True,
+            'events': [_event_to_dict(event) for event in page_obj],
+            'pagination': {
+                'current_page': page_obj.number,
+                'total_pages': paginator.num_pages,
+                'total_events': paginator.count,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous(),
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error fetching events for {request.user.email}: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch events'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_event_participants(request, event_id):
+    """Users and groups an event is published to"""
+    try:
+        event = Event.objects.get(id=event_id)
+        participants = EventParticipant.objects.filter(event=event).select_related('user')
+        targets = EventTarget.objects.filter(event=event).select_related('course')
+        
+        return JsonResponse({
+            'success': True,
+            'participants': [
+                {'id': p.user.id, 'email': p.user.email, 'full_name': p.user.full_name}
+                for p in participants
+            ],
+            'courses': [
+                {'id': t.course.id, 'title': t.course.title}
+                for t in targets if t.target_type == 'course'
+            ],
+            'roles': [t.role for t in targets if t.target_type == 'role'],
+        })
+        
+    except Event.DoesNotExist:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error fetching participants of event {event_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch participants'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST", "DELETE"])
+@jwt_required
+def api_update_event_participants(request, event_id):
+    """
+    Add (POST) or remove (DELETE) participants, courses and roles.
+    
+    The body names ``participants`` (user IDs), ``courses`` (course IDs) and
+    ``roles``; a course or role is stored as one target row regardless of size.
+    """
+    if request.user.user_role not in ['admin', 'professor']:
+        logger.warning(f"Unauthorized participants update attempt: Event ID {event_id} by {request.user.email}")
+        return JsonResponse({
+            'error': 'Only admin and professor users can change event participants'
+        }, status=403)
+    
+    try:
+        event = Event.objects.get(id=event_id)
+        data = json.loads(request.body)
+        try:
+            user_ids, course_ids, roles = _parse_audience(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        with transaction.atomic():
+            if request.method == 'POST':
+                _add_audience(event, user_ids, course_ids, roles)
+            else:
+                EventParticipant.objects.filter(event=event, user_id__in=user_ids).delete()
+                EventTarget.objects.filter(
+                    Q(target_type='course', course_id__in=course_ids) | Q(target_type='role', role__in=roles),
+                    event=event,
+                ).delete()
+                transaction.on_commit(bump_events_version)
+        
+        logger.info(f"Participants of event {event_id} updated by {request.user.email}")
+        return JsonResponse({
+            'success': True,
+            'message': 'Event participants updated successfully',
+        })
+        
+    except Event.DoesNotExist:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        logger.error(f"Error updating participants of event {event_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to update participants'}, status=500)
+
+
+def _can_take_attendance(user, event):
+    if user.user_role == 'admin' or event.creator_id == user.id:
+        return True
+    return event.course is not None and event.course.created_by_id == user.id
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_event_attendance(request, event_id):
+    """Roster of a lecture with each student's attendance"""
+    try:
+        event = Event.objects.select_related('course').get(id=event_id)
+        if not _can_take_attendance(request.user, event):
+            return JsonResponse({'error': 'Only the lecturer or an admin can view attendance'}, status=403)
+        
+        try:
+            sheet = event.attendance
+        except AttendanceSheet.DoesNotExist:
+            return JsonResponse({'error': 'Attendance has not been taken for this event'}, status=404)
+        
+        present = unpack_attendance(sheet.present, len(sheet.roster))
+        users = User.objects.in_bulk(sheet.roster)
+        return JsonResponse({
+            'success': True,
+            'event': event.id,
+            'course': sheet.course_id,
+            'present_count': sheet.present_count,
+            'roster_size': sheet.roster_size,
+            'roster': [
+                {
+                    'student': student_id,
+                    'email': users[student_id].email if student_id in users else None,
+                    'present': bool(is_present),
+                }
+                for student_id, is_present in zip(sheet.roster, present)
+            ],
+            'updated_at': sheet.updated_at.isoformat(),
+        })
+        
+    except Event.DoesNotExist:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error fetching attendance for event {event_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch attendance'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_event_check_in(request, event_id):
+    """
+    Record attendance for a whole lecture in one request.
+    
+    The body lists the attending student IDs in ``present``; everyone else on
+    the roster is absent. With ``"mode": "add"`` the students are added to
+    those already present (late arrivals) instead.
+    """
+    try:
+        event = Event.objects.select_related('course').get(id=event_id)
+        if not _can_take_attendance(request.user, event):
+            logger.warning(f"Unauthorized check-in attempt: Event ID {event_id} by {request.user.email}")
+            return JsonResponse({'error': 'Only the lecturer or an admin can take attendance'}, status=403)
+        if event.event_type != 'lecture' or event.course_id is None:
+            return JsonResponse({'error': 'Attendance can only be taken for lectures linked to a course'}, status=400)
+        
+        data = json.loads(request.body)
+        present_ids = data.get('present')
+        mode = data.get('mode', 'replace')
+        if not isinstance(present_ids, list) or not all(isinstance(value, int) for value in present_ids):
+            return JsonResponse({'error': 'present must be a list of student IDs'}, status=400)
+        if mode not in ('replace', 'add'):
+            return JsonResponse({'error': 'mode must be replace or add'}, status=400)
+        
+        with transaction.atomic():
+            sheet = AttendanceSheet.objects.select_for_update().filter(event=event).first()
+            if sheet is None:
+                roster = course_roster(event.course_id)
+                sheet = AttendanceSheet(event=event, course_id=event.course_id, roster=roster, roster_size=len(roster))
+            previous = sheet.present if mode == 'add' and sheet.pk else None
+            sheet.present, sheet.present_count, unknown = pack_attendance(sheet.roster, present_ids, previous)
+            sheet.taken_by = request.user
+            sheet.save()
+        
+        logger.info(
+            f"Attendance for event {event_id} recorded by {request.user.email}: "
+            f"{sheet.present_count}/{sheet.roster_size} present"
+        )
+        return JsonResponse({
+            'success': True,
+            'message': 'Attendance recorded successfully',
+            'present_count': sheet.present_count,
+            'roster_size': sheet.roster_size,
+            'not_on_roster': unknown,
+        })
+        
+    except Event.DoesNotExist:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        logger.error(f"Error recording attendance for event {event_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to record attendance'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_student_attendance(request, student_id):
+    """Attendance rate of a student per course (optionally one ``course``)"""
+    if request.user.user_role not in ['admin', 'professor'] and request.user.id != student_id:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    try:
+        course_id = int(request.GET['course']) if request.GET.get('course') else None
+        rates = student_attendance(student_id, course_id)
+        titles = dict(Course.objects.filter(id__in=rates).values_list('id', 'title'))
+        attended = sum(count for count, _ in rates.values())
+        expected = sum(total for _, total in rates.values())
+        
+        return JsonResponse({
+            'success': True,
+            'student': student_id,
+            'courses': [
+                {
+                    'course': course,
+                    'course_title': titles.get(course),
+                    'attended': count,
+                    'lectures': total,
+                    'rate': round(count / total, 4) if total else 0.0,
+                }
+                for course, (count, total) in sorted(rates.items())
+            ],
+            'attended': attended,
+            'lectures': expected,
+            'rate': round(attended / expected, 4) if expected else 0.0,
+        })
+        
+    except ValueError:
+        return JsonResponse({'error': 'course must be a number'}, status=400)
+    except Exception as e:
+        logger.error(f"Error fetching attendance of student {student_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch attendance'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_course_attendance(request, course_id):
+    """Attendance per lecture and per student for a course"""
+    try:
+        course = Course.objects.get(id=course_id)
+        if request.user.user_role != 'admin' and course.created_by_id != request.user.id:
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        
+        lectures, students, overall = course_attendance(course.id)
+        emails = dict(User.objects.filter(id__in=[item['student'] for item in students]).values_list('id', 'email'))
+        for item in students:
+            item['email'] = emails.get(item['student'])
+        
+        return JsonResponse({
+            'success': True,
+            'course': course.id,
+            'lectures': lectures,
+            'students': students,
+            'rate': overall,
+        })
+        
+    except Course.DoesNotExist:
+        return JsonResponse({'error': 'Course not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error fetching attendance of course {course_id}: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch attendance'}, status=500)
+
+
+def _encode_sync_cursor(timestamp, last_id=0):
+    micros = int(timestamp.timestamp() * 1_000_000)
+    return base64.urlsafe_b64encode(f'{micros}.{last_id}'.encode()).decode().rstrip('=')
+
+
+def _decode_sync_cursor(cursor):
+    """Return (timestamp, last_id) for a cursor produced by ``_encode_sync_cursor``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        micros, last_id = raw.split('.')
+        timestamp = datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc)
+        return timestamp, int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        raise ValueError(f'Invalid sync cursor: {cursor}')
+
+
+# Start of the oldest transaction that has written anything and not yet finished
+OLDEST_WRITE_SQL = """
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid() AND datname = current_database()
+"""
+
+
+def _oldest_write_started_at():
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(OLDEST_WRITE_SQL)
+        return cursor.fetchone()[0]
+
+
+def _sync_watermark(now):
+    """
+    Latest ``updated_at`` up to which every event change is committed.
+    
+    ``updated_at`` is set when a row is written, not when its transaction
+    commits, so a long import or timetable commit can make rows visible after
+    newer ones with an older ``updated_at``. Changes are only sent up to the
+    start of the oldest transaction still writing, less
+    ``EVENT_SYNC_OVERLAP_SECONDS`` for clock differences between web servers.
+    """
+    watermark = now
+    oldest_write = _oldest_write_started_at()
+    if oldest_write is not None:
+        watermark = min(watermark, oldest_write)
+    return watermark - timedelta(seconds=settings.EVENT_SYNC_OVERLAP_SECONDS)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+@use_primary  # a lagging replica could hide changes from before the returned cursor
+def api_event_changes(request):
+    """
+    Delta sync: events created or updated since ``since`` plus deleted event IDs.
+    
+    Without ``since`` the full event set is returned. Clients store the returned
+    cursor and keep requesting while ``has_more`` is true. Only changes up to
+    the sync watermark are sent, so none can commit behind a returned cursor.
+    """
+    try:
+        now = timezone.now()
+        limit = min(int(request.GET.get('limit', settings.EVENT_SYNC_PAGE_SIZE)), settings.EVENT_SYNC_PAGE_SIZE)
+        since = request.GET.get('since')
+        watermark = _sync_watermark(now)
+        
+        changed = (
+            Event.objects.select_related('creator')
+            .filter(updated_at__lte=watermark)
+            .order_by('updated_at', 'id')
+        )
+        deleted = EventTombstone.objects.none()
+        if since:
+            since_time, since_id = _decode_sync_cursor(since)
+            if since_time < now - timedelta(days=settings.EVENT_TOMBSTONE_RETENTION_DAYS):
+                return JsonResponse({
+                    'error': 'Sync cursor expired, full resync required',
+                    'full_resync': True,
+                }, status=410)
+            changed = changed.filter(
+                Q(updated_at__gt=since_time) | Q(updated_at=since_time, id__gt=since_id)
+            )
+            deleted = EventTombstone.objects.filter(deleted_at__gt=since_time, deleted_at__lte=watermark)
+        
+        events = list(changed[:limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        if has_more:
+            # Keyset cursor: resume exactly after the last row of this page
+            last = events[-1]
+            cursor = _encode_sync_cursor(last.updated_at, last.id)
+            deleted = deleted.filter(deleted_at__lte=last.updated_at)
+        else:
+            # Later changes are sent once every transaction that could precede them has finished
+            if since and watermark <= since_time:
+                cursor = since
+            else:
+                cursor = _encode_sync_cursor(watermark)
+        
+        return JsonResponse({
+            'success': True,
+            'events': [_event_to_dict(event) for event in events],
+            'deleted': list(deleted.values_list('event_id', flat=True).distinct()),
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+        
+    except ValueError as e:
+        logger.warning(f"Invalid delta sync request: {str(e)}")
+        return JsonResponse({'error': 'Invalid since cursor or limit'}, status=400)
+    except Exception as e:
+        logger.error(f"Error fetching event changes: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch event changes'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_import_events(request):
+    """
+    Bulk import events from an uploaded CSV or iCalendar file.
+    
+    The file is sent as multipart field ``file``. Valid rows are inserted in
+    batches and every invalid row is reported with its line number.
+    Pass ``dry_run=true`` to validate without inserting, or ``background=true``
+    to import in a background job: the answer is then ``202`` with the job,
+    whose ``result`` at ``/jobs/<id>/`` is the usual report.
+    """
+    logger.info(f"Event import attempt by: {request.user.email} (Role: {request.user.user_role})")
+    # Only admin and professor can import events
+    if request.user.user_role not in ['admin', 'professor']:
+        logger.warning(f"Unauthorized event import attempt by: {request.user.email}")
+        return JsonResponse({
+            'error': 'Only admin and professor users can import events'
+        }, status=403)
+    
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({'error': 'file is required'}, status=400)
+    
+    file_format = (request.POST.get('format') or request.GET.get('format') or '').lower()
+    if not file_format:
+        name = upload.name.lower()
+        if name.endswith(('.ics', '.ical')) or upload.content_type == 'text/calendar':
+            file_format = 'ics'
+        else:
+            file_format = 'csv'
+    if file_format not in ('csv', 'ics'):
+        return JsonResponse({'error': 'Unsupported format. Use csv or ics'}, status=400)
+    
+    dry_run = (request.POST.get('dry_run') or request.GET.get('dry_run') or '').lower() == 'true'
+    background = (request.POST.get('background') or request.GET.get('background') or '').lower() == 'true'
+    
+    try:
+        if background and not dry_run:
+            # The job parses the stored file itself; its rows never pass through memory or the job row
+            name = default_storage.save(f'{settings.EVENT_IMPORT_UPLOAD_DIR}/{uuid.uuid4().hex}.{file_format}', upload)
+            job = import_event_file.enqueue(
+                name=name, file_format=file_format, creator_id=request.user.id, created_by=request.user,
+            )
+            logger.info(f"Event import by {request.user.email} queued as job {job.id}")
+            return JsonResponse({
+                'success': True,
+                'job': job_to_dict(job),
+            }, status=202)
+        
+        rows = parse_ics(upload.file) if file_format == 'ics' else parse_csv(upload.file)
+        with transaction.atomic():
+            result = import_events(rows, request.user, dry_run=dry_run)
+            if result['imported'] and not dry_run:
+                broker.publish_on_commit('event', 'imported', None, count=result['imported'])
+                transaction.on_commit(bump_events_version)
+        
+        logger.warning(
+            f"Event import by {request.user.email}: {result['imported']} imported, "
+            f"{result['failed']} failed{' (dry run)' if dry_run else ''}"
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'dry_run': dry_run,
+            **result,
+        }, status=200 if dry_run or not result['imported'] else 201)
+        
+    except (UnicodeDecodeError, csv.Error) as e:
+        logger.warning(f"Unreadable event import file from {request.user.email}: {str(e)}")
+        return JsonResponse({'error': f'Could not read {file_format} file: {str(e)}'}, status=400)
+    except Exception as e:
+        logger.error(f"Error importing events: {str(e)}")
+        return JsonResponse({'error': 'Failed to import events'}, status=500)
+
+
+# Agenda buckets computed in SQL: exams and deadlines are surfaced separately
+AGENDA_BUCKET = Case(
+    When(event_type='exam', then=Value('exam')),
+    When(event_type__in=['deadline', 'assignment'], then=Value('deadline')),
+    default=Value('event'),
+    output_field=CharField(),
+)
+AGENDA_URGENCY = Case(
+    When(priority='urgent', then=Value(0)),
+    When(priority='high', then=Value(1)),
+    When(priority='medium', then=Value(2)),
+    default=Value(3),
+    output_field=IntegerField(),
+)
+
+
+def _agenda_cache_timeout(first_event, now):
+    """Seconds until the first agenda entry is over (or AGENDA_CACHE_TIMEOUT)"""
+    timeout = settings.AGENDA_CACHE_TIMEOUT
+    if first_event and first_event['assigned_date'] == now.date():
+        ends_at = first_event['end_time'] or first_event['start_time']
+        if ends_at and not first_event['is_all_day']:
+            ends = datetime.combine(now.date(), ends_at, tzinfo=now.tzinfo)
+            timeout = min(timeout, int((ends - now).total_seconds()) + 1)
+    return max(timeout, 1)
+
+
+def _agenda_order(event):
+    """Sort key matching the agenda's ORDER BY: untimed events last on their day"""
+    return (event['assigned_date'], event['start_time'] is None, event['start_time'] or time.min, event['id'])
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_agenda(request):
+    """The current user's next events and deadlines, starting today"""
+    try:
+        limit = min(int(request.GET.get('limit', settings.AGENDA_DEFAULT_LIMIT)), settings.AGENDA_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        
+        now = timezone.now()
+        today = now.date()
+        cache_key = f'schedule:agenda:{request.user.id}:{limit}:{today.isoformat()}:{get_events_version()}'
+        payload = cache.get(cache_key)
+        
+        if payload is None:
+            # One ordered LIMIT scan per visibility branch, merged here: the ORed
+            # for_user filter would make the database sort every visible event.
+            # Stored under the current events version, so never read from a lagging replica
+            with primary_reads():
+                events = {}
+                for branch in Event.objects.for_user_branches(request.user):
+                    rows = (
+                        branch
+                        .filter(assigned_date__gte=today)
+                        .exclude(assigned_date=today, is_all_day=False, end_time__lt=now.time())
+                        .annotate(
+                            bucket=AGENDA_BUCKET,
+                            urgency=AGENDA_URGENCY,
+                            is_today=Case(
+                                When(assigned_date=today, then=Value(True)),
+                                default=Value(False),
+                                output_field=BooleanField(),
+                            ),
+                        )
+                        .order_by('assigned_date', F('start_time').asc(nulls_last=True), 'id')
+                        .values(
+                            'id', 'title', 'assigned_date', 'start_time', 'end_time', 'event_type',
+                            'priority', 'location', 'is_all_day', 'bucket', 'urgency', 'is_today',
+                        )[:limit]
+                    )
+                    events.update((row['id'], row) for row in rows)
+                events = sorted(events.values(), key=_agenda_order)[:limit]
+            timeout = _agenda_cache_timeout(events[0] if events else None, now)
+            
+            counts = {'exam': 0, 'deadline': 0, 'event': 0}
+            for event in events:
+                counts[event['bucket']] += 1
+                event['assigned_date'] = event['assigned_date'].isoformat()
+                event['start_time'] = event['start_time'].isoformat() if event['start_time'] else None
+                event['end_time'] = event['end_time'].isoformat() if event['end_time'] else None
+            
+            payload = {
+                'success': True,
+                'agenda': events,
+                'counts': counts,
+                'generated_at': now.isoformat(),
+            }
+            cache.set(cache_key, payload, timeout)
+        
+        return JsonResponse(payload)
+        
+    except ValueError as e:
+        logger.warning(f"Invalid agenda request: {str(e)}")
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+    except Exception as e:
+        logger.error(f"Error fetching agenda: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch agenda'}, status=500)
+
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _timetable_slot_times(data):
+    """Start/end time of each slot of the day from the request's grid settings"""
+    day_start = datetime.strptime(data.get('day_start', '08:00'), '%H:%M')
+    slot_minutes = int(data.get('slot_minutes', 90))
+    break_minutes = int(data.get('break_minutes', 15))
+    slots_per_day = int(data.get('slots_per_day', 6))
+    if slot_minutes < 1 or break_minutes < 0 or slots_per_day < 1:
+        raise ValueError('Invalid time grid')
+    slots = []
+    for index in range(slots_per_day):
+        start = day_start + timedelta(minutes=index * (slot_minutes + break_minutes))
+        end = start + timedelta(minutes=slot_minutes)
+        if end.date() != day_start.date():
+            raise ValueError('Time grid runs past midnight')
+        slots.append((start.time(), end.time()))
+    return slots
+
+
+def _build_timetable(data):
+    """Solve the timetable described by a preview request; return the preview payload"""
+    if data.get('rooms'):
+        rooms = [
+            {'id': None, 'name': str(room['name']), 'capacity': int(room.get('capacity', 0))}
+            for room in data['rooms']
+        ]
+    else:
+        rooms = list(Room.objects.values('id', 'name', 'capacity'))
+    if not rooms:
+        raise ValueError('rooms is required')
+    room_capacities = [room['capacity'] for room in rooms]
+    
+    slot_times = _timetable_slot_times(data)
+    days = int(data.get('days', 5))
+    if not 1 <= days <= 7:
+        raise ValueError('days must be between 1 and 7')
+    default_sessions = int(data.get('sessions_per_week', 2))
+    default_size = int(data.get('default_size', 30))
+    
+    requested = {int(item['course']): item for item in data.get('courses') or []}
+    courses = Course.objects.filter(is_active=True).select_related('created_by')
+    if requested:
+        courses = courses.filter(id__in=requested)
+    courses = list(courses.order_by('id'))
+    
+    professor_index = {}
+    sessions = []
+    for course_index, course in enumerate(courses):
+        item = requested.get(course.id, {})
+        professor = professor_index.setdefault(course.created_by_id, len(professor_index))
+        size = int(item.get('size', default_size))
+        sessions.extend([(course_index, professor, size)] * int(item.get('sessions_per_week', default_sessions)))
+    
+    problem = TimetableProblem(sessions, len(professor_index), room_capacities, days, len(slot_times))
+    time_budget = min(
+        float(data.get('time_budget', settings.TIMETABLE_DEFAULT_TIME_BUDGET)),
+        settings.TIMETABLE_MAX_TIME_BUDGET,
+    )
+    solution = solve(problem, time_budget=time_budget)
+    
+    placed = []
+    for session, day, slot, room in solution.placements():
+        course = courses[problem.session_course[session]]
+        start_time, end_time = slot_times[slot]
+        placed.append({
+            'course': course.id,
+            'course_title': course.title,
+            'professor': course.created_by_id,
+            'professor_name': course.created_by_name,
+            'day': day,
+            'day_name': WEEKDAY_NAMES[day],
+            'start_time': start_time.isoformat(timespec='minutes'),
+            'end_time': end_time.isoformat(timespec='minutes'),
+            'room': rooms[room]['name'],
+            'room_id': rooms[room]['id'],
+        })
+    placed.sort(key=lambda item: (item['day'], item['start_time'], item['room']))
+    
+    unplaced = [
+        {'course': courses[problem.session_course[session]].id,
+         'course_title': courses[problem.session_course[session]].title}
+        for session in solution.unplaced
+    ]
+    return {
+        'sessions': placed,
+        'unplaced': unplaced,
+        'stats': {
+            'courses': len(courses),
+            'sessions': problem.session_count,
+            'placed': len(placed),
+            'unplaced': len(unplaced),
+            'elapsed_ms': round(solution.elapsed * 1000, 1),
+            'iterations': solution.iterations,
+        },
+    }
+
+
+def _lock_timetable_resources(sessions):
+    """
+    Lock the catalogue rooms and the professors of a timetable's sessions
+    until the transaction ends, always in the same order.
+    """
+    room_ids = {session['room_id'] for session in sessions if session.get('room_id')}
+    professors = {session['professor'] for session in sessions}
+    list(Room.objects.select_for_update().filter(id__in=room_ids).order_by('id').values_list('id', flat=True))
+    list(User.objects.select_for_update().filter(id__in=professors).order_by('id').values_list('id', flat=True))
+
+
+def _timetable_conflicts(sessions, start_date, end_date):
+    """
+    Existing events that a committed timetable would overlap.
+    
+    A session clashes with an event on the same weekday between start_date and
+    end_date that is in its room (by id, or by name for rooms not in the
+    catalogue) or taught by its professor, and whose time overlaps the
+    session's. All-day and untimed events block the whole day; events without
+    an end block from their start.
+    """
+    room_ids = {session['room_id'] for session in sessions if session.get('room_id')}
+    room_names = {normalize_room_name(session['room']) for session in sessions if not session.get('room_id')}
+    professors = {session['professor'] for session in sessions}
+    
+    nearby = Q(room_id__in=room_ids) | Q(creator_id__in=professors)
+    for name in room_names:
+        nearby |= Q(location__iexact=name)
+    events = Event.objects.filter(nearby, assigned_date__gte=start_date, assigned_date__lte=end_date).values(
+        'id', 'title', 'assigned_date', 'start_time', 'end_time', 'is_all_day', 'room_id', 'location', 'creator_id',
+    )
+    
+    by_day = {}
+    for session in sessions:
+        by_day.setdefault(session['day'], []).append((
+            session,
+            time.fromisoformat(session['start_time']),
+            time.fromisoformat(session['end_time']),
+        ))
+    
+    conflicts = []
+    for event in events.iterator():
+        for session, start, end in by_day.get(event['assigned_date'].weekday(), []):
+            if session.get('room_id'):
+                same_room = event['room_id'] == session['room_id']
+            else:
+                same_room = normalize_room_name(event['location'] or '') == normalize_room_name(session['room'])
+            if not same_room and event['creator_id'] != session['professor']:
+                continue
+            if not (
+                event['is_all_day']
+                or event['start_time'] is None
+                or (event['start_time'] < end and event['end_time'] is not None and event['end_time'] > start)
+                or (start <= event['start_time'] < end and event['end_time'] is None)
+            ):
+                continue
+            conflicts.append({
+                'course': session['course'],
+                'day_name': session['day_name'],
+                'start_time': session['start_time'],
+                'room': session['room'],
+                'reason': 'room' if same_room else 'professor',
+                'event': event['id'],
+                'event_title': event['title'],
+                'event_date': event['assigned_date'].isoformat(),
+            })
+    return conflicts
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_timetable_preview(request):
+    """Generate a conflict-free weekly lecture timetable without saving it"""
+    logger.info(f"Timetable preview requested by: {request.user.email} (Role: {request.user.user_role})")
+    if request.user.user_role != 'admin':
+        logger.warning(f"Unauthorized timetable preview attempt by: {request.user.email}")
+        return JsonResponse({'error': 'Only admin users can generate timetables'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        preview = _build_timetable(data)
+        preview_id = uuid.uuid4().hex
+        cache.set(
+            f'schedule:timetable:{preview_id}',
+            {'created_by': request.user.id, 'sessions': preview['sessions']},
+            settings.TIMETABLE_PREVIEW_TIMEOUT,
+        )
+        
+        logger.info(
+            f"Timetable preview {preview_id}: {preview['stats']['placed']} placed, "
+            f"{preview['stats']['unplaced']} unplaced in {preview['stats']['elapsed_ms']} ms"
+        )
+        return JsonResponse({
+            'success': True,
+            'preview_id': preview_id,
+            'expires_in': settings.TIMETABLE_PREVIEW_TIMEOUT,
+            **preview,
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Invalid timetable request: {str(e)}")
+        return JsonResponse({'error': f'Invalid timetable request: {str(e)}'}, status=400)
+    except Exception as e:
+        logger.error(f"Error generating timetable: {str(e)}")
+        return JsonResponse({'error': 'Failed to generate timetable'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_timetable_commit(request):
+    """
+    Create lecture events for every week between start_date and end_date from a preview.
+    
+    Fails with 409 when a session clashes with an existing event in its room or
+    of its professor, or when the preview has already been committed.
+    """
+    logger.info(f"Timetable commit requested by: {request.user.email} (Role: {request.user.user_role})")
+    if request.user.user_role != 'admin':
+        logger.warning(f"Unauthorized timetable commit attempt by: {request.user.email}")
+        return JsonResponse({'error': 'Only admin users can commit timetables'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        for field in ['preview_id', 'start_date', 'end_date']:
+            if not data.get(field):
+                return JsonResponse({'error': f'{field} is required'}, status=400)
+        
+        try:
+            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+        if end_date < start_date:
+            return JsonResponse({'error': 'end_date must not be before start_date'}, status=400)
+        
+        cache_key = f"schedule:timetable:{data['preview_id']}"
+        preview = cache.get(cache_key)
+        if preview is None:
+            return JsonResponse({'error': 'Timetable preview not found or expired'}, status=404)
+        
+        events = []
+        for session in preview['sessions']:
+            first_day = start_date + timedelta(days=(session['day'] - start_date.weekday()) % 7)
+            day = first_day
+            while day <= end_date:
+                events.append(Event(
+                    title=session['course_title'],
+                    creator_id=session['professor'],
+                    course_id=session['course'],
+                    assigned_date=day,
+                    start_time=time.fromisoformat(session['start_time']),
+                    end_time=time.fromisoformat(session['end_time']),
+                    event_type='lecture',
+                    location=session['room'],
+                    room_id=session.get('room_id'),
+                    is_recurring=True,
+                ))
+                day += timedelta(days=7)
+        
+        claimed = False
+        try:
+            with transaction.atomic():
+                # Held until the events are saved, so commits sharing a room or
+                # professor check for clashes one after the other
+                _lock_timetable_resources(preview['sessions'])
+                conflicts = _timetable_conflicts(preview['sessions'], start_date, end_date)
+                if conflicts:
+                    logger.warning(f"Timetable {data['preview_id']} clashes with {len(conflicts)} existing events")
+                    return JsonResponse({
+                        'error': 'Timetable clashes with existing events',
+                        'conflicts': conflicts[:100],
+                        'conflict_count': len(conflicts),
+                    }, status=409)
+                # Claims the preview: a second commit of it finds nothing to delete
+                if not cache.delete(cache_key):
+                    return JsonResponse({'error': 'Timetable preview has already been committed'}, status=409)
+                claimed = True
+                Event.objects.bulk_create(events, batch_size=settings.EVENT_IMPORT_BATCH_SIZE)
+                broker.publish_on_commit('event', 'imported', None, count=len(events))
+                transaction.on_commit(bump_events_version)
+        except Exception:
+            # Nothing was saved, so the preview can be committed again
+            if claimed:
+                cache.set(cache_key, preview, settings.TIMETABLE_PREVIEW_TIMEOUT)
+            raise
+        
+        logger.warning(f"Timetable {data['preview_id']} committed by {request.user.email}: {len(events)} events")
+        return JsonResponse({
+            'success': True,
+            'message': 'Timetable committed successfully',
+            'events_created': len(events),
+        }, status=201)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        logger.error(f"Error committing timetable: {str(e)}")
+        return JsonResponse({'error': 'Failed to commit timetable'}, status=500)
+
+
+def _room_to_dict(room):
+    return {
+        'id': room.id,
+        'name': room.name,
+        'building': room.building,
+        'capacity': room.capacity,
+        'features': room.features,
+    }
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_rooms_list(request):
+    """List rooms, optionally filtered by building and minimum capacity"""
+    try:
+        rooms = Room.objects.all()
+        building = request.GET.get('building')
+        min_capacity = request.GET.get('min_capacity')
+        if building:
+            rooms = rooms.filter(building=building)
+        if min_capacity:
+            rooms = rooms.filter(capacity__gte=int(min_capacity))
+        
+        return JsonResponse({
+            'success': True,
+            'rooms': [_room_to_dict(room) for room in rooms],
+        })
+        
+    except ValueError:
+        return JsonResponse({'error': 'min_capacity must be a number'}, status=400)
+    except Exception as e:
+        logger.error(f"Error fetching rooms: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch rooms'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_create_room(request):
+    """Create a room"""
+    if request.user.user_role != 'admin':
+        logger.warning(f"Unauthorized room creation attempt by: {request.user.email}")
+        return JsonResponse({'error': 'Only admin users can create rooms'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        name = ' '.join(str(data.get('name') or '').split())
+        if not name:
+            return JsonResponse({'error': 'name is required'}, status=400)
+        if Room.objects.filter(normalized_name=normalize_room_name(name)).exists():
+            return JsonResponse({'error': 'A room with this name already exists'}, status=400)
+        features = data.get('features', [])
+        if not isinstance(features, list):
+            return JsonResponse({'error': 'features must be a list'}, status=400)
+        
+        room = Room.objects.create(
+            name=name,
+            building=data.get('building', ''),
+            capacity=int(data.get('capacity', 0)),
+            features=features,
+        )
+        
+        logger.warning(f"Room created: {room.name} by {request.user.email}")
+        return JsonResponse({
+            'success': True,
+            'message': 'Room created successfully',
+            'room': _room_to_dict(room),
+        }, status=201)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except ValueError:
+        return JsonResponse({'error': 'capacity must be a number'}, status=400)
+    except Exception as e:
+        logger.error(f"Error creating room: {str(e)}")
+        return JsonResponse({'error': 'Failed to create room'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_free_rooms(request):
+    """
+    Rooms with no event overlapping [start, end) on a date.
+    
+    Query parameters: date (YYYY-MM-DD), start and end (HH:MM), and optionally
+    min_capacity, building and a comma-separated list of required features.
+    """
+    try:
+        try:
+            day = datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+        try:
+            start = datetime.strptime(request.GET.get('start', ''), '%H:%M').time()
+            end = datetime.strptime(request.GET.get('end', ''), '%H:%M').time()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid start/end format. Use HH:MM'}, status=400)
+        if end <= start:
+            return JsonResponse({'error': 'End time must be after start time'}, status=400)
+        
+        # Served by the (room, assigned_date, start_time, end_time) index: one
+        # index range per room, no per-event work in Python. All-day and untimed
+        # events block the whole day; events without an end block from their start.
+        busy = Event.objects.filter(room=OuterRef('pk'), assigned_date=day).filter(
+            Q(is_all_day=True)
+            | Q(start_time__isnull=True)
+            | Q(start_time__lt=end, end_time__gt=start)
+            | Q(start_time__lt=end, start_time__gte=start, end_time__isnull=True)
+        )
+        rooms = Room.objects.exclude(Exists(busy))
+        
+        min_capacity = request.GET.get('min_capacity')
+        building = request.GET.get('building')
+        features = [f.strip() for f in request.GET.get('features', '').split(',') if f.strip()]
+        if min_capacity:
+            rooms = rooms.filter(capacity__gte=int(min_capacity))
+        if building:
+            rooms = rooms.filter(building=building)
+        if features:
+            rooms = rooms.filter(features__contains=features)
+        
+        return JsonResponse({
+            'success': True,
+            'date': day.isoformat(),
+            'start_time': start.isoformat(timespec='minutes'),
+            'end_time': end.isoformat(timespec='minutes'),
+            'rooms': [_room_to_dict(room) for room in rooms.order_by('capacity', 'name')],
+        })
+        
+    except ValueError:
+        return JsonResponse({'error': 'min_capacity must be a number'}, status=400)
+    except Exception as e:
+        logger.error(f"Error finding free rooms: {str(e)}")
+        return JsonResponse({'error': 'Failed to find free rooms'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_utilisation(request):
+    """
+    Room and time-slot utilisation heatmaps for the academic term containing ``date``.
+    
+    Optional query parameters: date (YYYY-MM-DD, default today) and
+    slot_minutes (default UTILISATION_SLOT_MINUTES).
+    """
+    if request.user.user_role != 'admin':
+        logger.warning(f"Unauthorized utilisation analytics request by: {request.user.email}")
+        return JsonResponse({'error': 'Only admin users can view utilisation analytics'}, status=403)
+    
+    try:
+        try:
+            day = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if request.GET.get('date') else date.today()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+        try:
+            slot_minutes = int(request.GET.get('slot_minutes', settings.UTILISATION_SLOT_MINUTES))
+        except ValueError:
+            return JsonResponse({'error': 'slot_minutes must be a number'}, status=400)
+        
+        day_start = datetime.strptime(settings.UTILISATION_DAY_START, '%H:%M')
+        day_end = datetime.strptime(settings.UTILISATION_DAY_END, '%H:%M')
+        day_start = day_start.hour * 60 + day_start.minute
+        day_end = day_end.hour * 60 + day_end.minute
+        if not 15 <= slot_minutes <= day_end - day_start:
+            return JsonResponse({'error': 'slot_minutes is out of range'}, status=400)
+        
+        term_start, term_end = period_bounds(day, 'term')
+        cache_key = f'schedule:utilisation:{term_start.isoformat()}:{slot_minutes}:{get_events_version()}'
+        payload = cache.get(cache_key)
+        
+        if payload is None:
+            # Stored under the current events version, so never read from a lagging replica
+            with primary_reads():
+                rows = load_term_rows(term_start, term_end)
+            payload = compute_utilisation(
+                rows, term_start, term_end,
+                day_start, day_end, slot_minutes, settings.UTILISATION_WEEKDAYS,
+            )
+            payload['weekdays'] = WEEKDAY_NAMES[:settings.UTILISATION_WEEKDAYS]
+            payload['generated_at'] = timezone.now().isoformat()
+            cache.set(cache_key, payload, settings.UTILISATION_CACHE_TIMEOUT)
+        
+        return JsonResponse({'success': True, **payload})
+        
+    except Exception as e:
+        logger.error(f"Error computing utilisation: {str(e)}")
+        return JsonResponse({'error': 'Failed to compute utilisation'}, status=500)
+
+
+def _feed_to_dict(request, feed):
+    return {
+        'id': feed.id,
+        'url': request.build_absolute_uri(reverse('schedule:calendar_feed', args=[feed.token])),
+        'event_type': feed.event_type,
+        'priority': feed.priority,
+        'created_at': feed.created_at.isoformat(),
+    }
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@jwt_required
+def api_feeds_list(request):
+    """List calendar feeds owned by the current user"""
+    feeds = CalendarFeed.objects.filter(user=request.user)
+    return JsonResponse({
+        'success': True,
+        'feeds': [_feed_to_dict(request, feed) for feed in feeds],
+    })
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_required
+def api_create_feed(request):
+    """Create a private iCalendar feed for the current user"""
+    logger.info(f"Calendar feed creation by: {request.user.email}")
+    try:
+        data = json.loads(request.body) if request.body else {}
+        
+        event_type = data.get('event_type') or None
+        priority = data.get('priority') or None
+        if event_type and event_type not in dict(Event.EVENT_TYPES):
+            return JsonResponse({'error': 'Invalid event_type'}, status=400)
+        if priority and priority not in dict(Event.PRIORITY_LEVELS):
+            return JsonResponse({'error': 'Invalid priority'}, status=400)
+        
+        feed = CalendarFeed.objects.create(
+            user=request.user,
+            event_type=event_type,
+            priority=priority,
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'message': 'Calendar feed created successfully',
+            'feed': _feed_to_dict(request, feed),
+        }, status=201)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        logger.error(f"Error creating calendar feed: {str(e)}")
+        return JsonResponse({'error': 'Failed to create calendar feed'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["DELETE"])
+@jwt_required
+def api_delete_feed(request, feed_id):
+    """Revoke one of the current user's calendar feeds"""
+    deleted, _ = CalendarFeed.objects.filter(id=feed_id, user=request.user).delete()
+    if not deleted:
+        return JsonResponse({'error': 'Calendar feed not found'}, status=404)
+    
+    logger.info(f"Calendar feed {feed_id} revoked by {request.user.email}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Calendar feed deleted successfully',
+    })
+
+
+def _stream_and_cache(chunks, cache_key):
+    """Yield feed chunks, caching the rendered body if it stays under the size limit"""
+    parts = []
+    size = 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= settings.ICS_FEED_CACHE_MAX_BYTES:
+                parts.append(chunk)
+            else:
+                parts = None
+        yield chunk
+    if parts is not None:
+        cache.set(cache_key, b''.join(parts), settings.ICS_FEED_CACHE_TIMEOUT)
+
+
+@require_http_methods(["GET", "HEAD"])
+def calendar_feed(request, token):
+    """Serve an iCalendar feed; authenticated by the secret token in the URL"""
+    try:
+        feed = CalendarFeed.objects.select_related('user').get(token=token)
+    except CalendarFeed.DoesNotExist:
+        raise Http404('Calendar feed not found')
+    if not feed.user.is_active:
+        raise Http404('Calendar feed not found')
+    
+    events = feed.get_events()
+    event_type = request.GET.get('event_type')
+    priority = request.GET.get('priority')
+    if event_type:
+        events = events.filter(event_type=event_type)
+    if priority:
+        events = events.filter(priority=priority)
+    
+    # Validators come from a single aggregate so unchanged polls never render the feed
+    state = events.aggregate(last_modified=Max('updated_at'), total=Count('id'))
+    last_modified = state['last_modified'] or feed.created_at
+    version = f"{feed.token}:{event_type}:{priority}:{last_modified.timestamp()}:{state['total']}"
+    digest = hashlib.sha1(version.encode()).hexdigest()
+    etag = quote_etag(digest)
+    
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    cache_key = f'schedule:ics_feed:{feed.id}:{digest}'
+    body = cache.get(cache_key)
+    content_type = 'text/calendar; charset=utf-8'
+    if body is not None:
+        response = HttpResponse(body, content_type=content_type)
+    else:
+        rows = (
+            events.order_by('assigned_date', 'start_time', 'id')
+            .values_list(*FEED_FIELDS)
+            .iterator(chunk_size=settings.ICS_FEED_CHUNK_SIZE)
+        )
+        calendar_name = 'University schedule'
+        if feed.event_type:
+            calendar_name = f"{calendar_name} ({feed.get_event_type_display()})"
+        chunks = _stream_and_cache(render_calendar(rows, calendar_name), cache_key)
+        response = StreamingHttpResponse(
+            asyncviews.streaming_content(request, chunks),
+            content_type=content_type,
+        )
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    return response
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Benchmark: sync (WSGI) against async (ASGI) workers at equal memory.
+
+For each ``WEB_PROFILE`` of ``build/gunicorn/gunicorn.conf.py``, starts
+gunicorn with one worker to measure a warm worker's resident memory, then
+with as many workers as fit in ``--memory-mb``, and runs closed-loop clients
+against the async read endpoints at increasing concurrency. Reports
+throughput, latency percentiles and failed requests; ``--slow-ratio`` makes
+some requests list events for a whole year, the slow query that ties up sync
+workers.
+
+Runs against the database in the settings; populate it first with
+``scripts/populate_db.py``. Linux only (memory is read from /proc).
+
+Usage:
+    python scripts/bench_async_views.py [--memory-mb 600] [--concurrency 10 50 200] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the project directory to Python path
+sys.path.append(BASE_DIR)
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from courses.models import Course  # noqa: E402
+from users.jwt_utils import JWTManager  # noqa: E402
+from users.models import User  # noqa: E402
+
+GUNICORN_CONFIG = os.path.join(BASE_DIR, 'build', 'gunicorn', 'gunicorn.conf.py')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _rss_mb(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+
+
+def workers_rss_mb(master_pid):
+    return sum(_rss_mb(pid) for pid in _children(master_pid))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile, workers):
+    port = _free_port()
+    env = dict(os.environ, WEB_PROFILE=profile, WEB_WORKERS=str(workers), WEB_BIND=f'127.0.0.1:{port}')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', GUNICORN_CONFIG],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while len(_children(process.pid)) < workers or not _accepting(port):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f'gunicorn ({profile}, {workers} workers) did not start')
+        time.sleep(0.1)
+    return process, port
+
+
+def _accepting(port):
+    try:
+        socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def _request(connection, port, path, token):
+    """One GET over a kept-alive connection; returns (status, connection to reuse or None)"""
+    if connection is None:
+        connection = await asyncio.open_connection('127.0.0.1', port)
+    reader, writer = connection
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n\r\n'.encode()
+    )
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').lower()
+    status = int(head.split(' ', 2)[1])
+    length = 0
+    keep_alive = True
+    for line in head.split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip() == 'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    if not keep_alive:
+        writer.close()
+        connection = None
+    return status, connection
+
+
+async def load(port, token, paths, slow_paths, slow_ratio, concurrency, duration):
+    latencies = []
+    failures = 0
+    stop_at = time.monotonic() + duration
+
+    async def client():
+        nonlocal failures
+        connection = None
+        while time.monotonic() < stop_at:
+            path = random.choice(slow_paths if random.random() < slow_ratio else paths)
+            started = time.monotonic()
+            try:
+                status, connection = await asyncio.wait_for(_request(connection, port, path, token), 30)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                failures += 1
+                connection = None
+                continue
+            if status == 200:
+                latencies.append(time.monotonic() - started)
+            else:
+                failures += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return sorted(latencies), failures
+
+
+def _percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)] * 1000 if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--memory-mb', type=int, default=600, help='Resident memory for all workers of a profile')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+    parser.add_argument('--slow-ratio', type=float, default=0.05, help='Share of requests for a whole year of events')
+    parser.add_argument('--profiles', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    user = User.objects.filter(user_role='admin', is_active=True).first()
+    if user is None:
+        sys.exit('No active admin user; run scripts/populate_db.py first')
+    token = JWTManager.generate_access_token(user)
+    course_ids = list(Course.objects.values_list('id', flat=True)[:20])
+    paths = ['/courses/', '/courses/lessons/', '/schedule/events/', '/users/profile/']
+    paths += [f'/courses/{course_id}/' for course_id in course_ids]
+    slow_paths = [f'/schedule/events/?year={time.localtime().tm_year}&per_page=1000']
+
+    print(f"Memory budget {args.memory_mb} MB per profile, {args.duration:.0f} s per level, "
+          f"{args.slow_ratio:.0%} slow requests")
+    for profile in args.profiles:
+        # Size the pool from a warm worker's memory
+        process, port = start_server(profile, 1)
+        try:
+            asyncio.run(load(port, token, paths, slow_paths, 0, 4, 2))
+            worker_mb = workers_rss_mb(process.pid)
+        finally:
+            stop_server(process)
+        workers = max(args.memory_mb // int(worker_mb), 1)
+
+        process, port = start_server(profile, workers)
+        try:
+            print(f"\n{profile}: {workers} workers of {worker_mb:.0f} MB")
+            for concurrency in args.concurrency:
+                latencies, failures = asyncio.run(
+                    load(port, token, paths, slow_paths, args.slow_ratio, concurrency, args.duration)
+                )
+                print(f"  {concurrency:>4} clients: {len(latencies) / args.duration:8.1f} req/s, "
+                      f"p50 {_percentile(latencies, 0.5):7.1f} ms, p99 {_percentile(latencies, 0.99):7.1f} ms, "
+                      f"{failures} failed, workers using {workers_rss_mb(process.pid):.0f} MB")
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark: recomputations of an expired cache key under a burst of requests.
+
+Starts ``--threads`` requests at once for a key that is not cached, each
+computing the value in ``--compute-ms`` milliseconds when it finds none.
+Compares
+
+- ``plain``: ``cache.get`` then ``cache.set``, so every request recomputes
+- ``single-flight``: ``TieredCache.get_or_compute`` (``university_core.cache``)
+
+and repeats the burst once the value has expired, when ``TieredCache`` serves
+the stale value to all but one request. Uses the cache in the settings.
+
+Usage:
+    python scripts/bench_cache_stampede.py [--threads 32] [--compute-ms 200]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+
+from university_core.cache import TieredCache  # noqa: E402
+
+
+def burst(threads, request):
+    """Run ``request`` on ``threads`` threads released together; returns the slowest request's seconds"""
+    barrier = threading.Barrier(threads)
+    latencies = []
+
+    def timed(_):
+        barrier.wait()
+        started = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(timed, range(threads)))
+    return max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--compute-ms', type=int, default=200)
+    args = parser.parse_args()
+
+    computations = []
+
+    def compute():
+        computations.append(1)
+        time.sleep(args.compute_ms / 1000)
+        return list(range(1000))
+
+    key = f'bench:stampede:{uuid.uuid4().hex}'
+
+    def plain():
+        if cache.get(key) is None:
+            cache.set(key, compute(), 60)
+
+    computations.clear()
+    slowest = burst(args.threads, plain)
+    print(f"{'plain':>16}: {len(computations):3d} computations, slowest request {slowest * 1000:6.0f} ms")
+    cache.delete(key)
+
+    tiered = TieredCache(f'bench:{uuid.uuid4().hex}', timeout=1, stale_timeout=60)
+
+    def single_flight():
+        tiered.get_or_compute('key', compute)
+
+    for label in ('single-flight', 'stale'):
+        computations.clear()
+        slowest = burst(args.threads, single_flight)
+        print(f"{label:>16}: {len(computations):3d} computations, slowest request {slowest * 1000:6.0f} ms")
+        time.sleep(1.2)  # let the value expire
+
+    print(f"TieredCache: {tiered.stats()}")
+    tiered.bump()
+
+
+if __name__ == '__main__':
+    main()
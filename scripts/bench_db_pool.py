@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark: requests per second with and without reusing database connections.
+
+Simulates requests on a number of threads: each one runs the queries of the
+course list and then ends the way Django ends a request, which closes the
+connection unless it is kept. Compares
+
+- ``connect``: a new connection per request (``CONN_MAX_AGE = 0``, the old setting)
+- ``persistent``: one connection per thread kept open (``CONN_MAX_AGE = 60``)
+- ``pool``: connections from the per-process pool (``university_core.db``)
+
+Under ASGI every request gets a new thread, so only the pool helps there;
+``--fresh-threads`` simulates that. Runs against the database in the
+settings; populate it first with ``scripts/populate_db.py``.
+
+Usage:
+    python scripts/bench_db_pool.py [--requests 2000] [--threads 8] [--pool-size 8] [--fresh-threads]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from django.db import connections  # noqa: E402
+from django.db.models import Count  # noqa: E402
+
+from courses.models import Course  # noqa: E402
+from university_core.db.base import pool_stats  # noqa: E402
+
+
+def add_database(alias, conn_max_age, pool_size):
+    database = copy.deepcopy(connections.settings['default'])
+    database['ENGINE'] = 'university_core.db'
+    database['CONN_MAX_AGE'] = conn_max_age
+    database['OPTIONS'].setdefault('pool', {})['size'] = pool_size
+    connections.settings[alias] = database
+
+
+def simulate_request(alias):
+    list(
+        Course.objects.using(alias).select_related('created_by')
+        .annotate(lesson_total=Count('lessons')).order_by('-created_at')[:20]
+    )
+    Course.objects.using(alias).count()
+    # What the request_finished signal does
+    connections[alias].close_if_unusable_or_obsolete()
+
+
+def run(alias, requests, threads, fresh_threads):
+    started = time.perf_counter()
+    if fresh_threads:
+        # One thread per request, as under ASGI; at most ``threads`` at once
+        semaphore = threading.BoundedSemaphore(threads)
+        workers = []
+
+        def request():
+            try:
+                simulate_request(alias)
+            finally:
+                connections[alias].close()
+                semaphore.release()
+
+        for _ in range(requests):
+            semaphore.acquire()
+            worker = threading.Thread(target=request)
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+    else:
+        def request(_):
+            simulate_request(alias)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(request, range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--fresh-threads', action='store_true', help='A new thread per request, as under ASGI')
+    args = parser.parse_args()
+
+    add_database('bench_connect', conn_max_age=0, pool_size=0)
+    add_database('bench_persistent', conn_max_age=60, pool_size=0)
+    add_database('bench_pool', conn_max_age=0, pool_size=args.pool_size)
+
+    print(f"{args.requests} requests on {args.threads} "
+          f"{'fresh threads' if args.fresh_threads else 'reused threads'}")
+    baseline = None
+    for mode in ('connect', 'persistent', 'pool'):
+        alias = f'bench_{mode}'
+        run(alias, min(args.requests, 50), args.threads, args.fresh_threads)  # warm up
+        rate = run(alias, args.requests, args.threads, args.fresh_threads)
+        baseline = baseline or rate
+        print(f"{mode:>10}: {rate:8.1f} requests/s ({rate / baseline:.1f}x)")
+
+    stats = pool_stats()['bench_pool']
+    print(f"Pool: {stats['opened']} connections opened for {stats['requests']} checkouts, "
+          f"{stats['waits']} waits, {stats['timeouts']} timeouts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Load test: concurrent course enrollment at registration opening.
+
+Creates temporary students and a handful of small, popular courses, then has
+many threads enroll (and occasionally drop) at the same time. Afterwards it
+checks that no course is oversold, that every course's enrolled_count matches
+its enrolled rows, and that nobody is waitlisted while a seat is free.
+Needs the configured PostgreSQL database; all test data is deleted at the end.
+
+Usage:
+    python scripts/bench_enrollment.py [--students 5000] [--courses 20] [--capacity 100] [--workers 32]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Q  # noqa: E402
+from courses.enrollment import drop, enroll  # noqa: E402
+from courses.models import Course  # noqa: E402
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'bench-enrollment-'
+
+
+def setup_data(students, courses, capacity):
+    professor = User.objects.create_user(
+        email=f'{EMAIL_PREFIX}professor@example.com', password=None,
+        first_name='Bench', last_name='Professor', user_role='professor',
+    )
+    User.objects.bulk_create([
+        User(email=f'{EMAIL_PREFIX}{i}@example.com', first_name='Bench', last_name=f'Student {i}',
+             user_role='student')
+        for i in range(students)
+    ], batch_size=1000)
+    created = Course.objects.bulk_create([
+        Course(title=f'Bench course {i}', description='Enrollment load test',
+               created_by=professor, capacity=capacity)
+        for i in range(courses)
+    ])
+    student_list = list(User.objects.filter(email__startswith=EMAIL_PREFIX, user_role='student'))
+    return professor, student_list, created
+
+
+def run_requests(requests):
+    """Run (action, course, student) requests on this thread's own connection"""
+    counts = {'enroll': 0, 'drop': 0}
+    try:
+        for action, course, student in requests:
+            if action == 'enroll':
+                enroll(course, student)
+            else:
+                drop(course, student)
+            counts[action] += 1
+    finally:
+        connection.close()
+    return counts
+
+
+def verify(courses):
+    problems = []
+    rows = Course.objects.filter(id__in=[course.id for course in courses]).annotate(
+        enrolled=Count('enrollments', filter=Q(enrollments__status='enrolled')),
+        waitlisted=Count('enrollments', filter=Q(enrollments__status='waitlisted')),
+    )
+    for course in rows:
+        if course.enrolled != course.enrolled_count:
+            problems.append(f'{course.title}: enrolled_count {course.enrolled_count} != {course.enrolled} rows')
+        if course.enrolled > course.capacity:
+            problems.append(f'{course.title}: oversold ({course.enrolled} > {course.capacity})')
+        if course.waitlisted and course.enrolled < course.capacity:
+            problems.append(f'{course.title}: {course.waitlisted} waitlisted with free seats')
+    return rows, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--capacity', type=int, default=100)
+    parser.add_argument('--per-student', type=int, default=3, help='Courses each student requests')
+    parser.add_argument('--drop-ratio', type=float, default=0.05, help='Share of requests followed by a drop')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+    professor, students, courses = setup_data(args.students, args.courses, args.capacity)
+
+    try:
+        # Skewed demand: the first courses are far more popular than the rest
+        weights = [1 / (index + 1) for index in range(len(courses))]
+        requests = []
+        for student in students:
+            for course in set(random.choices(courses, weights=weights, k=args.per_student)):
+                requests.append(('enroll', course, student))
+                if random.random() < args.drop_ratio:
+                    requests.append(('drop', course, student))
+        chunks = [requests[index::args.workers] for index in range(args.workers)]
+
+        print(f"{len(students)} students, {len(courses)} courses x {args.capacity} seats, "
+              f"{len(requests)} requests on {args.workers} threads")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_requests, chunks))
+        elapsed = time.perf_counter() - started
+
+        enrolls = sum(result['enroll'] for result in results)
+        drops = sum(result['drop'] for result in results)
+        print(f"{enrolls} enroll and {drops} drop requests in {elapsed:.2f}s "
+              f"({(enrolls + drops) / elapsed:,.0f} requests/s)")
+
+        rows, problems = verify(courses)
+        seats = sum(course.capacity for course in rows)
+        print(f"Seats filled: {sum(course.enrolled for course in rows)}/{seats}, "
+              f"waitlisted: {sum(course.waitlisted for course in rows)}")
+        if problems:
+            print('FAILED:')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(1)
+        print('OK: no course oversold, counters match enrollment rows')
+    finally:
+        Course.objects.filter(created_by=professor).delete()
+        User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+
+
+if __name__ == '__main__':
+    main()
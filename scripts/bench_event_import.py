@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Benchmark: bulk event import throughput in rows per second.
+
+Generates a CSV (and an equivalent ICS) file in memory and measures parsing
+plus batch validation. With --insert the rows are also written with
+bulk_create inside a transaction that is rolled back afterwards, which needs
+the configured database.
+
+Usage:
+    python scripts/bench_event_import.py [--rows 50000] [--insert]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+from schedule.importers import parse_csv, parse_ics, import_events  # noqa: E402
+
+User = get_user_model()
+
+EVENT_TYPES = ['lecture', 'exam', 'assignment', 'meeting', 'deadline', 'other']
+PRIORITIES = ['low', 'medium', 'high', 'urgent']
+
+
+class Rollback(Exception):
+    pass
+
+
+def generate_csv(rows):
+    lines = ['title,assigned_date,start_time,end_time,event_type,priority,location']
+    start = date(2026, 9, 1)
+    for i in range(rows):
+        hour = random.randint(8, 17)
+        lines.append(
+            f'Lecture {i},{start + timedelta(days=i % 120)},{hour:02d}:00,{hour + 1:02d}:30,'
+            f'{random.choice(EVENT_TYPES)},{random.choice(PRIORITIES)},Room {i % 80}'
+        )
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def generate_ics(rows):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    start = date(2026, 9, 1)
+    for i in range(rows):
+        day = (start + timedelta(days=i % 120)).strftime('%Y%m%d')
+        hour = random.randint(8, 17)
+        lines += [
+            'BEGIN:VEVENT',
+            f'SUMMARY:Lecture {i}',
+            f'DTSTART:{day}T{hour:02d}0000Z',
+            f'DTEND:{day}T{hour + 1:02d}3000Z',
+            f'CATEGORIES:{random.choice(EVENT_TYPES).upper()}',
+            f'LOCATION:Room {i % 80}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def measure(label, parser, data, creator, insert):
+    started = time.perf_counter()
+    if insert:
+        try:
+            with transaction.atomic():
+                result = import_events(parser(io.BytesIO(data)), creator)
+                raise Rollback
+        except Rollback:
+            pass
+    else:
+        result = import_events(parser(io.BytesIO(data)), creator, dry_run=True)
+    elapsed = time.perf_counter() - started
+    rate = result['total_rows'] / elapsed
+    print(f"{label:<6} {result['total_rows']:>8} rows {elapsed:>8.2f}s {rate:>12,.0f} rows/s "
+          f"({result['imported']} valid, {result['failed']} invalid)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--insert', action='store_true', help='Also insert rows (rolled back afterwards)')
+    args = parser.parse_args()
+
+    creator = User.objects.filter(user_role__in=['admin', 'professor']).first() if args.insert else User(id=1)
+    if creator is None:
+        print('No admin or professor user found; run scripts/populate_db.py first')
+        return
+
+    mode = 'parse + validate + bulk_create' if args.insert else 'parse + validate'
+    print(f"Importing {args.rows} rows ({mode})")
+    measure('csv', parse_csv, generate_csv(args.rows), creator, args.insert)
+    measure('ics', parse_ics, generate_ics(args.rows), creator, args.insert)
+
+
+if __name__ == '__main__':
+    main()
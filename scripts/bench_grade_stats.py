@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark: gradebook statistics for a large course.
+
+Generates (event_id, student_id, score, max_score) rows shaped like the
+``values_list`` the statistics endpoint loads and times ``grade_statistics``.
+No database queries are made.
+
+Usage:
+    python scripts/bench_grade_stats.py [--students 5000] [--events 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from courses.gradebook import grade_statistics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--missing', type=float, default=0.05, help='Share of ungraded submissions')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    events, students = np.meshgrid(np.arange(1, args.events + 1), np.arange(1, args.students + 1))
+    keep = rng.random(events.shape) >= args.missing
+    max_scores = np.where(events % 2, 100.0, 20.0)
+    scores = np.clip(rng.normal(0.7, 0.15, events.shape), 0, 1) * max_scores
+    rows = list(zip(events[keep].tolist(), students[keep].tolist(), scores[keep].tolist(), max_scores[keep].tolist()))
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        stats = grade_statistics(rows)
+        timings.append(time.perf_counter() - started)
+
+    print(f"{len(rows)} grades: {args.students} students x {args.events} events")
+    print(f"grade_statistics: best {min(timings) * 1000:.1f} ms, "
+          f"median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms over {args.repeat} runs")
+    print(f"Course average: {stats['course']['mean']}%, median {stats['course']['median']}%")
+
+
+if __name__ == '__main__':
+    main()
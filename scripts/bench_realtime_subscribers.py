@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark: idle server-sent-event subscribers held by one worker.
+
+Opens N in-process subscribers on the change stream (no sockets, so only the
+worker-side cost is measured), reports the memory used per idle subscriber
+and how long one notification takes to reach all of them.
+
+Usage:
+    python scripts/bench_realtime_subscribers.py [--counts 1000 5000 20000] [--memory-mb 512]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from realtime.asgi import stream_changes  # noqa: E402
+from realtime.broker import ChangeBroker, Subscription  # noqa: E402
+import realtime.asgi  # noqa: E402
+
+
+async def run(count):
+    loop = asyncio.get_running_loop()
+    bench_broker = ChangeBroker('bench')
+    realtime.asgi.broker = bench_broker  # keep the benchmark off the real channel
+    delivered = 0
+    all_delivered = asyncio.Event()
+    never = loop.create_future()
+
+    async def receive():
+        await never
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal delivered
+        if message.get('body', b'').startswith(b'event:'):
+            delivered += 1
+            if delivered == count:
+                all_delivered.set()
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tasks = []
+    for _ in range(count):
+        subscription = bench_broker.subscribe(Subscription(
+            loop, asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+        ))
+        tasks.append(asyncio.create_task(stream_changes(subscription, receive, send)))
+    await asyncio.sleep(0.1)  # let every stream reach its idle wait
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - baseline) / count
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    payload = '{"topic":"event","action":"updated","id":1}'
+    # Publish from another thread, the way the LISTEN thread does
+    threading.Thread(target=bench_broker.dispatch, args=(payload,)).start()
+    await all_delivered.wait()
+    fan_out = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return per_subscriber, fan_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--memory-mb', type=int, default=512, help='Memory budget of one worker')
+    args = parser.parse_args()
+    settings.REALTIME_USE_PG_NOTIFY = False  # measure local fan-out only
+
+    print(f"{'subscribers':>12} {'bytes/sub':>10} {'fan-out ms':>11} {'max in budget':>14}")
+    for count in args.counts:
+        per_subscriber, fan_out = asyncio.run(run(count))
+        capacity = int(args.memory_mb * 1024 * 1024 / per_subscriber)
+        print(f"{count:>12} {per_subscriber:>10.0f} {fan_out * 1000:>11.1f} {capacity:>14,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark: term utilisation analytics over synthetic event tuples.
+
+Generates rows shaped like the ``values_list`` output of
+``schedule.analytics.load_term_rows`` and times ``compute_utilisation``.
+No database is needed.
+
+Usage:
+    python scripts/bench_utilisation.py [--events 100000] [--rooms 150]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time as timer
+from datetime import date, time, timedelta
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
+import django  # noqa: E402
+django.setup()
+
+from schedule.analytics import compute_utilisation  # noqa: E402
+
+EVENT_TYPES = ['lecture', 'exam', 'assignment', 'meeting', 'deadline', 'other']
+
+
+def generate_rows(events, rooms, term_start, term_days):
+    rows = []
+    for _ in range(events):
+        hour = random.randint(8, 18)
+        minute = random.choice([0, 15, 30, 45])
+        length = random.choice([45, 60, 90, 120])
+        end = min(hour * 60 + minute + length, 23 * 60 + 59)
+        rows.append((
+            term_start + timedelta(days=random.randrange(term_days)),
+            time(hour, minute),
+            time(end // 60, end % 60),
+            f'Room {random.randrange(rooms)}' if random.random() > 0.02 else None,
+            random.choice(EVENT_TYPES),
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--rooms', type=int, default=150)
+    parser.add_argument('--slot-minutes', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    term_start, term_end = date(2026, 8, 1), date(2027, 2, 1)
+    rows = generate_rows(args.events, args.rooms, term_start, (term_end - term_start).days)
+
+    timings = []
+    for _ in range(args.repeat):
+        started = timer.perf_counter()
+        result = compute_utilisation(rows, term_start, term_end, 8 * 60, 20 * 60, args.slot_minutes)
+        timings.append(timer.perf_counter() - started)
+
+    print(f"Events: {args.events}, rooms: {len(result['rooms'])}, weeks: {len(result['weeks'])}, "
+          f"slots/day: {len(result['slots'])}")
+    print(f"compute_utilisation: best {min(timings) * 1000:.1f} ms, "
+          f"median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms over {args.repeat} runs")
+    print(f"Room utilisation percentiles: {result['percentiles']['room_utilisation']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,9 @@
 ASGI config for university_core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to ``REALTIME_PATH`` are served by the server-sent events app in
+``realtime.asgi`` and upload chunks by the streaming app in
+``mediastore.asgi``; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'university_core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from mediastore.asgi import CHUNK_PATH_RE, chunk_application  # noqa: E402
+from realtime.asgi import sse_application  # noqa: E402
+
+REALTIME_PATH = '/realtime/stream/'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == REALTIME_PATH:
+        await sse_application(scope, receive, send)
+    elif scope['type'] == 'http' and CHUNK_PATH_RE.match(scope['path']):
+        await chunk_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,90 @@
+"""
+Helpers for ``async def`` views.
+
+Django 4.2's ``csrf_exempt`` and ``require_http_methods`` wrap a view in a
+sync function, which turns an async view back into a sync one that returns
+an unawaited coroutine. The versions here keep async views async and leave
+sync views to Django's. ``apaginate`` is ``Paginator.get_page`` with the
+count and the page fetched in one trip to a database thread.
+
+Under ASGI, Django 4.2 reads a sync ``StreamingHttpResponse`` iterator to
+the end before sending anything. ``streaming_content`` turns one into an
+async iterator there, so large bodies are still sent chunk by chunk.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.http import HttpResponseNotAllowed
+from django.utils.log import log_response
+from django.views.decorators import csrf, http
+
+
+def csrf_exempt(view_func):
+    if not asyncio.iscoroutinefunction(view_func):
+        return csrf.csrf_exempt(view_func)
+
+    @wraps(view_func)
+    async def wrapper_view(*args, **kwargs):
+        return await view_func(*args, **kwargs)
+
+    wrapper_view.csrf_exempt = True
+    return wrapper_view
+
+
+def require_http_methods(request_method_list):
+    def decorator(func):
+        if not asyncio.iscoroutinefunction(func):
+            return http.require_http_methods(request_method_list)(func)
+
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                response = HttpResponseNotAllowed(request_method_list)
+                log_response(
+                    "Method Not Allowed (%s): %s",
+                    request.method,
+                    request.path,
+                    response=response,
+                    request=request,
+                )
+                return response
+            return await func(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
+
+
+def _get_page(queryset, number, per_page):
+    page = Paginator(queryset, per_page).get_page(number)
+    # get_page has counted the rows already; load the page's rows too
+    page.object_list = list(page.object_list)
+    return page
+
+
+async def apaginate(queryset, number, per_page):
+    """``Paginator(queryset, per_page).get_page(number)`` with the rows loaded"""
+    return await sync_to_async(_get_page)(queryset, number, per_page)
+
+
+async def _aiterate(chunks):
+    iterator = iter(chunks)
+    done = object()
+    # Thread-sensitive, so every chunk is read on the thread that owns the cursor or file
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(iterator, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def streaming_content(request, chunks):
+    """``chunks`` for a ``StreamingHttpResponse``, as an async iterator when ``request`` came in over ASGI"""
+    if isinstance(request, ASGIRequest):
+        return _aiterate(chunks)
+    return chunks
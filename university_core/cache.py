@@ -0,0 +1,228 @@
+"""
+Two-tier cache for hot, expensive read results.
+
+``TieredCache`` keeps recently used values in a small in-process LRU (L1)
+in front of Django's default cache (L2), which all processes share: Redis,
+or files on the host as a local stand-in. ``get_or_compute``
+
+- returns a fresh value from L1, else from L2;
+- when the value has expired, lets one caller across all processes
+  recompute it (single flight: a thread per process, and a short lock in
+  L2 across processes) while the others serve the stale value, or wait for
+  the new one when there is none;
+- stores values with a jittered timeout, so keys written together do not
+  expire together.
+
+Writes invalidate a whole cache with ``bump()``. Keys include the cache's
+version, which is read from L2 on every lookup so all processes see a bump
+at once; values are computed from the primary database, never a replica
+that may not have the write yet. Counters of every cache are reported by
+``cache_stats()``.
+"""
+import collections
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+from .db.routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+# Seconds between looks at L2 while another process recomputes
+WAIT_POLL_INTERVAL = 0.05
+
+_caches = {}
+
+
+class LRUCache:
+    """Thread-safe mapping that forgets the least recently used keys beyond ``max_entries``"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    def __init__(self, name, timeout, stale_timeout=None, max_entries=None):
+        """
+        Values are fresh for ``timeout`` seconds (give or take the jitter)
+        and may be served stale during a recompute for ``stale_timeout``
+        seconds after that, ``timeout`` by default.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.stale_timeout = timeout if stale_timeout is None else stale_timeout
+        self.l1 = LRUCache(max_entries or settings.CACHE_L1_MAX_ENTRIES)
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._counters_lock = threading.Lock()
+        _caches[name] = self
+
+    def _count(self, counter):
+        with self._counters_lock:
+            self._counters[counter] += 1
+
+    @property
+    def _version_key(self):
+        return f'tiered:{self.name}:version'
+
+    def _version(self):
+        version = shared_cache.get(self._version_key)
+        if version is None:
+            # One thread per process sets it: the file cache's add() is not atomic
+            with self._flights_lock:
+                # Never restart from a number used before the key was evicted
+                shared_cache.add(self._version_key, time.time_ns(), None)
+                version = shared_cache.get(self._version_key)
+        return version
+
+    def bump(self):
+        """Invalidate every value of this cache, in all processes"""
+        try:
+            shared_cache.incr(self._version_key)
+        except ValueError:
+            shared_cache.set(self._version_key, time.time_ns(), None)
+        self.l1.clear()
+
+    def _fresh(self, full_key, count=True):
+        """The (value, fresh_until) entry from L1 or L2 if fresh, else the freshest stale one or None"""
+        now = time.time()
+        entry = self.l1.get(full_key)
+        if entry is not None and now < entry[1]:
+            if count:
+                self._count('l1_hits')
+            return entry, True
+        shared = shared_cache.get(full_key)
+        if shared is not None and now < shared[1]:
+            self.l1.set(full_key, shared)
+            if count:
+                self._count('l2_hits')
+            return shared, True
+        candidates = [
+            e for e in (entry, shared) if e is not None and now < e[1] + self.stale_timeout
+        ]
+        return max(candidates, key=lambda e: e[1], default=None), False
+
+    def get_or_compute(self, key, compute):
+        """The cached value of ``key``, computing it with ``compute()`` when there is none"""
+        full_key = f'tiered:{self.name}:{self._version()}:{key}'
+        entry, fresh = self._fresh(full_key)
+        if fresh:
+            return entry[0]
+        self._count('misses')
+
+        with self._flights_lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = threading.Event()
+        if not leader:
+            return self._follow(full_key, compute, entry, flight)
+        try:
+            return self._lead(full_key, compute, entry)
+        finally:
+            with self._flights_lock:
+                del self._flights[full_key]
+            flight.set()
+
+    async def aget_or_compute(self, key, compute):
+        """``get_or_compute`` for async views; ``compute`` runs on a thread and may use the ORM"""
+        return await sync_to_async(self.get_or_compute)(key, compute)
+
+    def _lead(self, full_key, compute, stale):
+        lock_key = f'{full_key}:lock'
+        if not shared_cache.add(lock_key, 1, settings.CACHE_RECOMPUTE_LOCK_TIMEOUT):
+            # Another process is recomputing
+            return self._follow(full_key, compute, stale, None)
+        try:
+            return self._compute(full_key, compute)
+        finally:
+            shared_cache.delete(lock_key)
+
+    def _follow(self, full_key, compute, stale, flight):
+        if stale is not None:
+            self._count('stale')
+            return stale[0]
+
+        self._count('waits')
+        deadline = time.monotonic() + settings.CACHE_RECOMPUTE_WAIT_TIMEOUT
+        while (remaining := deadline - time.monotonic()) > 0:
+            if flight is not None:
+                flight.wait(remaining)
+            else:
+                time.sleep(min(WAIT_POLL_INTERVAL, remaining))
+            entry, fresh = self._fresh(full_key, count=False)
+            if fresh:
+                return entry[0]
+            if flight is not None and flight.is_set():
+                # The recompute in this process failed
+                break
+        else:
+            self._count('wait_timeouts')
+            logger.warning(f"Gave up waiting for {full_key} to be recomputed, computing it again")
+        return self._compute(full_key, compute)
+
+    def _compute(self, full_key, compute):
+        self._count('recomputes')
+        try:
+            with primary_reads():
+                value = compute()
+        except Exception:
+            self._count('errors')
+            raise
+        jitter = settings.CACHE_TTL_JITTER
+        timeout = self.timeout * random.uniform(1 - jitter, 1 + jitter)
+        entry = (value, time.time() + timeout)
+        shared_cache.set(full_key, entry, timeout + self.stale_timeout)
+        self.l1.set(full_key, entry)
+        return value
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters.get('l1_hits', 0) + counters.get('l2_hits', 0) + counters.get('misses', 0)
+        return {
+            'l1_entries': len(self.l1),
+            'l1_hits': counters.get('l1_hits', 0),
+            'l2_hits': counters.get('l2_hits', 0),
+            'misses': counters.get('misses', 0),
+            'stale': counters.get('stale', 0),
+            'waits': counters.get('waits', 0),
+            'wait_timeouts': counters.get('wait_timeouts', 0),
+            'recomputes': counters.get('recomputes', 0),
+            'errors': counters.get('errors', 0),
+            'hit_ratio': round(1 - counters.get('misses', 0) / lookups, 3) if lookups else None,
+        }
+
+
+def cache_stats():
+    """Counters of every ``TieredCache`` in this process, by name"""
+    return {name: tiered.stats() for name, tiered in _caches.items()}
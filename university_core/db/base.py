@@ -0,0 +1,118 @@
+"""
+Django's PostgreSQL backend taking its connections from a ``ConnectionPool``.
+
+The pool is configured in ``OPTIONS['pool']``::
+
+    'OPTIONS': {'pool': {'size': 10, 'timeout': 10, 'max_lifetime': 1800, 'check_after': 30}}
+
+``size`` connections at most are open per process; a request waits up to
+``timeout`` seconds for a free one. Without the option, or with a size of 0,
+this is the plain PostgreSQL backend. Keep ``CONN_MAX_AGE`` at 0 with the
+pool: "closing" a connection at the end of a request returns it to the pool.
+"""
+import atexit
+import os
+import threading
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+from .pool import ConnectionPool, PoolTimeout
+
+# Pools by (database alias, process id), so a forked worker never shares its parent's
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(alias, options):
+    if not options or not options.get('size') or alias == NO_DB_ALIAS:
+        return None
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                size=options['size'],
+                timeout=options.get('timeout', 10),
+                max_lifetime=options.get('max_lifetime', 30 * 60),
+                check_after=options.get('check_after', 30),
+            )
+        return _pools[key]
+
+
+def pool_stats():
+    """Statistics of this process's connection pools, by database alias"""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(alias, pool) for (alias, owner), pool in _pools.items() if owner == pid]
+    return {alias: pool.stats() for alias, pool in pools}
+
+
+def close_idle_connections():
+    """Close the idle pooled connections of this process"""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for (_, owner), pool in _pools.items() if owner == pid]
+    for pool in pools:
+        pool.close_idle()
+
+
+atexit.register(close_idle_connections)
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use
+        close_idle_connections()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = _get_pool(self.alias, self.settings_dict['OPTIONS'].get('pool'))
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        # Set as the parent does for new connections; pooled ones keep their level
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        try:
+            connection = pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+        self._pool = pool
+        return connection
+
+    def _is_reusable(self):
+        """Whether the connection can go back to the pool, rolling back a transaction left open"""
+        connection = self.connection
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                return False
+        return not self.errors_occurred or self.is_usable()
+
+    def _close(self):
+        if self._pool is None or self.connection is None:
+            return super()._close()
+        pool, self._pool = self._pool, None
+        with self.wrap_database_errors:
+            pool.putconn(self.connection, reusable=self._is_reusable())
@@ -0,0 +1,161 @@
+"""
+A small thread-safe pool of database connections.
+
+Django 4.2 opens a connection per thread and, with ``CONN_MAX_AGE = 0``,
+closes it at the end of every request. Under ASGI each request runs its
+queries on a thread of its own, so persistent connections cannot help
+there either. ``ConnectionPool`` keeps up to ``size`` connections open for
+the whole process; ``base.DatabaseWrapper`` takes one from it instead of
+connecting and hands it back instead of closing.
+
+A connection idle for longer than ``check_after`` seconds is checked with a
+``SELECT 1`` before it is handed out, connections older than
+``max_lifetime`` are replaced, and broken ones are dropped.
+"""
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, size, timeout, max_lifetime, check_after):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        # Idle connections as (connection, opened_at, returned_at), most recently returned last
+        self._idle = collections.deque()
+        self._opened_at = {}
+        self._open = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._counters = collections.Counter()
+        self._wait_seconds = 0.0
+
+    def _close(self, connection, reason):
+        with self._condition:
+            self._counters[f'closed_{reason}'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Ends the transaction the query began outside autocommit
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, connect):
+        """Take an idle connection, or open one with ``connect()`` while under ``size``"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            self._counters['requests'] += 1
+        while True:
+            with self._condition:
+                waited = False
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection free after {self.timeout}s ({self.size} in use)'
+                        )
+                    if not waited:
+                        self._counters['waits'] += 1
+                        waited = True
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                self._wait_seconds += time.monotonic() - started
+                if self._idle:
+                    connection, opened_at, returned_at = self._idle.pop()
+                else:
+                    connection = None
+                    self._open += 1
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._condition:
+                    self._counters['opened'] += 1
+                self._opened_at[id(connection)] = time.monotonic()
+                return connection
+
+            now = time.monotonic()
+            if now - opened_at >= self.max_lifetime:
+                self._discard(connection, 'expired')
+            elif now - returned_at >= self.check_after and not self._is_healthy(connection):
+                logger.warning("Dropped a broken pooled database connection")
+                self._discard(connection, 'broken')
+            else:
+                self._opened_at[id(connection)] = opened_at
+                return connection
+            # Try again with the slot freed
+            started = time.monotonic()
+
+    def putconn(self, connection, reusable=True):
+        """Return a connection taken with ``getconn``; it is closed unless ``reusable``"""
+        opened_at = self._opened_at.pop(id(connection), None)
+        if opened_at is None:
+            # Not taken from this pool
+            self._close(connection, 'foreign')
+            return
+        if not reusable or connection.closed:
+            self._discard(connection, 'broken')
+            return
+        with self._condition:
+            self._idle.append((connection, opened_at, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection, reason):
+        self._close(connection, reason)
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close every idle connection, e.g. when the process shuts down"""
+        with self._condition:
+            idle, self._idle = list(self._idle), collections.deque()
+        for connection, _, _ in idle:
+            self._discard(connection, 'idle')
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'waiting': self._waiting,
+                'requests': self._counters['requests'],
+                'waits': self._counters['waits'],
+                'wait_seconds_total': round(self._wait_seconds, 3),
+                'timeouts': self._counters['timeouts'],
+                'opened': self._counters['opened'],
+                'closed': {
+                    reason[len('closed_'):]: count
+                    for reason, count in self._counters.items() if reason.startswith('closed_')
+                },
+            }
@@ -0,0 +1,231 @@
+"""
+Read replica routing.
+
+``university_core.middleware.ReplicaMiddleware`` lets the reads of GET and
+HEAD requests go to a read replica; everything else, and all code outside
+requests (jobs, commands), uses ``default``. A request that writes switches its remaining reads to the
+primary and sets a cookie that keeps the client's reads there for
+``DB_REPLICA_STICKY_SECONDS``, so users see their own changes at once.
+
+A background thread per process checks the replicas' lag every
+``DB_REPLICA_CHECK_INTERVAL`` seconds, giving each ``DB_REPLICA_CHECK_TIMEOUT``
+seconds to connect and answer, so requests never wait on a replica that is
+down. One lagging by more than ``DB_REPLICA_MAX_LAG_SECONDS`` or not answering
+is skipped until a later check finds it caught up. Until the first check, or
+when checks stop coming in, replicas are not used. With no usable replica,
+reads go to the primary.
+
+Results cached under a version that writes bump must be computed inside
+``primary_reads()``: a lagging replica would otherwise store pre-write data
+under the post-write version, where even the writer would read it.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds since the last replayed transaction, or 0 when all received WAL is replayed
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RequestRouting:
+    """Routing state of the current request"""
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_routing = contextvars.ContextVar('db_routing', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class ReplicaMonitor:
+    """Lag of each replica as last checked by a background thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._checked_at = None
+        self._status = {}
+        self._stopped = threading.Event()
+
+    def _connect(self, alias):
+        # A connection of its own, outside the pool, that gives up quickly
+        connection = connections.create_connection(alias)
+        options = {**connection.settings_dict['OPTIONS']}
+        options.pop('pool', None)
+        if connection.vendor == 'postgresql':
+            timeout = settings.DB_REPLICA_CHECK_TIMEOUT
+            options['connect_timeout'] = max(int(timeout), 1)
+            options['options'] = f"{options.get('options', '')} -c statement_timeout={int(timeout * 1000)}".strip()
+        connection.settings_dict = {**connection.settings_dict, 'OPTIONS': options}
+        return connection
+
+    def _measure(self, alias):
+        connection = self._connect(alias)
+        try:
+            if connection.vendor != 'postgresql':
+                return 0.0
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                return float(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"Replica {alias} could not be checked: {str(e)}")
+            return None
+        finally:
+            connection.close()
+
+    def refresh(self):
+        status = {}
+        for alias in replica_aliases():
+            lag = self._measure(alias)
+            usable = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+            if usable != self._status.get(alias, {}).get('usable', True):
+                log = logger.info if usable else logger.warning
+                log(f"Replica {alias} {'back in use' if usable else 'skipped'} (lag {lag})")
+            status[alias] = {'lag_seconds': lag, 'usable': usable}
+        self._status = status
+        self._checked_at = time.monotonic()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Replica check failed: {str(e)}", exc_info=True)
+            self._stopped.wait(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    def stop(self):
+        """Stop the checking thread of this process"""
+        self._stopped.set()
+
+    def _start(self):
+        """Start the checking thread of this process; a forked worker starts its own"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._checked_at = None
+            self._status = {}
+            threading.Thread(target=self._run, name='replica-monitor', daemon=True).start()
+
+    def usable(self):
+        if self._pid != os.getpid():
+            if not replica_aliases():
+                return []
+            self._start()
+        checked_at = self._checked_at
+        max_age = 2 * settings.DB_REPLICA_CHECK_INTERVAL + len(self._status) * 2 * settings.DB_REPLICA_CHECK_TIMEOUT
+        if checked_at is None or time.monotonic() - checked_at > max_age:
+            # Not checked yet, or the checks are stuck: lag is unknown
+            return []
+        return [alias for alias, status in self._status.items() if status['usable']]
+
+    def status(self):
+        return dict(self._status)
+
+
+monitor = ReplicaMonitor()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction must see its writes
+            return DEFAULT_DB_ALIAS
+        replicas = monitor.usable()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def start_request(request):
+    """Route the reads of ``request``; returns the token for ``finish_request``"""
+    use_replica = (
+        request.method in ('GET', 'HEAD')
+        and settings.DB_REPLICA_STICKY_COOKIE not in request.COOKIES
+    )
+    return _routing.set(RequestRouting(use_replica))
+
+
+def finish_request(token, request, response):
+    """Keep the client on the primary for a while if the request wrote"""
+    routing = _routing.get()
+    _routing.reset(token)
+    if routing.wrote or request.method not in SAFE_METHODS:
+        response.set_cookie(
+            settings.DB_REPLICA_STICKY_COOKIE, '1',
+            max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+        )
+    return response
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Send the reads in this block to the primary"""
+    routing = _routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+    routing.use_replica = False
+    try:
+        yield
+    finally:
+        routing.use_replica = True
+
+
+def use_primary(view_func):
+    """Read from the primary in this view, e.g. where replica lag could skip rows for good"""
+    def route_to_primary():
+        routing = _routing.get()
+        if routing is not None:
+            routing.use_replica = False
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            route_to_primary()
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        route_to_primary()
+        return view_func(request, *args, **kwargs)
+    return wrapper
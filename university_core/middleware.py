@@ -0,0 +1,59 @@
+"""
+Project middleware, all of it usable as sync and async middleware.
+
+WhiteNoise 6.6 is sync-only. Under ASGI, Django would run it, and with it
+every request, in a thread that is held until the async view finishes.
+``AsyncWhiteNoiseMiddleware`` looks the path up in memory on the event loop
+and only moves to a thread to open a static file.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .db.routers import finish_request, start_request
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """Lets safe requests read from replicas; see ``university_core.db.routers``"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = start_request(request)
+        return finish_request(token, request, self.get_response(request))
+
+    async def __acall__(self, request):
+        token = start_request(request)
+        return finish_request(token, request, await self.get_response(request))
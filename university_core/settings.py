@@ -1,6 +1,6 @@
 import os
 
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,11 +25,15 @@ INSTALLED_APPS = [
     'users',
     'courses',
     'schedule',
+    'realtime',
+    'mediastore',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'university_core.middleware.AsyncWhiteNoiseMiddleware',
+    'university_core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,23 +63,127 @@ TEMPLATES = [
 ]
 
 # Database Configuration
+# Connections come from a per-process pool (see university_core/db); DB_POOL_SIZE=0 turns it off
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=10, cast=int)  # connections per process at most
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'university_core.db',
         'NAME': config('DB_NAME', default=os.environ.get('DB_NAME', 'default_db')),
         'USER': config('DB_USER', default=os.environ.get('DB_USER', 'default_user')),
         'PASSWORD': config('DB_PASSWORD', default=os.environ.get('DB_PASSWORD', 'default_password')),
         'HOST': config('DB_HOST', default=os.environ.get('DB_HOST', 'localhost')),
         'PORT': config('DB_PORT', default=os.environ.get('DB_PORT', 5432)),
+        # Without the pool, keep each thread's connection open between requests (WSGI only:
+        # under ASGI every request has a thread of its own)
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'size': DB_POOL_SIZE,
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds to wait for a free connection
+                'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=30 * 60, cast=int),  # then reconnected
+                'check_after': config('DB_POOL_CHECK_AFTER', default=30, cast=int),  # idle seconds before a SELECT 1
+            },
+        },
     }
 }
 
+# Read replicas (see university_core/db/routers.py): GET requests read from them
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())  # host or host:port, comma-separated
+for number, replica_host in enumerate(DB_REPLICA_HOSTS, start=1):
+    replica_host, _, replica_port = replica_host.partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['university_core.db.routers.ReplicaRouter']
+DB_REPLICA_MAX_LAG_SECONDS = config('DB_REPLICA_MAX_LAG_SECONDS', default=2, cast=float)  # lagging replicas are skipped
+DB_REPLICA_CHECK_INTERVAL = 5  # seconds between lag checks, per process
+DB_REPLICA_CHECK_TIMEOUT = 2  # seconds a replica has to accept the check's connection and answer it
+DB_REPLICA_STICKY_COOKIE = 'db_primary'
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)  # reads stay on the primary after a write
+
+# Cache: Redis shared by all processes, or files on this host without CACHE_REDIS_URL
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=os.path.join(BASE_DIR, '.cache', 'django')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# Two-tier caches with single-flight recomputation (see university_core/cache.py)
+CACHE_L1_MAX_ENTRIES = 1000  # in-process LRU entries per cache
+CACHE_TTL_JITTER = 0.1  # timeouts vary by up to 10% so entries written together expire apart
+CACHE_RECOMPUTE_LOCK_TIMEOUT = 30  # the lock of a recompute that never finished expires after this
+CACHE_RECOMPUTE_WAIT_TIMEOUT = 5  # seconds a request without a stale value waits for a recompute
+COURSE_CATALOG_CACHE_TIMEOUT = config('COURSE_CATALOG_CACHE_TIMEOUT', default=60, cast=int)
+
 # JWT Settings
 JWT_SECRET_KEY = config('SECRET_KEY', default=SECRET_KEY)
 JWT_ALGORITHM = 'HS256'
 JWT_ACCESS_TOKEN_LIFETIME = 60 * 60  # 1 hour in seconds
 JWT_REFRESH_TOKEN_LIFETIME = 24 * 60 * 60  # 1 day in seconds
 
+# iCalendar feed settings
+ICS_UID_DOMAIN = config('ICS_UID_DOMAIN', default='university-core')
+ICS_FEED_CHUNK_SIZE = 500  # rows fetched per server-side cursor round trip
+ICS_FEED_CACHE_TIMEOUT = 60 * 60  # 1 hour in seconds
+ICS_FEED_CACHE_MAX_BYTES = 2 * 1024 * 1024  # larger feeds are streamed without caching
+
+# Event delta sync settings
+EVENT_SYNC_PAGE_SIZE = 500
+EVENT_SYNC_OVERLAP_SECONDS = 5  # changes are held back this long, for clock differences between web servers
+EVENT_TOMBSTONE_RETENTION_DAYS = 30
+
+# Event table partitioning (PostgreSQL)
+EVENT_PARTITION_PERIOD = config('EVENT_PARTITION_PERIOD', default='term')  # 'term' or 'year'
+EVENT_PARTITIONS_AHEAD = 2  # upcoming periods created by partition_events
+ACADEMIC_TERM_STARTS = [(2, 1), (8, 1)]  # (month, day) on which each term starts
+
+# Agenda settings
+AGENDA_DEFAULT_LIMIT = 10
+AGENDA_MAX_LIMIT = 50
+AGENDA_CACHE_TIMEOUT = 5 * 60  # upper bound; entries also expire when the next event ends
+
+# Timetable generator settings
+TIMETABLE_DEFAULT_TIME_BUDGET = 5  # seconds of local search
+TIMETABLE_MAX_TIME_BUDGET = 30
+TIMETABLE_PREVIEW_TIMEOUT = 60 * 60  # previews can be committed for 1 hour
+
+# Utilisation analytics settings
+UTILISATION_DAY_START = '08:00'
+UTILISATION_DAY_END = '20:00'
+UTILISATION_SLOT_MINUTES = 60
+UTILISATION_WEEKDAYS = 5  # Monday to Friday
+UTILISATION_CACHE_TIMEOUT = 60 * 60  # entries are also invalidated by any event write
+
+# Gradebook settings
+GRADE_UPLOAD_BATCH_SIZE = 1000
+GRADE_HISTOGRAM_BINS = 10  # buckets of the 0-100% range
+GRADE_STATS_CACHE_TIMEOUT = 24 * 60 * 60  # entries are also invalidated by any grade write
+
+# Bulk event import settings
+EVENT_IMPORT_BATCH_SIZE = 1000  # rows validated and inserted per bulk_create
+EVENT_IMPORT_MAX_REPORTED_ERRORS = 1000
+EVENT_IMPORT_UPLOAD_DIR = 'imports'  # storage folder of uploads imported in the background
+
+# Real-time change notifications (server-sent events, ASGI only)
+REALTIME_CHANNEL = 'university_changes'
+REALTIME_USE_PG_NOTIFY = config('REALTIME_USE_PG_NOTIFY', default=True, cast=bool)
+REALTIME_QUEUE_SIZE = 100  # per-subscriber backlog before the client is told to resync
+REALTIME_HEARTBEAT_SECONDS = 15
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -83,7 +191,6 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
@@ -91,6 +198,69 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media delivery: 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile) or 'django' (FileResponse, local runs)
+MEDIA_DELIVERY = config('MEDIA_DELIVERY', default='django')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # internal nginx location aliased to MEDIA_ROOT
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # content-hashed file names
+MEDIA_MAX_AGE = 5 * 60  # other files, revalidated by ETag afterwards
+
+# Media storage: 'local' (MEDIA_ROOT) or 's3' (any S3-compatible service, e.g. MinIO)
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='local')
+STORAGES = {
+    'default': {
+        'BACKEND': 'mediastore.s3.MediaS3Storage' if MEDIA_STORAGE == 's3'
+        else 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='university-core-media')
+AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default=None)  # e.g. http://minio:9000
+AWS_S3_PUBLIC_ENDPOINT_URL = config('AWS_S3_PUBLIC_ENDPOINT_URL', default=None)  # endpoint browsers reach
+AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
+AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default=None)
+AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default=None)
+AWS_S3_ADDRESSING_STYLE = config('AWS_S3_ADDRESSING_STYLE', default=None)  # 'path' for MinIO
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+AWS_DEFAULT_ACL = None
+AWS_S3_FILE_OVERWRITE = False
+MEDIA_PRESIGNED_EXPIRY_SECONDS = config('MEDIA_PRESIGNED_EXPIRY_SECONDS', default=15 * 60, cast=int)
+AWS_QUERYSTRING_EXPIRE = MEDIA_PRESIGNED_EXPIRY_SECONDS
+
+# Resumable upload settings
+UPLOAD_TEMP_DIR = config('UPLOAD_TEMP_DIR', default=os.path.join(MEDIA_ROOT, '.partial'))
+UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024  # 2 GiB per file
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # suggested to clients
+UPLOAD_MAX_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_CHUNK_LEASE_SECONDS = 60  # renewed while chunk data keeps arriving
+UPLOAD_EXPIRY_SECONDS = 24 * 60 * 60  # unfinished uploads are discarded by expire_uploads
+
+# Content-addressed media garbage collection (collect_media_garbage)
+MEDIA_GC_BATCH_SIZE = config('MEDIA_GC_BATCH_SIZE', default=500, cast=int)
+MEDIA_GC_GRACE_SECONDS = config('MEDIA_GC_GRACE_SECONDS', default=60 * 60, cast=int)  # unreferenced files kept this long
+
+# Background jobs (manage.py run_worker)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)  # seconds between polls of an empty queue
+JOBS_LEASE_SECONDS = 5 * 60  # a job whose worker stops renewing this is run again
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF_SECONDS = 10  # doubled after every failed attempt
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+JOBS_KEEP_FINISHED_DAYS = 7
+JOBS_DELETE_BATCH_SIZE = 500  # rows of one model deleted per transaction by purge_deleted
+# Recurring jobs, created in the scheduled jobs table when a worker starts (edit them in the admin)
+JOBS_SCHEDULE = {
+    'collect-media-garbage': {'task': 'mediastore.tasks.collect_media_garbage', 'interval': 60 * 60},
+    'expire-uploads': {'task': 'mediastore.tasks.expire_uploads', 'interval': 60 * 60},
+    'purge-event-tombstones': {'task': 'schedule.tasks.purge_event_tombstones', 'interval': 24 * 60 * 60},
+    'purge-finished-jobs': {'task': 'jobs.tasks.purge_finished_jobs', 'interval': 24 * 60 * 60},
+}
+
+# Image variant settings
+IMAGE_VARIANT_SIZES = {'thumb': 160, 'card': 480, 'full': 1600}  # longest edge in pixels
+IMAGE_VARIANT_QUALITY = 80  # WebP and JPEG quality
+IMAGE_PLACEHOLDER_SIZE = 16  # longest edge of the inlined placeholder
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Logging Configuration
@@ -142,6 +312,21 @@ LOGGING = {
             'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': False,
         },
+        'realtime': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': False,
+        },
+        'mediastore': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': False,
+        },
+        'jobs': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -0,0 +1,265 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from courses.models import Course
+from users.models import User
+from .cache import TieredCache
+from .db.pool import ConnectionPool, PoolTimeout
+from .db.routers import ReplicaMonitor, ReplicaRouter, finish_request, monitor, primary_reads, start_request
+
+
+class CacheFillRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        usable = mock.patch.object(monitor, 'usable', return_value=['replica1'])
+        usable.start()
+        self.addCleanup(usable.stop)
+        self.router = ReplicaRouter()
+        self.request = RequestFactory().get('/courses/')
+        token = start_request(self.request)
+        self.addCleanup(finish_request, token, self.request, mock.MagicMock())
+
+    def test_get_requests_read_from_replicas(self):
+        self.assertEqual(self.router.db_for_read(Course), 'replica1')
+
+    def test_primary_reads_block(self):
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(Course), 'default')
+        self.assertEqual(self.router.db_for_read(Course), 'replica1')
+
+    def test_tiered_cache_computes_from_primary(self):
+        tiered = TieredCache('test:routing', timeout=60)
+
+        value = tiered.get_or_compute('key', lambda: self.router.db_for_read(Course))
+
+        self.assertEqual(value, 'default')
+        self.assertEqual(self.router.db_for_read(Course), 'replica1')
+
+
+@override_settings(DB_REPLICA_CHECK_INTERVAL=0.05, DB_REPLICA_MAX_LAG_SECONDS=2)
+class ReplicaMonitorTests(SimpleTestCase):
+    def setUp(self):
+        aliases = mock.patch('university_core.db.routers.replica_aliases', return_value=['replica1', 'replica2'])
+        aliases.start()
+        self.addCleanup(aliases.stop)
+        self.monitor = ReplicaMonitor()
+        self.addCleanup(self.monitor.stop)
+
+    def wait_for_check(self):
+        deadline = time.monotonic() + 2
+        while self.monitor.status() == {} and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_requests_do_not_wait_for_a_hanging_replica(self):
+        def measure(alias):
+            time.sleep(0.5)
+            return 0.0
+
+        with mock.patch.object(self.monitor, '_measure', side_effect=measure):
+            started = time.monotonic()
+            self.assertEqual(self.monitor.usable(), [])
+            self.assertLess(time.monotonic() - started, 0.1)
+
+    def test_lagging_and_unreachable_replicas_are_skipped(self):
+        lags = {'replica1': 0.5, 'replica2': None}
+        with mock.patch.object(self.monitor, '_measure', side_effect=lags.get):
+            self.monitor.usable()
+            self.wait_for_check()
+
+            self.assertEqual(self.monitor.usable(), ['replica1'])
+            lags['replica1'] = 10
+            time.sleep(0.2)
+            self.assertEqual(self.monitor.usable(), [])
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache('test:tiered', timeout=60)
+
+    def test_bump_invalidates_every_value(self):
+        values = iter(['old', 'new'])
+
+        self.assertEqual(self.tiered.get_or_compute('key', lambda: next(values)), 'old')
+        self.assertEqual(self.tiered.get_or_compute('key', lambda: 'unused'), 'old')
+        self.tiered.bump()
+        self.assertEqual(self.tiered.get_or_compute('key', lambda: next(values)), 'new')
+
+    def test_other_processes_see_a_bump(self):
+        self.tiered.get_or_compute('key', lambda: 'old')
+        # Another process bumps the shared version; this process's L1 still holds the old value
+        TieredCache('test:tiered', timeout=60).bump()
+
+        self.assertEqual(self.tiered.get_or_compute('key', lambda: 'new'), 'new')
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        def lookup():
+            barrier.wait()
+            results.append(self.tiered.get_or_compute('key', compute))
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(self.tiered.stats()['recomputes'], 1)
+
+    def test_expired_value_is_served_stale_during_a_recompute(self):
+        self.tiered.get_or_compute('key', lambda: 'old')
+        started, release = threading.Event(), threading.Event()
+
+        def slow_compute():
+            started.set()
+            release.wait(2)
+            return 'new'
+
+        with mock.patch('university_core.cache.time.time', return_value=time.time() + 70):
+            recompute = threading.Thread(target=self.tiered.get_or_compute, args=['key', slow_compute])
+            recompute.start()
+            started.wait(2)
+            self.assertEqual(self.tiered.get_or_compute('key', lambda: 'unused'), 'old')
+            release.set()
+            recompute.join()
+            self.assertEqual(self.tiered.get_or_compute('key', lambda: 'unused'), 'new')
+
+
+class ReadYourWritesTests(TransactionTestCase):
+    def setUp(self):
+        usable = mock.patch.object(monitor, 'usable', return_value=['replica1'])
+        usable.start()
+        self.addCleanup(usable.stop)
+        self.router = ReplicaRouter()
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        request = RequestFactory().get('/courses/')
+        token = start_request(request)
+        self.assertEqual(self.router.db_for_read(Course), 'replica1')
+
+        User.objects.create_user(email='student@example.com', password='secret', user_role='student')
+
+        self.assertEqual(self.router.db_for_read(Course), 'default')
+        response = finish_request(token, request, HttpResponse())
+        self.assertIn(settings.DB_REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_writing_requests_keep_the_client_on_the_primary(self):
+        request = RequestFactory().post('/courses/')
+        token = start_request(request)
+        self.assertEqual(self.router.db_for_read(Course), 'default')
+        response = finish_request(token, request, HttpResponse())
+        cookie = response.cookies[settings.DB_REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.DB_REPLICA_STICKY_SECONDS)
+
+        follow_up = RequestFactory().get('/courses/')
+        follow_up.COOKIES[settings.DB_REPLICA_STICKY_COOKIE] = cookie.value
+        token = start_request(follow_up)
+        self.addCleanup(finish_request, token, follow_up, HttpResponse())
+        self.assertEqual(self.router.db_for_read(Course), 'default')
+
+    def test_reads_without_writes_use_replicas_and_set_no_cookie(self):
+        request = RequestFactory().get('/courses/')
+        token = start_request(request)
+        self.assertEqual(self.router.db_for_read(Course), 'replica1')
+        response = finish_request(token, request, HttpResponse())
+        self.assertNotIn(settings.DB_REPLICA_STICKY_COOKIE, response.cookies)
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if not self.healthy:
+            raise RuntimeError('server closed the connection unexpectedly')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, size=2, timeout=1, max_lifetime=60, check_after=60):
+        return ConnectionPool(size=size, timeout=timeout, max_lifetime=max_lifetime, check_after=check_after)
+
+    def test_returned_connections_are_reused(self):
+        pool = self.pool()
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+
+        self.assertIs(pool.getconn(FakeConnection), connection)
+        stats = pool.stats()
+        self.assertEqual((stats['requests'], stats['opened'], stats['open'], stats['in_use']), (2, 1, 1, 1))
+
+    def test_waits_for_a_free_connection_until_the_timeout(self):
+        pool = self.pool(size=1, timeout=0.05)
+        connection = pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+
+        pool.timeout = 2
+        threading.Timer(0.05, pool.putconn, [connection]).start()
+        self.assertIs(pool.getconn(FakeConnection), connection)
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['opened']), (2, 1, 1))
+
+    def test_old_and_broken_connections_are_replaced(self):
+        pool = self.pool(size=1, max_lifetime=0)
+        expired = pool.getconn(FakeConnection)
+        pool.putconn(expired)
+
+        self.assertIsNot(pool.getconn(FakeConnection), expired)
+        self.assertTrue(expired.closed)
+
+        pool = self.pool(size=1, check_after=0)
+        broken = pool.getconn(FakeConnection)
+        pool.putconn(broken)
+        broken.healthy = False
+
+        self.assertIsNot(pool.getconn(FakeConnection), broken)
+        self.assertEqual(pool.stats()['closed'], {'broken': 1})
+
+    def test_slots_are_freed_when_connections_cannot_be_reused(self):
+        pool = self.pool(size=1)
+
+        with self.assertRaises(RuntimeError):
+            pool.getconn(mock.Mock(side_effect=RuntimeError('could not connect')))
+        pool.putconn(pool.getconn(FakeConnection), reusable=False)
+        foreign = FakeConnection()
+        pool.putconn(foreign)
+        pool.putconn(pool.getconn(FakeConnection))
+        pool.close_idle()
+
+        self.assertTrue(foreign.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['open'], stats['idle'], stats['opened']), (0, 0, 2))
+        self.assertEqual(stats['closed'], {'broken': 1, 'foreign': 1, 'idle': 1})
@@ -5,17 +5,23 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from mediastore.views import serve_media
 from users.views import home_view
+from .views import api_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('courses/', include('courses.urls')),
     path('schedule/', include('schedule.urls')),
+    path('files/', include('mediastore.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('metrics/', api_metrics, name='api-metrics'),
+    # Media is checked by Django and, in production, sent by the front proxy (see mediastore.delivery)
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='serve-media'),
     path('', home_view, name='home'),
 ]
 
-# Serve static and media files in development
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
\ No newline at end of file
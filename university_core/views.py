@@ -0,0 +1,24 @@
+import os
+
+from django.http import JsonResponse
+
+from users.jwt_utils import jwt_required
+from .cache import cache_stats
+from .db.base import pool_stats
+from .db.routers import monitor
+
+
+@jwt_required
+def api_metrics(request):
+    """API endpoint with the runtime metrics of the worker process serving the request"""
+    if request.user.user_role != 'admin':
+        return JsonResponse({
+            'error': 'Only admin users can view metrics'
+        }, status=403)
+    return JsonResponse({
+        'success': True,
+        'pid': os.getpid(),
+        'database_pools': pool_stats(),
+        'replicas': monitor.status(),
+        'caches': cache_stats(),
+    })
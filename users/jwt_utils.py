@@ -1,5 +1,7 @@
+import asyncio
 import jwt
 import datetime
+from functools import wraps
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
@@ -56,6 +58,17 @@ class JWTManager:
                 return None
         return None
     
+    @staticmethod
+    async def aget_user_from_token(token):
+        """Get user object from JWT token, for async views"""
+        payload = JWTManager.verify_token(token)
+        if payload and 'user_id' in payload:
+            try:
+                return await User.objects.aget(id=payload['user_id'])
+            except User.DoesNotExist:
+                return None
+        return None
+    
     @staticmethod
     def refresh_access_token(refresh_token):
         """Generate new access token from refresh token"""
@@ -77,19 +90,44 @@ def get_token_from_request(request):
     return None
 
 
+def _user_error(user):
+    """Error response for a token that resolved to ``user``, or None if the user may proceed"""
+    if not user:
+        return JsonResponse({'error': 'Invalid or expired token'}, status=401)
+    
+    if not user.is_active:
+        return JsonResponse({'error': 'User account is disabled'}, status=401)
+    return None
+
+
 def jwt_required(view_func):
-    """Decorator to require JWT authentication"""
+    """Decorator to require JWT authentication, for sync and async views"""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            token = get_token_from_request(request)
+            if not token:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            
+            user = await JWTManager.aget_user_from_token(token)
+            error = _user_error(user)
+            if error:
+                return error
+            
+            request.user = user
+            return await view_func(request, *args, **kwargs)
+        
+        return async_wrapper
+    
     def wrapper(request, *args, **kwargs):
         token = get_token_from_request(request)
         if not token:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         user = JWTManager.get_user_from_token(token)
-        if not user:
-            return JsonResponse({'error': 'Invalid or expired token'}, status=401)
-        
-        if not user.is_active:
-            return JsonResponse({'error': 'User account is disabled'}, status=401)
+        error = _user_error(user)
+        if error:
+            return error
         
         # Add user to request for use in view
         request.user = user
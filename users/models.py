@@ -2,16 +2,15 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.core.validators import EmailValidator
 from django.utils import timezone
-import os
 
-
-def user_picture_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'profile_picture.{ext}'
-    return os.path.join('users', f'user_{instance.id}', filename)
+from mediastore.fields import BlobImageField
 
 
 class UserManager(BaseUserManager):
+    def get_queryset(self):
+        # Users deleted with soft_delete stay hidden while their data is removed
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
     def create_user(self, email, password=None, **extra_fields):
         """
         Create and return a regular user with an email and password.
@@ -68,11 +67,12 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
-    picture = models.ImageField(
-        upload_to=user_picture_path,
+    picture = BlobImageField(
         blank=True,
         null=True
     )
+    # Resized versions of the picture, written by mediastore.images
+    picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -86,12 +86,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     # Django auth additional fields
     last_login = models.DateTimeField(blank=True, null=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Set by soft_delete; the row and everything the user created are removed by a background job
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     # Use email as the username field
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
     objects = UserManager()
+    all_objects = models.Manager()
 
     class Meta:
         db_table = 'users'
@@ -125,9 +128,18 @@ class User(AbstractBaseUser, PermissionsMixin):
         """Does the user have permissions to view the app `app_label`?"""
         return self.is_superuser
 
-    def delete(self, *args, **kwargs):
-        # Delete the picture file when user is deleted
-        if self.picture:
-            if os.path.isfile(self.picture.path):
-                os.remove(self.picture.path)
-        super().delete(*args, **kwargs)
+    def soft_delete(self):
+        """
+        Hide the user and the courses they created now, and stop them signing in;
+        ``jobs.deletion`` removes them with everything else they own
+        """
+        from courses.caching import catalog_cache
+        from courses.models import Course
+
+        self.deleted_at = timezone.now()
+        self.is_active = False
+        User.all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at, is_active=False)
+        Course.all_objects.filter(created_by=self, deleted_at__isnull=True).update(
+            deleted_at=self.deleted_at, is_active=False
+        )
+        catalog_cache.bump()
@@ -1,13 +1,19 @@
 import json
 import logging
 from datetime import datetime
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth import authenticate, login
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
+from django.db import transaction
 
+from jobs.tasks import purge_deleted
+from jobs.views import job_to_dict
+from mediastore.images import image_variants_to_dict
+from university_core import asyncviews
 from .models import User
 from .jwt_utils import JWTManager, jwt_required
 
@@ -218,10 +224,44 @@ def api_register(request):
         }, status=500)
 
 
-@csrf_exempt
+def _update_profile(request):
+    """Apply a profile update; the save and its signals run on a database thread"""
+    try:
+        data = json.loads(request.body)
+        user = request.user
+        
+        # Update user fields
+        user.first_name = data.get('first_name', user.first_name)
+        user.last_name = data.get('last_name', user.last_name)
+        user.father_name = data.get('father_name', user.father_name)
+        user.phone_number = data.get('phone_number', user.phone_number)
+        user.is_active = data.get('is_active', user.is_active)
+        
+        # Handle date_of_birth
+        date_of_birth = data.get('date_of_birth')
+        if date_of_birth:
+            user.date_of_birth = datetime.strptime(date_of_birth, '%Y-%m-%d').date()
+        
+        user.save()
+        
+        logger.info(f"User profile updated: {user.email} (ID: {user.id})")
+        return JsonResponse({
+            'success': True,
+            'message': 'Profile updated successfully!'
+        })
+        
+    except json.JSONDecodeError:
+        logger.error(f"Invalid JSON received for profile update by user {request.user.email}")
+        return JsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+    except Exception as e:
+        logger.error(f"Error updating profile for user {request.user.email}: {e}", exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@asyncviews.csrf_exempt
 @jwt_required
-@require_http_methods(["GET", "PUT"])
-def api_user_profile(request):
+@asyncviews.require_http_methods(["GET", "PUT"])
+async def api_user_profile(request):
     """API endpoint to get and update current user profile"""
     if request.method == 'GET':
         logger.info(f"User profile accessed: {request.user.email} (ID: {request.user.id})")
@@ -234,6 +274,8 @@ def api_user_profile(request):
             'role': request.user.user_role,
             'phone_number': request.user.phone_number,
             'is_active': request.user.is_active,
+            'picture_url': request.user.picture.url if request.user.picture else None,
+            'picture_variants': image_variants_to_dict(request.user.picture, request.user.picture_variants),
             'date_of_birth': request.user.date_of_birth.isoformat() if request.user.date_of_birth else None,
             'created_at': request.user.created_at.isoformat(),
             'updated_at': request.user.updated_at.isoformat(),
@@ -245,36 +287,7 @@ def api_user_profile(request):
         })
     
     elif request.method == 'PUT':
-        try:
-            data = json.loads(request.body)
-            user = request.user
-            
-            # Update user fields
-            user.first_name = data.get('first_name', user.first_name)
-            user.last_name = data.get('last_name', user.last_name)
-            user.father_name = data.get('father_name', user.father_name)
-            user.phone_number = data.get('phone_number', user.phone_number)
-            user.is_active = data.get('is_active', user.is_active)
-            
-            # Handle date_of_birth
-            date_of_birth = data.get('date_of_birth')
-            if date_of_birth:
-                user.date_of_birth = datetime.strptime(date_of_birth, '%Y-%m-%d').date()
-            
-            user.save()
-            
-            logger.info(f"User profile updated: {user.email} (ID: {user.id})")
-            return JsonResponse({
-                'success': True,
-                'message': 'Profile updated successfully!'
-            })
-            
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received for profile update by user {request.user.email}")
-            return JsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
-        except Exception as e:
-            logger.error(f"Error updating profile for user {request.user.email}: {e}", exc_info=True)
-            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return await sync_to_async(_update_profile)(request)
 
 
 @csrf_exempt
@@ -353,6 +366,8 @@ def api_users_list(request):
             'phone_number': user.phone_number,
             'user_role': user.user_role,
             'is_active': user.is_active,
+            'picture_url': user.picture.url if user.picture else None,
+            'picture_variants': image_variants_to_dict(user.picture, user.picture_variants),
             'created_at': user.created_at.isoformat(),
             'updated_at': user.updated_at.isoformat(),
         })
@@ -393,6 +408,8 @@ def api_user_detail(request, user_id):
         'user_role': user.user_role,
         'phone_number': user.phone_number,
         'is_active': user.is_active,
+        'picture_url': user.picture.url if user.picture else None,
+        'picture_variants': image_variants_to_dict(user.picture, user.picture_variants),
         'created_at': user.created_at.isoformat(),
         'updated_at': user.updated_at.isoformat(),
     }
@@ -545,7 +562,12 @@ def api_update_user(request, user_id):
 @jwt_required
 @require_http_methods(["DELETE"])
 def api_delete_user(request, user_id):
-    """API endpoint to delete user (admin only)"""
+    """
+    API endpoint to delete user (admin only).
+
+    The user and their courses disappear at once; everything they created is
+    removed by a background job, whose progress is at ``/jobs/<id>/``.
+    """
     logger.info(f"User deletion attempt: User ID {user_id} by {request.user.email}")
     if request.user.user_role != 'admin':
         logger.warning(f"Unauthorized user deletion attempt: User ID {user_id} by {request.user.email}")
@@ -563,10 +585,13 @@ def api_delete_user(request, user_id):
         }, status=400)
     
     user_email = user.email
-    user.delete()
+    with transaction.atomic():
+        user.soft_delete()
+        job = purge_deleted.enqueue(model='users.User', pk=user.id, created_by=request.user)
     
     logger.info(f"User deleted successfully: {user_email} (ID: {user_id}) by {request.user.email}")
     return JsonResponse({
         'success': True,
-        'message': 'User deleted successfully'
-    })
\ No newline at end of file
+        'message': 'User deleted successfully',
+        'job': job_to_dict(job)
+    }, status=202)
\ No newline at end of file